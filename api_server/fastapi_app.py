@@ -5,23 +5,26 @@
 create & configure fastapi_app instance
 """
 
+import asyncio
 import logging
 import os
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
 from urllib.parse import urljoin
 
 import inject
-import psutil
 from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse, PlainTextResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 from starlette.middleware.cors import CORSMiddleware
 
 from api_server import resources as resources_api
-from infra.dependencies import Config
+from infra.dependencies import AsyncMainRedis, Config, HealthChecker, SystemSampler
+from infra.dependencies.rdb import statement_stats
 from infra.enums import Switch
-from infra.handlers.http.error import bind_app_exception_handler
-from infra.middlewares import user_define_http_middleware
+from infra.handlers.http import PrecompressedStaticFiles, bind_app_exception_handler
+from infra.middlewares import CompressionMiddleware, MetricsMiddleware, RequestContextMiddleware
+from infra.utils.metrics import render_metrics
+from infra.utils.sampler import Sample
 
 logger = logging.getLogger(__name__)
 config: Config = inject.instance(Config)
@@ -36,8 +39,16 @@ def bind_middleware(application: FastAPI) -> None:
     # Cross-domain [When cross-domain is configured
     # in external nginx, the application side needs to turn off cross-domain]
     application.add_middleware(CORSMiddleware, allow_origins=["*"])
-    # Customizing HTTP Middleware
-    application.middleware("http")(user_define_http_middleware)
+    # Negotiated response compression [zstd, br, gzip]
+    application.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+        thread_threshold=config.COMPRESSION_THREAD_THRESHOLD,
+    )
+    # Request context middleware [pure ASGI, outside every middleware above]
+    application.add_middleware(RequestContextMiddleware)
+    # Per route latency, in-flight and size metrics [outermost, so every layer is measured]
+    application.add_middleware(MetricsMiddleware)
 
 
 def bind_health_check_endpoint(application: FastAPI) -> None:
@@ -52,6 +63,32 @@ def bind_health_check_endpoint(application: FastAPI) -> None:
         # returns the health status of each component
         return PlainTextResponse(b"OK")
 
+    @application.get(urljoin(f"{config.API_PREFIX}/v1/", "health/live"))
+    async def liveness() -> PlainTextResponse:
+        # The checker thread of this worker is still probing
+        if inject.instance(HealthChecker).is_alive():
+            return PlainTextResponse(b"OK")
+        return PlainTextResponse(b"STALE", status_code=503)
+
+    @application.get(urljoin(f"{config.API_PREFIX}/v1/", "health/ready"))
+    async def readiness() -> ORJSONResponse:
+        # Cached probe results, a request never waits for a dependency
+        checker: HealthChecker = inject.instance(HealthChecker)
+        return ORJSONResponse(checker.report(), status_code=200 if checker.is_ready() else 503)
+
+
+def bind_metrics_endpoint(application: FastAPI) -> None:
+    """
+    bind prometheus metrics api
+    :param application: FastAPI instance
+    """
+
+    @application.get(urljoin(f"{config.API_PREFIX}/v1/", "metrics"))
+    def metrics() -> Response:
+        # Reading the shared files of every worker is blocking, run it in the threadpool
+        content, media_type = render_metrics()
+        return Response(content, media_type=media_type)
+
 
 def bind_app_info_endpoint(application: FastAPI) -> None:
     """
@@ -60,8 +97,11 @@ def bind_app_info_endpoint(application: FastAPI) -> None:
     """
 
     @application.get(urljoin(f"{config.API_PREFIX}/v1/", ""))
-    def app_info() -> ORJSONResponse:
+    async def app_info() -> ORJSONResponse:
         logger.debug("get app_info request.")
+        sampler: SystemSampler = inject.instance(SystemSampler)
+        # Only the background sample is read, CPU_PERCENT is null until the first one
+        sample: Optional[Sample] = sampler.latest()
         # returns the health status of each component
         return ORJSONResponse(
             {
@@ -70,11 +110,27 @@ def bind_app_info_endpoint(application: FastAPI) -> None:
                 "SERVER_WORKER_THREAD": config.SERVER_WORKER_THREAD,
                 "API_PREFIX": config.API_PREFIX,
                 "CPU_COUNT": os.cpu_count(),
-                "CPU_PERCENT": psutil.cpu_percent(),
+                "CPU_PERCENT": sample.cpu_percent if sample is not None else None,
             }
         )
 
 
+def bind_diagnostics_endpoint(application: FastAPI) -> None:
+    """
+    Bind diagnostics api
+    :param application: FastAPI instance
+    """
+
+    @application.get(urljoin(f"{config.API_PREFIX}/v1/", "diagnostics"))
+    async def diagnostics() -> ORJSONResponse:
+        logger.debug("get diagnostics request.")
+        sampler: SystemSampler = inject.instance(SystemSampler)
+        # latest sample and trend windows of the worker that serves the request,
+        # empty until the background sampler has run once
+        snapshot: Dict[str, Any] = sampler.snapshot() or {"latest": None, "trends": {}}
+        return ORJSONResponse({**snapshot, "statements": statement_stats()})
+
+
 def bind_api(application: FastAPI) -> None:
     """
     bind router
@@ -85,13 +141,45 @@ def bind_api(application: FastAPI) -> None:
     bind_health_check_endpoint(application)
     # app info endpoint
     bind_app_info_endpoint(application)
+    # prometheus metrics endpoint
+    bind_metrics_endpoint(application)
+    # diagnostics endpoint
+    bind_diagnostics_endpoint(application)
     # bind resources api
     resources_api.bind_router(application)
+    # Static files are served from the .zst/.br/.gz siblings when the client accepts them
     application.mount(
-        "/static", StaticFiles(directory=config.STATIC_PATH, html=True), name="static"
+        "/static",
+        PrecompressedStaticFiles(
+            directory=config.STATIC_PATH,
+            html=True,
+            minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+            max_age=config.STATIC_CACHE_MAX_AGE,
+            immutable_max_age=config.STATIC_IMMUTABLE_MAX_AGE,
+        ),
+        name="static",
     )
 
 
+@asynccontextmanager
+async def lifespan(_application: FastAPI) -> AsyncIterator[None]:
+    """
+    runs in every worker, start the per worker background threads
+    """
+    sampler: SystemSampler = inject.instance(SystemSampler)
+    sampler.attach_loop(asyncio.get_running_loop())
+    sampler.start()
+    checker: HealthChecker = inject.instance(HealthChecker)
+    checker.start()
+    try:
+        yield
+    finally:
+        checker.stop()
+        sampler.stop()
+        # The connections belong to the event loop of this worker
+        await inject.instance(AsyncMainRedis).aclose(close_connection_pool=True)
+
+
 def create_app() -> FastAPI:
     """
     create app function, return fastapi_app instance
@@ -99,7 +187,7 @@ def create_app() -> FastAPI:
     """
     docs_url: Optional[str] = None if config.OPEN_DOC == Switch.Close else "/docs"
     redoc_url: Optional[str] = None if config.OPEN_DOC == Switch.Close else "/redoc"
-    _app = FastAPI(docs_url=docs_url, redoc_url=redoc_url)
+    _app = FastAPI(docs_url=docs_url, redoc_url=redoc_url, lifespan=lifespan)
     bind_middleware(_app)
     bind_api(_app)
     bind_app_exception_handler(_app)
@@ -6,9 +6,11 @@
 doc: https://docs.gunicorn.org/en/stable/settings.html#reload
 """
 
+import glob
 import logging
 import os
 import subprocess
+import tempfile
 from math import ceil
 from pathlib import Path
 
@@ -63,6 +65,31 @@ def get_tmpfs_dir():
     return None
 
 
+# ----------------- Metrics Related Config --------------------- #
+# Workers share prometheus metrics through files, the directory must be set
+# before the application is preloaded [so infra.utils.metrics can not be imported
+# here]. Without PROMETHEUS_MULTIPROC_DIR each master gets a fresh directory,
+# the same rule as Config.METRICS_MULTIPROC_DIR
+prometheus_multiproc_dir: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+if prometheus_multiproc_dir:
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    for _file in glob.glob(os.path.join(prometheus_multiproc_dir, "*.db")):
+        os.remove(_file)
+else:
+    prometheus_multiproc_dir = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = prometheus_multiproc_dir
+gunicorn_error_logger.error(
+    f"Gunicorn Config: prometheus_multiproc_dir({prometheus_multiproc_dir})"
+)
+
+
+def child_exit(server, worker) -> None:
+    # drop the live gauges of the exited worker
+    from infra.utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
 # ----------------- Server Mechanics Related Config --------------------- #
 # Load application code before the worker processes are forked.
 preload_app = True
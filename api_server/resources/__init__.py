@@ -5,30 +5,61 @@ Here are some methods that are common to all apis.
 The package should only be referenced by other modules in resources
 """
 
-import gzip
+import asyncio
+import functools
 import logging
+import time
 from enum import Enum
-from typing import Any, Callable, List, Optional, Type, Union
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 from urllib.parse import urljoin
 
 import fastapi
 import inject
 import orjson
-from fastapi import Request, Response
+from fastapi import Depends, Request, Response
+from fastapi.datastructures import Default, DefaultPlaceholder
 from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse
 from fastapi.routing import APIRoute
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from starlette.types import ASGIApp
 
 from infra.decorator.trace import EventIdTrace
-from infra.dependencies import Auth, Config, Registry
+from infra.dependencies import Auth, CachePolicy, Config, RateLimiter, Registry, ResponseCache
+from infra.dependencies.response_cache import CachedResponse
+from infra.exceptions import HTTPException, TooManyRequests
+from infra.typing import T
 from infra.utils import make_json_response, name_convert_to_snake
+from infra.utils.compression import (
+    DecompressedSizeExceeded,
+    DecompressionError,
+    IDecompressor,
+    get_decompressor,
+)
 
 __all__ = [
+    "EnvelopeJSONResponse",
+    "skip_json_envelope",
+    "cache_response",
+    "CachePolicy",
     "APIDefaultRouter",
     "APIV1Router",
     "APIV2Router",
     "TemplateAPIRouter",
     "TemplateNoFormatAPIRouter",
+    "rate_limit",
     "bind_router",
 ]
 
@@ -36,46 +67,248 @@ config: Config = inject.instance(Config)
 registry: Registry = inject.instance(Registry)
 auth: Auth = inject.instance(Auth)
 logger = logging.getLogger(__name__)
+# Handlers marked with this attribute already return the enveloped format
+SKIP_JSON_ENVELOPE_ATTR: str = "__skip_json_envelope__"
+# Handlers marked with this attribute have their responses cached
+CACHE_POLICY_ATTR: str = "__cache_policy__"
+# Response headers that are not stored with a cached response
+UNCACHED_HEADERS: Set[str] = {"content-length", "date", "x-cache"}
+# Request headers identifying the caller, requests with them bypass the cache
+# unless the cache policy varies on them
+PRIVATE_REQUEST_HEADERS: Tuple[str, ...] = ("authorization", "cookie")
+
+
+def skip_json_envelope(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Mark a handler whose return value is already built by make_json_response,
+    CustomJsonRoute will serialize it as is
+    :param func: route handler
+    :return: the same handler
+    """
+    setattr(func, SKIP_JSON_ENVELOPE_ATTR, True)
+    return func
+
+
+def cache_response(
+    ttl: int, stale_ttl: int = 0, vary_headers: Iterable[str] = (), tags: Iterable[str] = ()
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Cache the serialized response of a GET handler by path, query and vary_headers
+    Routes with dependencies are refused when they are built, a cache hit would skip them
+    :param ttl: how long a response is fresh [seconds]
+    :param stale_ttl: how long a stale response is served while it is refreshed [seconds]
+    :param vary_headers: request headers that are part of the cache key
+    :param tags: tags for ResponseCache.invalidate_tags
+    :return: decorator
+    """
+    policy: CachePolicy = CachePolicy(
+        ttl=ttl,
+        stale_ttl=stale_ttl,
+        vary_headers=tuple(_h.lower() for _h in vary_headers),
+        tags=tuple(tags),
+    )
+
+    def _decorator(func: Callable[..., T]) -> Callable[..., T]:
+        setattr(func, CACHE_POLICY_ATTR, policy)
+        return func
+
+    return _decorator
+
+
+def _to_cached_response(response: Response, policy: CachePolicy) -> Optional[CachedResponse]:
+    """
+    serialize a response worth caching
+    :param response: handler response
+    :param policy: cache policy
+    :return: None when the response must not be cached
+    """
+    # Streaming responses have no body
+    body: Any = getattr(response, "body", None)
+    if response.status_code != 200 or not isinstance(body, bytes):
+        return None
+    if "set-cookie" in response.headers:
+        return None
+    now: float = time.time()
+    return CachedResponse(
+        body=body,
+        status_code=response.status_code,
+        headers=[(_k, _v) for _k, _v in response.headers.items() if _k not in UNCACHED_HEADERS],
+        fresh_until=now + policy.ttl,
+        stale_until=now + policy.ttl + policy.stale_ttl,
+        tags=policy.tags,
+    )
+
+
+def _from_cached_response(entry: CachedResponse, state: str) -> Response:
+    """
+    build a response from the cache
+    :param entry: cached response
+    :param state: X-Cache header value
+    """
+    response: Response = Response(content=entry.body, status_code=entry.status_code)
+    for _key, _value in entry.headers:
+        response.headers.append(_key, _value)
+    response.headers["X-Cache"] = state
+    return response
+
+
+def cached_route_handler(
+    handler: Callable[[Request], Awaitable[Response]], policy: CachePolicy
+) -> Callable[[Request], Awaitable[Response]]:
+    """
+    Wrap a route handler with the two tier response cache
+    A stale response is refreshed by one request per process, after the response is sent
+    but still inside the request context [auth, read-your-writes and statement scopes]
+    :param handler: route handler
+    :param policy: cache policy
+    """
+
+    async def _store(response_cache: ResponseCache, key: str, response: Response) -> None:
+        entry: Optional[CachedResponse] = _to_cached_response(response, policy)
+        if entry is not None:
+            await run_in_threadpool(response_cache.set, key, entry)
+
+    async def _refresh(response_cache: ResponseCache, key: str, request: Request) -> None:
+        try:
+            await _store(response_cache, key, await handler(request))
+        # pylint: disable=W0703
+        except Exception:
+            logger.warning(f"failed to refresh cached response {request.url}", exc_info=True)
+        finally:
+            response_cache.end_refresh(key)
+
+    async def _cached_handler(request: Request) -> Response:
+        if request.method != "GET":
+            return await handler(request)
+        # Like a shared http cache, responses to identified callers are private
+        # unless the identifying header is part of the key
+        if any(
+            _h in request.headers and _h not in policy.vary_headers
+            for _h in PRIVATE_REQUEST_HEADERS
+        ):
+            response: Response = await handler(request)
+            response.headers["X-Cache"] = "BYPASS"
+            return response
+        response_cache: ResponseCache = inject.instance(ResponseCache)
+        key: str = response_cache.make_key(
+            request.method,
+            request.url.path,
+            request.url.query,
+            request.headers,
+            vary_headers=policy.vary_headers,
+        )
+        entry: Optional[CachedResponse] = response_cache.get_local(key)
+        if entry is None:
+            entry = await run_in_threadpool(response_cache.get, key)
+        if entry is not None:
+            now: float = time.time()
+            if now < entry.fresh_until:
+                return _from_cached_response(entry, "HIT")
+            if now < entry.stale_until:
+                response = _from_cached_response(entry, "STALE")
+                if response_cache.try_begin_refresh(key):
+                    response.background = BackgroundTask(_refresh, response_cache, key, request)
+                return response
+        response = await handler(request)
+        await _store(response_cache, key, response)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    return _cached_handler
+
+
+class EnvelopeJSONResponse(ORJSONResponse):
+    """
+    Wrap the handler's return value with make_json_response while rendering,
+    so the content is serialized only once
+    """
+
+    def render(self, content: Any) -> bytes:
+        return super().render(make_json_response(data=content))
 
 
-class GzipRequest(Request):  # type: ignore[misc]
+class DecompressRequest(Request):
     """
-    fix gzip issue:
-    https://stackoverflow.com/questions/65078775/accept-gzipped-body-in-fastapi-uvicorn
+    Request with a compressed body [gzip, deflate, zstd, br]
+    The body is decompressed chunk by chunk while it is received, the decompressed
+    size is limited by MAX_REQUEST_BODY_SIZE, and large bodies are decompressed
+    in a worker thread so the event loop is not blocked
     """
 
-    async def body(self) -> Any:
+    async def stream(self) -> AsyncGenerator[bytes, None]:
         """
-        Here supports gzip and JSON
+        yield decompressed chunks
+        :raises HTTPException: unsupported encoding, invalid body or body too large
         """
-        if not hasattr(self, "_body"):
-            _body: bytes = await super().body()
-            _body = gzip.decompress(_body)
-            setattr(self, "_body", orjson.loads(_body))
-        return self._body
+        if hasattr(self, "_body"):
+            yield self._body
+            yield b""
+            return
+        try:
+            decompressor: Optional[IDecompressor] = get_decompressor(
+                self.headers.get("Content-Encoding", ""), config.MAX_REQUEST_BODY_SIZE
+            )
+        except DecompressionError as exc:
+            raise HTTPException(status_code=415, detail=str(exc)) from exc
+        if decompressor is None:
+            async for chunk in super().stream():
+                yield chunk
+            return
+        content_length: str = self.headers.get("Content-Length", "")
+        in_thread: bool = (
+            not content_length.isdigit()
+            or int(content_length) > config.REQUEST_DECOMPRESS_THREAD_THRESHOLD
+        )
+        try:
+            async for chunk in super().stream():
+                if not chunk:
+                    continue
+                if in_thread:
+                    yield await run_in_threadpool(decompressor.decompress, chunk)
+                else:
+                    yield decompressor.decompress(chunk)
+            yield decompressor.flush()
+        except DecompressedSizeExceeded as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        except DecompressionError as exc:
+            raise HTTPException(status_code=400, detail=f"invalid compressed body: {exc}") from exc
+        yield b""
+
+    async def json(self) -> Any:
+        """
+        parse json body with orjson
+        """
+        if not hasattr(self, "_json"):
+            setattr(self, "_json", orjson.loads(await self.body()))
+        return self._json
 
 
-class CustomOriginRoute(APIRoute):  # type: ignore[misc]
+class CustomOriginRoute(APIRoute):
     """
     Custom API Route
     Does not process the original data
     """
 
     def get_route_handler(self) -> Any:
-        original_route_handler = super().get_route_handler()
+        original_route_handler: Callable[[Request], Awaitable[Response]] = (
+            super().get_route_handler()
+        )
+        cache_policy: Optional[CachePolicy] = getattr(self.endpoint, CACHE_POLICY_ATTR, None)
+        if cache_policy is not None and "GET" in self.methods:
+            # A cached response is served before the dependencies are solved
+            if self.dependant.dependencies:
+                raise ValueError(
+                    f"cache_response can not be used on {self.path}, "
+                    "its dependencies [auth, rate_limit, ...] would be skipped on a cache hit"
+                )
+            original_route_handler = cached_route_handler(original_route_handler, cache_policy)
 
         @EventIdTrace.trace()
         async def custom_route_handler(request: Request) -> Response:
-            try:
-                logger.info(f"get request, content is {auth.get_request()}")
-                # Extract specified parameters from request.url and store them in the Registry
-            except (
-                ValueError,
-                IndexError,
-            ):
-                logger.warning(f"failed, url is {str(request.url)}", exc_info=True)
-            if "gzip" in request.headers.getlist("Content-Encoding"):
-                request = GzipRequest(request.scope, request.receive)
+            # Formatted only when the request logger is enabled for debug
+            logger.debug("get request %s %s", request.method, request.scope["path"])
+            if request.headers.get("Content-Encoding"):
+                request = DecompressRequest(request.scope, request.receive)
             response: Response = await original_route_handler(request)
             return response
 
@@ -85,29 +318,57 @@ class CustomOriginRoute(APIRoute):  # type: ignore[misc]
 class CustomJsonRoute(CustomOriginRoute):
     """
     Custom API Route
-    Will process the returned JSON response
+    Will wrap the returned data with the unified JSON format,
+    a Response returned by the handler is sent as is
     """
 
-    def get_route_handler(self) -> Callable:
-        original_route_handler = super().get_route_handler()
-
-        async def custom_route_handler(request: Request) -> Response:
-            response: Response = await original_route_handler(request)
-            # Here, you can customize the returned Response
-            if isinstance(response, JSONResponse):
-                # Do not process the format defined in app.utils.response pylint: disable=E1101
-                content: Any = orjson.loads(response.body)
-                if "code" not in content:
-                    response = ORJSONResponse(
-                        status_code=response.status_code,
-                        content=make_json_response(data=content),
-                    )
-            return response
+    def __init__(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        *,
+        response_class: Union[Type[Response], DefaultPlaceholder] = Default(JSONResponse),
+        **kwargs: Any,
+    ) -> None:
+        # Only replace the default response class, an explicit one is respected
+        if isinstance(response_class, DefaultPlaceholder):
+            if getattr(endpoint, SKIP_JSON_ENVELOPE_ATTR, False):
+                response_class = Default(ORJSONResponse)
+            else:
+                response_class = Default(EnvelopeJSONResponse)
+        super().__init__(path, endpoint, response_class=response_class, **kwargs)
 
-        return custom_route_handler
 
+def rate_limit(rate: float, burst: int, cost: float = 1) -> Any:
+    """
+    Token bucket rate limit per client ip and route, use it as a route dependency:
+        router.get("/sync/", dependencies=[rate_limit(rate=1 / 60, burst=3)])
+    :param rate: refill rate [requests/s]
+    :param burst: bucket capacity
+    :param cost: tokens of one request
+    :return: fastapi dependency
+    :raises TooManyRequests: no token left
+    """
 
-class APIDefaultRouter(fastapi.APIRouter):  # type: ignore[misc]
+    async def _rate_limit(request: Request) -> None:
+        request_store = auth.get_request()
+        client_ip: str = request_store.client_ip if request_store else ""
+        if not client_ip and request.client:
+            client_ip = request.client.host
+        route: Any = request.scope.get("route")
+        key: str = f"{getattr(route, 'path', request.url.path)}:{request.method}:{client_ip}"
+        limiter: RateLimiter = inject.instance(RateLimiter)
+        # Clearly under the limit, no redis round trip
+        if limiter.try_acquire_local(key, cost):
+            return
+        allowed, retry_after = await run_in_threadpool(limiter.acquire, key, rate, burst, cost)
+        if not allowed:
+            raise TooManyRequests(retry_after=retry_after)
+
+    return Depends(_rate_limit)
+
+
+class APIDefaultRouter(fastapi.APIRouter):
     """
     default api group
     """
@@ -143,6 +404,38 @@ class APIDefaultRouter(fastapi.APIRouter):  # type: ignore[misc]
             route_class=route_class,
         )
 
+    def get(self, path: str, *, cache: Optional[CachePolicy] = None, **kwargs: Any) -> Any:
+        """
+        register a GET route
+        :param path: route path
+        :param cache: response cache policy, see cache_response
+        :param kwargs: fastapi.APIRouter.get params
+        """
+        decorator: Callable[[Callable], Callable] = super().get(path, **kwargs)
+        if cache is None:
+            return decorator
+
+        def _decorator(func: Callable[..., T]) -> Callable[..., T]:
+            # The policy belongs to this registration only, so the endpoint is wrapped
+            # instead of marked [one handler may be registered on several routers]
+            endpoint: Callable[..., Any]
+            if asyncio.iscoroutinefunction(func):
+
+                async def endpoint(*args: Any, **kw: Any) -> Any:
+                    return await func(*args, **kw)
+
+            else:
+
+                def endpoint(*args: Any, **kw: Any) -> Any:
+                    return func(*args, **kw)
+
+            functools.update_wrapper(endpoint, func)
+            setattr(endpoint, CACHE_POLICY_ATTR, cache)
+            decorator(endpoint)
+            return func
+
+        return _decorator
+
 
 class APIV1Router(APIDefaultRouter):
     """
@@ -9,11 +9,20 @@ Here, for example, if an API is bound to the /v1 and
 """
 
 import logging
+import time
 from typing import Any, Dict, List
 
+from fastapi import Body
 from fastapi.responses import PlainTextResponse
 
-from api_server.resources import APIDefaultRouter, APIV1Router, APIV2Router
+from api_server.resources import (
+    APIDefaultRouter,
+    APIV1Router,
+    APIV2Router,
+    cache_response,
+    skip_json_envelope,
+)
+from infra.utils import make_json_response
 
 __all__ = ["get_routers"]
 
@@ -48,6 +57,32 @@ def pydantic_test(item_id: int) -> Dict[str, Any]:
     return {"item_id": item_id}
 
 
+def body_test(item: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    echo json body, the body may be compressed
+    """
+
+    return item
+
+
+@skip_json_envelope
+def enveloped_test(item_id: int) -> Dict[str, Any]:
+    """
+    return data that is already in the unified format
+    """
+
+    return make_json_response(data={"item_id": item_id})
+
+
+@cache_response(ttl=60, vary_headers=["X-Tenant"], tags=["demo"])
+def cached_test(item_id: int) -> Dict[str, Any]:
+    """
+    cached response, the time shows when it was built
+    """
+
+    return {"item_id": item_id, "time": time.time()}
+
+
 def get_routers() -> List[APIDefaultRouter]:
     """
     get routers
@@ -57,4 +92,7 @@ def get_routers() -> List[APIDefaultRouter]:
     v1_router.get("/hello/")(hello)
     v2_router.get("/hello/")(hello)
     v1_router.get("/test/pydantic/{item_id}")(pydantic_test)
+    v1_router.get("/test/enveloped/{item_id}")(enveloped_test)
+    v1_router.post("/test/body")(body_test)
+    v1_router.get("/test/cached/{item_id}")(cached_test)
     return [v1_router, v2_router]
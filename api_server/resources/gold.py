@@ -13,14 +13,16 @@ Here, for example, if an API is bound to the /v1 and
 import logging
 from typing import List
 
-from api_server.resources import APIDefaultRouter, APIV1Router
-from infra.services.gold import get_current_price, get_latest_price
+from api_server.resources import APIDefaultRouter, APIV1Router, CachePolicy
+from infra.services.gold import GOLD_PRICE_CACHE_TAG, get_current_price, get_latest_price
 
 v1_router = APIV1Router(
     name="gold_price",
     tags=["gold_price"],
 )
 logger = logging.getLogger(__name__)
+# Prices change once a sync task runs, which invalidates the tag
+gold_price_cache: CachePolicy = CachePolicy(ttl=60, stale_ttl=300, tags=(GOLD_PRICE_CACHE_TAG,))
 
 __all__ = ["get_routers"]
 
@@ -31,8 +33,8 @@ def get_routers() -> List[APIDefaultRouter]:
     bind url route to handler method
     :return: router list
     """
-    v1_router.get("/list/")(get_latest_price)
-    v1_router.get("/latest/")(get_current_price)
+    v1_router.get("/list/", cache=gold_price_cache)(get_latest_price)
+    v1_router.get("/latest/", cache=gold_price_cache)(get_current_price)
     return [
         v1_router,
     ]
@@ -13,8 +13,10 @@ Here, for example, if an API is bound to the /v1 and
 import logging
 from typing import Any, Dict, List
 
-from api_server.resources import APIDefaultRouter, APIV1Router
-from celery_tasks.schedule_tasks.music_task import sync_play_list
+import inject
+
+from api_server.resources import APIDefaultRouter, APIV1Router, rate_limit
+from infra.dependencies import Celery
 
 v1_router = APIV1Router(
     name="music",
@@ -23,13 +25,16 @@ v1_router = APIV1Router(
 logger = logging.getLogger(__name__)
 
 __all__ = ["get_routers"]
+# Tasks are sent by name, importing the task module would load the whole
+# youtube download stack [yt_dlp, ffmpeg, mutagen ...] into every api worker
+SYNC_PLAY_LIST_TASK: str = "celery_tasks.schedule_tasks.music_task.sync_play_list"
 
 
 def sync_playlist() -> Dict[str, Any]:
     """
     立即同步播放列表
     """
-    sync_play_list.apply_async()
+    inject.instance(Celery).send_task(SYNC_PLAY_LIST_TASK)
     return {"result": True, "state": "success"}
 
 
@@ -39,7 +44,8 @@ def get_routers() -> List[APIDefaultRouter]:
     bind url route to handler method
     :return: router list
     """
-    v1_router.get("/sync/")(sync_playlist)
+    # Every call enqueues a sync task, a burst of 3 per client ip then one every 20 minutes
+    v1_router.get("/sync/", dependencies=[rate_limit(rate=1 / 1200, burst=3)])(sync_playlist)
     return [
         v1_router,
     ]
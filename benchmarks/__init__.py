@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmark: benchmark module
+"""
+
+import os
+
+# set config path [benchmarks run against the test configuration]
+os.environ.setdefault(
+    "CONFIG_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(os.path.realpath(__file__)))),
+        "tests",
+        "test_data",
+    ),
+)
+# set env
+os.environ.setdefault("ENV_FOR_DYNACONF", "development")
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare IDB.bulk_upsert with the per row session.add and commit it replaces,
+on a database file so every commit is written
+
+usage: python -m benchmarks.bench_bulk_upsert
+"""
+
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, cast
+
+from sqlalchemy import Engine, Table, create_engine
+
+from infra.dependencies.rdb import IDB, BulkUpsertResult
+from infra.models import GoldPrice
+from infra.models.base import Base
+
+ROW_COUNT: int = 5000
+
+
+def make_rows(offset: int) -> List[Dict[str, Any]]:
+    """
+    :param offset: first id
+    :return: gold price rows
+    """
+    return [
+        {"id": offset + _i, "price": 500.0 + _i / 100, "time": _i, "product_sku": "sku"}
+        for _i in range(ROW_COUNT)
+    ]
+
+
+def main() -> None:
+    """
+    insert ROW_COUNT rows both ways, then update them with bulk_upsert
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine: Engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine, tables=[cast(Table, GoldPrice.__table__)])
+        rdb: IDB = IDB(engine)
+        start: float = time.perf_counter()
+        with rdb.get_session() as session:
+            for _row in make_rows(0):
+                session.add(GoldPrice(**_row))
+                session.commit()
+        per_row: float = ROW_COUNT / (time.perf_counter() - start)
+        inserted: BulkUpsertResult = rdb.bulk_upsert(GoldPrice, make_rows(ROW_COUNT))
+        updated: BulkUpsertResult = rdb.bulk_upsert(
+            GoldPrice, make_rows(ROW_COUNT), update_columns=["price"]
+        )
+        engine.dispose()
+    print(f"session.add + commit per row: {per_row:.0f} rows/s")
+    print(
+        f"bulk_upsert insert: {inserted.rows_per_second:.0f} rows/s "
+        f"({inserted.rows_per_second / per_row:.1f}x)"
+    )
+    print(f"bulk_upsert update: {updated.rows_per_second:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
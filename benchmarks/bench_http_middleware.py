@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the per-request overhead of the previous BaseHTTPMiddleware based
+user_define_http_middleware with the pure ASGI RequestContextMiddleware
+
+usage: python -m benchmarks.bench_http_middleware
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+import inject
+from fastapi import FastAPI, Request, Response
+from starlette.types import Message
+
+from infra.dependencies import Auth, RequestStore
+from infra.middlewares import RequestContextMiddleware
+
+REQUEST_COUNT: int = 5000
+
+
+async def legacy_http_middleware(request: Request, call_next: Callable) -> Response:
+    """
+    the previous implementation: buffer the body and copy everything eagerly
+    """
+    headers_list = request.headers.getlist("X-Forwarded-For")
+    client_ip: str = headers_list[0] if headers_list else ""
+    if not client_ip and request.client:
+        client_ip = request.client.host
+    auth: Auth = inject.instance(Auth)
+    body: bytes = await request.body()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": body}
+
+    # pylint: disable=W0212
+    request._receive = receive
+    request_store: RequestStore = RequestStore()
+    request_store.client_ip = client_ip
+    request_store.base_url = str(request.base_url)
+    request_store.url = str(request.url)
+    request_store.method = request.method
+    request_store.header = str(request.headers)
+    request_store.body = body
+    request_store.path_params = request.path_params
+    request_store.query_params = dict(request.query_params)
+    auth.set_request(request_store)
+    start_time: float = time.time()
+    try:
+        response: Response = await call_next(request)
+    finally:
+        auth.clear()
+    _ = time.time() - start_time
+    return response
+
+
+def build_app(legacy: bool) -> FastAPI:
+    """
+    build a minimal application with one of the middlewares
+    :param legacy: use the previous middleware
+    """
+    application = FastAPI()
+    if legacy:
+        application.middleware("http")(legacy_http_middleware)
+    else:
+        application.add_middleware(RequestContextMiddleware)
+
+    @application.post("/ping/{item_id}")
+    async def ping(item_id: int) -> Dict[str, Any]:
+        return {"item_id": item_id}
+
+    return application
+
+
+async def drive(application: FastAPI, count: int) -> float:
+    """
+    send requests straight through the ASGI interface
+    :param application: ASGI application
+    :param count: request count
+    :return: seconds per request
+    """
+    scope: Dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/ping/1",
+        "raw_path": b"/ping/1",
+        "query_string": b"a=1&b=2",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"x-forwarded-for", b"10.0.0.1"),
+        ]
+        + [(f"x-header-{_i}".encode(), b"value") for _i in range(10)],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    body: bytes = b'{"key": "' + b"v" * 2048 + b'"}'
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    start: float = time.perf_counter()
+    for _ in range(count):
+        await application(dict(scope), receive, send)
+    cost: float = time.perf_counter() - start
+    assert messages[0]["status"] == 200
+    return cost / count
+
+
+def main() -> None:
+    """
+    run benchmark
+    """
+    legacy_app: FastAPI = build_app(legacy=True)
+    asgi_app: FastAPI = build_app(legacy=False)
+    # warm up
+    asyncio.run(drive(legacy_app, 200))
+    asyncio.run(drive(asgi_app, 200))
+    legacy_cost: float = asyncio.run(drive(legacy_app, REQUEST_COUNT))
+    asgi_cost: float = asyncio.run(drive(asgi_app, REQUEST_COUNT))
+    print(
+        f"requests={REQUEST_COUNT} BaseHTTPMiddleware={legacy_cost * 1e6:8.1f}us "
+        f"pure ASGI={asgi_cost * 1e6:8.1f}us speedup={legacy_cost / asgi_cost:5.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Report the import time of the server entry modules and check it against the
+budget in benchmarks/import_budget.json
+
+Each module is imported in a fresh interpreter with -X importtime, the fastest
+of several runs is kept. The module count is exact and catches a heavy import
+slipping back in, the time budget is loose because it depends on the machine
+
+usage: python -m benchmarks.bench_import_time [module ...]
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+BUDGET_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+RUN_COUNT: int = 3
+TOP_COUNT: int = 15
+# import time:       343 |        343 |   api_server.resources.music
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+@dataclass
+class ImportRecord:
+    """
+    one line of -X importtime
+    """
+
+    name: str
+    # time of the module body itself [us]
+    self_us: int
+    # time including the modules it imports [us]
+    cumulative_us: int
+    # nesting depth
+    level: int
+
+
+@dataclass
+class ImportReport:
+    """
+    import time of one entry module
+    """
+
+    module: str
+    records: List[ImportRecord] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        """
+        total import time [ms]
+        """
+        return sum(_r.cumulative_us for _r in self.records if _r.level == 0) / 1000
+
+    @property
+    def module_count(self) -> int:
+        """
+        count of imported modules
+        """
+        return len(self.records)
+
+    def loaded(self, module: str) -> bool:
+        """
+        whether a module or one of its sub modules is imported
+        :param module: module name
+        """
+        return any(_r.name == module or _r.name.startswith(f"{module}.") for _r in self.records)
+
+
+def parse_import_time(output: str) -> List[ImportRecord]:
+    """
+    parse the stderr of python -X importtime
+    :param output: stderr
+    :return: records
+    """
+    records: List[ImportRecord] = []
+    for _line in output.splitlines():
+        match: Optional[re.Match] = IMPORT_TIME_PATTERN.match(_line)
+        if match is None:
+            continue
+        records.append(
+            ImportRecord(
+                name=match.group(4),
+                self_us=int(match.group(1)),
+                cumulative_us=int(match.group(2)),
+                # The name is indented by two spaces per level after one separator space
+                level=(len(match.group(3)) - 1) // 2,
+            )
+        )
+    return records
+
+
+def measure(module: str, run_count: int = RUN_COUNT) -> ImportReport:
+    """
+    import a module in fresh interpreters
+    :param module: module name
+    :param run_count: run count, the fastest run is kept
+    :return: ImportReport instance
+    """
+    best: Optional[ImportReport] = None
+    for _ in range(run_count):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+            check=False,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"failed to import {module}:\n{result.stderr[-2000:]}")
+        report: ImportReport = ImportReport(module, parse_import_time(result.stderr))
+        if best is None or report.total_ms < best.total_ms:
+            best = report
+    assert best is not None
+    return best
+
+
+def check_budget(report: ImportReport, budget: Dict[str, Any]) -> List[str]:
+    """
+    compare a report with its budget
+    :param report: ImportReport instance
+    :param budget: max_total_ms, max_modules and forbidden modules
+    :return: violations
+    """
+    violations: List[str] = []
+    if report.total_ms > budget.get("max_total_ms", float("inf")):
+        violations.append(f"import time {report.total_ms:.0f}ms > {budget['max_total_ms']}ms")
+    if report.module_count > budget.get("max_modules", sys.maxsize):
+        violations.append(f"module count {report.module_count} > {budget['max_modules']}")
+    for _module in budget.get("forbidden", []):
+        if report.loaded(_module):
+            violations.append(f"forbidden module {_module} is imported")
+    return violations
+
+
+def print_report(report: ImportReport) -> None:
+    """
+    print the slowest modules
+    :param report: ImportReport instance
+    """
+    print(f"{report.module}: {report.total_ms:.1f}ms, {report.module_count} modules")
+    print(f"  {'self [ms]':>10} {'cumulative [ms]':>16}  module")
+    slowest: List[ImportRecord] = sorted(report.records, key=lambda _r: _r.self_us, reverse=True)
+    for _record in slowest[:TOP_COUNT]:
+        print(
+            f"  {_record.self_us / 1000:>10.1f} {_record.cumulative_us / 1000:>16.1f}"
+            f"  {_record.name}"
+        )
+
+
+def main() -> None:
+    """
+    measure every budgeted module, exit 1 when a budget is exceeded
+    """
+    with open(BUDGET_PATH, encoding="utf-8") as f:
+        budgets: Dict[str, Dict[str, Any]] = json.load(f)
+    failed: bool = False
+    for _module in sys.argv[1:] or list(budgets):
+        report: ImportReport = measure(_module)
+        print_report(report)
+        for _violation in check_budget(report, budgets.get(_module, {})):
+            print(f"  OVER BUDGET: {_violation}")
+            failed = True
+        print()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
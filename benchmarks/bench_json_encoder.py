@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare json.dumps with JSONEncoderHandler and the orjson json_dumps on the
+nested config dataclasses
+
+usage: python -m benchmarks.bench_json_encoder
+"""
+
+import json
+import time
+from typing import Any, Callable
+
+import inject
+
+from infra.dependencies import Config
+from infra.handlers.json import JSONEncoderHandler, json_dumps
+
+ROUND_COUNT: int = 2000
+
+
+def measure(func: Callable[[], Any], count: int) -> float:
+    """
+    :param func: function to call
+    :param count: call count
+    :return: seconds per call
+    """
+    start: float = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def main() -> None:
+    """
+    run the benchmark
+    """
+    config: Config = inject.instance(Config)
+    assert json.loads(json.dumps(config, cls=JSONEncoderHandler)) == json.loads(json_dumps(config))
+    stdlib: float = measure(lambda: json.dumps(config, cls=JSONEncoderHandler), ROUND_COUNT)
+    stdlib_indent: float = measure(
+        lambda: json.dumps(config, cls=JSONEncoderHandler, indent=4), ROUND_COUNT
+    )
+    fast: float = measure(lambda: json_dumps(config), ROUND_COUNT)
+    fast_indent: float = measure(lambda: json_dumps(config, indent=True), ROUND_COUNT)
+    print(f"JSONEncoderHandler: {stdlib * 1e6:.1f}us, indent {stdlib_indent * 1e6:.1f}us")
+    print(f"json_dumps:         {fast * 1e6:.1f}us, indent {fast_indent * 1e6:.1f}us")
+    print(f"speedup:            {stdlib / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
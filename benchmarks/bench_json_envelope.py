@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the old CustomJsonRoute response path (render, orjson.loads, render again)
+with EnvelopeJSONResponse, which wraps the content before the only serialization
+
+usage: python -m benchmarks.bench_json_envelope
+"""
+
+import timeit
+from functools import partial
+from typing import Any, Dict, List
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from api_server.resources import EnvelopeJSONResponse
+from infra.utils import make_json_response
+
+
+def build_payload(size: int) -> List[Dict[str, Any]]:
+    """
+    build a list payload like the one returned by list apis
+    :param size: row count
+    """
+    return [
+        {
+            "id": _i,
+            "product_sku": f"sku-{_i}",
+            "demode": False,
+            "price_num": f"{_i:08d}",
+            "price": 400.0 + _i / 100,
+            "yesterday_price": 399.5,
+            "time": 1700000000000 + _i,
+            "create_time": "2024-01-01 00:00:00",
+        }
+        for _i in range(size)
+    ]
+
+
+def reparse_envelope(content: Any) -> bytes:
+    """
+    the previous implementation: encode, decode and encode again
+    """
+    response = JSONResponse(content)
+    data: Any = orjson.loads(response.body)
+    if "code" not in data:
+        response = ORJSONResponse(content=make_json_response(data=data))
+    return bytes(response.body)
+
+
+def single_envelope(content: Any) -> bytes:
+    """
+    the current implementation: serialize once
+    """
+    return bytes(EnvelopeJSONResponse(content).body)
+
+
+def main() -> None:
+    """
+    run benchmark
+    """
+    for size in (10, 1000, 10000):
+        payload = build_payload(size)
+        assert orjson.loads(reparse_envelope(payload)) == orjson.loads(single_envelope(payload))
+        number: int = max(10, 20000 // size)
+        old_cost: float = min(timeit.repeat(partial(reparse_envelope, payload), number=number))
+        new_cost: float = min(timeit.repeat(partial(single_envelope, payload), number=number))
+        print(
+            f"rows={size:<6} re-parse={old_cost / number * 1e6:10.1f}us "
+            f"single={new_cost / number * 1e6:10.1f}us speedup={old_cost / new_cost:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-process load test of every api route
+
+create_app() runs against local stand-ins [in-memory sqlite, fakeredis and an
+in-memory celery broker], each route is driven concurrently through the ASGI
+interface, so the numbers cover the middlewares, CustomJsonRoute and the
+services without any network. The rate limiter admits every request, a limited
+route would otherwise only measure its 429 response.
+
+Every run first times a fixed cpu-bound workload, the baseline saves it next to
+each route, so a baseline recorded on another machine is scaled by the ratio of
+the two calibration times before comparing. Results are compared with
+benchmarks/load_test_baseline.json, --update rewrites it
+
+usage: python -m benchmarks.bench_load_test [--requests 500] [--concurrency 16]
+                                            [--route demo] [--tolerance 0.5] [--update]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import fakeredis
+import httpx
+import inject
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from inject import Binder
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from infra.dependencies import Celery, Config, MainRDB, MainRedis, RateLimiter, instances_bind
+from infra.dependencies.celery import CeleryConfig, get_celery_by_config
+from infra.models import GoldPrice
+
+BASELINE_PATH: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "load_test_baseline.json"
+)
+# Requests sent to every route before measuring
+WARMUP_COUNT: int = 20
+# Value of every path parameter
+PATH_PARAM_VALUE: str = "1"
+# Body of every request that has one
+REQUEST_BODY: Dict[str, Any] = {"item_id": 1, "name": "benchmark"}
+PATH_PARAM_PATTERN = re.compile(r"\{[^}]+\}")
+# Runs of the calibration workload, the fastest one is kept
+CALIBRATION_REPEAT: int = 5
+
+
+class StandInRedis(fakeredis.FakeRedis, MainRedis):  # pylint: disable=R0901,W0223
+    """
+    in-memory redis with the MainRedis helpers
+    """
+
+
+class UnlimitedRateLimiter(RateLimiter):
+    """
+    rate limiter admitting every request from the local pre-check
+    """
+
+    def try_acquire_local(self, key: str, cost: float = 1) -> bool:
+        return True
+
+
+def create_stand_in_rdb() -> MainRDB:
+    """
+    in-memory sqlite database with the tables and a few rows
+    """
+    engine = create_engine(
+        "sqlite://",
+        # One shared connection, every thread sees the same in-memory database
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    main_rdb: MainRDB = MainRDB(engine)
+    main_rdb.generate_table()
+    now_ms: int = int(time.time() * 1000)
+    with main_rdb.get_session() as session:
+        session.add_all(
+            [
+                # sqlite only auto-increments INTEGER primary keys, the ids are explicit
+                GoldPrice(id=_i + 1, price=800 + _i, yesterday_price=800, time=now_ms - _i * 5000)
+                for _i in range(40)
+            ]
+        )
+        session.commit()
+    return main_rdb
+
+
+def bind_stand_ins(binder: Binder) -> None:
+    """
+    inject bind function, the production bindings with local stand-ins
+    :param binder: Binder instance
+    """
+    binder.install(instances_bind)
+    binder.bind_to_constructor(MainRDB, create_stand_in_rdb)
+    binder.bind_to_constructor(MainRedis, lambda: StandInRedis(decode_responses=True))
+    binder.bind_to_constructor(
+        RateLimiter, lambda: UnlimitedRateLimiter(inject.instance(MainRedis))
+    )
+    binder.bind_to_constructor(
+        Celery,
+        lambda: get_celery_by_config(
+            inject.instance(Config).PROJECT_NAME,
+            CeleryConfig(CELERY_BROKER="memory://", CELERY_BACKEND="cache+memory://"),
+            inject.instance(Config).ENV,
+        ),
+    )
+
+
+@dataclass
+class RouteCase:
+    """
+    one method of one route
+    """
+
+    name: str
+    method: str
+    url: str
+    body: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class RouteResult:
+    """
+    load test result of a route
+    """
+
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rps: float
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+
+def discover_routes(application: FastAPI, keyword: str = "") -> List[RouteCase]:
+    """
+    every api route of the application
+    :param application: FastAPI instance
+    :param keyword: only routes whose path contains it
+    """
+    cases: List[RouteCase] = []
+    for _route in application.routes:
+        if not isinstance(_route, APIRoute) or keyword not in _route.path:
+            continue
+        for _method in sorted(_route.methods - {"HEAD"}):
+            cases.append(
+                RouteCase(
+                    name=f"{_method} {_route.path}",
+                    method=_method,
+                    url=PATH_PARAM_PATTERN.sub(PATH_PARAM_VALUE, _route.path),
+                    body=REQUEST_BODY if _method in ("POST", "PUT", "PATCH") else None,
+                )
+            )
+    return cases
+
+
+def calibrate() -> float:
+    """
+    time a fixed cpu-bound workload, the speed of this machine
+    :return: fastest run [ms]
+    """
+    payload: Dict[str, Any] = {"items": [dict(REQUEST_BODY, index=_i) for _i in range(200)]}
+    best: float = float("inf")
+    for _ in range(CALIBRATION_REPEAT):
+        start: float = time.perf_counter()
+        for _ in range(200):
+            json.loads(json.dumps(payload))
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    nearest-rank percentile
+    :param values: sorted values
+    :param percent: 0 ~ 100
+    """
+    index: int = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+async def run_case(
+    client: httpx.AsyncClient, case: RouteCase, requests: int, concurrency: int
+) -> RouteResult:
+    """
+    send requests with a fixed number of concurrent clients
+    :param client: ASGI client
+    :param case: RouteCase instance
+    :param requests: request count
+    :param concurrency: concurrent client count
+    :return: RouteResult instance
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining: List[int] = [requests]
+
+    async def send() -> None:
+        start: float = time.perf_counter()
+        response: httpx.Response = await client.request(case.method, case.url, json=case.body)
+        latencies.append(time.perf_counter() - start)
+        statuses[str(response.status_code)] += 1
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await send()
+
+    for _ in range(WARMUP_COUNT):
+        await client.request(case.method, case.url, json=case.body)
+    start: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed: float = time.perf_counter() - start
+    latencies.sort()
+    return RouteResult(
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+        rps=round(len(latencies) / elapsed, 1),
+        statuses=dict(statuses),
+    )
+
+
+async def run(
+    application: FastAPI, cases: List[RouteCase], requests: int, concurrency: int
+) -> Dict[str, RouteResult]:
+    """
+    load test the routes one after another inside the application lifespan
+    :param application: FastAPI instance
+    :param cases: routes
+    :param requests: request count per route
+    :param concurrency: concurrent client count
+    """
+    results: Dict[str, RouteResult] = {}
+    transport: httpx.ASGITransport = httpx.ASGITransport(app=application)
+    async with application.router.lifespan_context(application):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for _case in cases:
+                results[_case.name] = await run_case(client, _case, requests, concurrency)
+    return results
+
+
+def compare(
+    results: Dict[str, RouteResult],
+    baseline: Dict[str, Dict[str, Any]],
+    calibration_ms: float,
+    tolerance: float,
+) -> List[str]:
+    """
+    find the routes slower than the baseline scaled to the speed of this machine
+    :param results: load test results
+    :param baseline: saved results
+    :param calibration_ms: calibration time of this run
+    :param tolerance: allowed slowdown, 0.5 means 50%
+    :return: regressions
+    """
+    regressions: List[str] = []
+    for _name, _result in results.items():
+        saved: Optional[Dict[str, Any]] = baseline.get(_name)
+        if saved is None:
+            continue
+        # > 1 when this machine is slower than the one that saved the baseline
+        scale: float = calibration_ms / saved.get("calibration_ms", calibration_ms)
+        p95_ms: float = round(saved["p95_ms"] * scale, 3)
+        rps: float = round(saved["rps"] / scale, 1)
+        if _result.p95_ms > p95_ms * (1 + tolerance):
+            regressions.append(f"{_name}: p95 {_result.p95_ms}ms > baseline {p95_ms}ms")
+        if _result.rps < rps / (1 + tolerance):
+            regressions.append(f"{_name}: {_result.rps} req/s < baseline {rps} req/s")
+    return regressions
+
+
+def main() -> None:
+    """
+    run the load test, exit 1 when a route regressed
+    """
+    parser = argparse.ArgumentParser(description="in-process load test of every api route")
+    parser.add_argument("--requests", type=int, default=500, help="request count per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client count")
+    parser.add_argument("--route", default="", help="only routes whose path contains it")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown")
+    parser.add_argument("--update", action="store_true", help="rewrite the baseline")
+    args = parser.parse_args()
+
+    # One line per request would be logged and measured
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    inject.clear_and_configure(bind_stand_ins, bind_in_runtime=False, allow_override=True)
+    # The app modules resolve their dependencies at import, after the stand-ins are bound
+    from api_server.fastapi_app import create_app  # pylint: disable=C0415
+
+    calibration_ms: float = calibrate()
+    print(f"calibration: {calibration_ms}ms")
+    application: FastAPI = create_app()
+    cases: List[RouteCase] = discover_routes(application, args.route)
+    results: Dict[str, RouteResult] = asyncio.run(
+        run(application, cases, args.requests, args.concurrency)
+    )
+
+    print(f"{'route':<50} {'p50 [ms]':>9} {'p95 [ms]':>9} {'p99 [ms]':>9} {'req/s':>9}  status")
+    for _name, _result in results.items():
+        print(
+            f"{_name:<50} {_result.p50_ms:>9.2f} {_result.p95_ms:>9.2f} {_result.p99_ms:>9.2f}"
+            f" {_result.rps:>9.0f}  {_result.statuses}"
+        )
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.update:
+        baseline.update(
+            {
+                _name: dict(asdict(_result), calibration_ms=calibration_ms)
+                for _name, _result in results.items()
+            }
+        )
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {BASELINE_PATH}")
+        return
+    regressions: List[str] = compare(results, baseline, calibration_ms, args.tolerance)
+    for _regression in regressions:
+        print(f"REGRESSION: {_regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measure the cost of a log call in the calling thread, with the handlers called
+directly and behind the queue listener, on a normal and on a stalled file
+
+usage: python -m benchmarks.bench_logging
+"""
+
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from infra.handlers.logging import JSONFormatter, TraceIdFormatter
+from infra.handlers.logging.queue import start_queue_logging, stop_queue_logging
+
+RECORD_COUNT: int = 20000
+# Write delay of the stalled file [seconds]
+STALL: float = 0.0005
+
+
+class StalledFileHandler(RotatingFileHandler):
+    """
+    file handler on a slow disk
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(STALL)
+        super().emit(record)
+
+
+def measure(logger: logging.Logger, count: int) -> float:
+    """
+    :param logger: logger to call
+    :param count: record count
+    :return: seconds per call
+    """
+    start: float = time.perf_counter()
+    for _i in range(count):
+        logger.info("get request, content is %s", {"item_id": _i, "name": "benchmark"})
+    return (time.perf_counter() - start) / count
+
+
+def main() -> None:
+    """
+    compare direct and queued logging with both formatters
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for _formatter in (TraceIdFormatter("[T-%(trace_id)s] %(message)s"), JSONFormatter()):
+            for _handler_class in (RotatingFileHandler, StalledFileHandler):
+                name: str = f"{type(_formatter).__name__} {_handler_class.__name__}"
+                logger: logging.Logger = logging.getLogger(f"benchmark.{name}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                handler = _handler_class(
+                    os.path.join(directory, "info.log"), maxBytes=1048576, backupCount=1
+                )
+                handler.setFormatter(_formatter)
+                logger.handlers = [handler]
+                count: int = RECORD_COUNT if _handler_class is RotatingFileHandler else 1000
+                direct: float = measure(logger, count)
+                start_queue_logging([logger], queue_size=count)
+                queued: float = measure(logger, count)
+                stop_queue_logging()
+                handler.close()
+                print(f"{name}: direct {direct * 1e6:.1f}us/call, queued {queued * 1e6:.1f}us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measure the per-request recording cost of MetricsMiddleware
+
+usage: python -m benchmarks.bench_metrics_middleware
+"""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from starlette.types import Message, Receive, Scope, Send
+
+from infra.middlewares import MetricsMiddleware
+
+REQUEST_COUNT: int = 100000
+
+
+class Route:
+    """
+    stand-in for the matched route
+    """
+
+    path: str = "/ping/{item_id}"
+
+
+async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    bare ASGI endpoint, so only the middleware is measured
+    """
+    scope["route"] = Route
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"OK"})
+
+
+async def drive(application: Any, count: int) -> float:
+    """
+    send requests straight through the ASGI interface
+    :param application: ASGI application
+    :param count: request count
+    :return: seconds per request
+    """
+    scope: Dict[str, Any] = {"type": "http", "method": "GET", "path": "/ping/1"}
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message: Message) -> None:
+        return None
+
+    start: float = time.perf_counter()
+    for _ in range(count):
+        await application(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+
+def main() -> None:
+    """
+    run benchmark
+    """
+    middleware: MetricsMiddleware = MetricsMiddleware(endpoint)
+    # warm up
+    asyncio.run(drive(endpoint, 1000))
+    asyncio.run(drive(middleware, 1000))
+    bare_cost: float = asyncio.run(drive(endpoint, REQUEST_COUNT))
+    metrics_cost: float = asyncio.run(drive(middleware, REQUEST_COUNT))
+    print(
+        f"requests={REQUEST_COUNT} bare={bare_cost * 1e6:6.2f}us "
+        f"with metrics={metrics_cost * 1e6:6.2f}us "
+        f"overhead={(metrics_cost - bare_cost) * 1e6:6.2f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
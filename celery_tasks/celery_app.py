@@ -5,10 +5,35 @@
 Celery app module
 """
 
+import contextvars
 import logging
+from typing import Any, Dict
 
 import inject
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
+
+from infra.dependencies.rdb import close_statement_scope, open_statement_scope
 
 logger = logging.getLogger(__name__)
 celery_app: Celery = inject.instance(Celery)
+# task id: statement scope token
+_statement_scopes: Dict[str, contextvars.Token] = {}
+
+
+@task_prerun.connect
+def open_task_statement_scope(task_id: str, task: Any, **_: Any) -> None:
+    """
+    count the statements of each task
+    """
+    _statement_scopes[task_id] = open_statement_scope(task.name)
+
+
+@task_postrun.connect
+def close_task_statement_scope(task_id: str, **_: Any) -> None:
+    """
+    log the statement count of the task with its trace id
+    """
+    token: Any = _statement_scopes.pop(task_id, None)
+    if token is not None:
+        close_statement_scope(token)
@@ -17,15 +17,25 @@ from redis_lock import Lock
 from sqlalchemy import desc
 from work_wechat import MsgType, TextCard
 
-from infra.dependencies import Config, GoldWorkWeChat, MainRDB, MainRedis, Registry
+from infra.dependencies import (
+    Config,
+    GoldWorkWeChat,
+    MainRDB,
+    MainRedis,
+    Registry,
+    ResponseCache,
+    SingleFlightTask,
+)
+from infra.dependencies.redis_client import hash_tag
 from infra.enums.gold import GoldPriceState
 from infra.models import GoldPrice
+from infra.services.gold import GOLD_PRICE_CACHE_TAG
 
 logger = logging.getLogger(__name__)
 celery_app: Celery = inject.instance(Celery)
 
 
-@celery_app.task(ignore_result=True, time_limit=600)
+@celery_app.task(base=SingleFlightTask, ignore_result=True, time_limit=600)
 def sync_gold_price() -> None:
     """
     同步黄金价格
@@ -55,7 +65,10 @@ def sync_gold_price() -> None:
     gold_price_info: Dict[str, Any] = response_data["resultData"]["datas"]
     gold_price_id: int = int(gold_price_info["id"])
     # 加分布式🔒, 并发插入id可能相同
-    lock_key: str = f"sync-gold-price-lock:{config.PROJECT_NAME}-{config.ENV.value}-{gold_price_id}"
+    # The lock and its signal key share the hash tag, one cluster slot
+    lock_key: str = hash_tag(
+        "sync-gold-price-lock", f"{config.PROJECT_NAME}-{config.ENV.value}-{gold_price_id}"
+    )
     # 获取redis
     redis_cache: MainRedis = inject.instance(MainRedis)
     lock = Lock(redis_cache, lock_key)
@@ -79,6 +92,8 @@ def sync_gold_price() -> None:
                 session.add(gold_price)
                 session.commit()
                 logger.info(f"current gold price is {gold_price.price} ..........")
+            # Drop the cached gold price apis
+            inject.instance(ResponseCache).invalidate_tags(GOLD_PRICE_CACHE_TAG)
         except Exception as e:
             logger.error("failed to do migrate", exc_info=True)
             raise e
@@ -96,6 +111,7 @@ def get_notify_cache_key(notify_key: GoldPriceState) -> str:
     """
     # 获取配置
     config: Config = inject.instance(Config)
+    # Only read and written on its own, no hash tag, existing counters keep their key
     return f"{config.PROJECT_NAME}-{config.ENV.value}-{notify_key}"
 
 
@@ -110,7 +126,8 @@ def skip_notify(notify_key: GoldPriceState) -> Tuple[bool, int]:
     config: Config = inject.instance(Config)
     cache_key: str = get_notify_cache_key(notify_key)
     # 获得重复推送次数
-    _cache_count: Optional[str] = redis_client.get(cache_key)
+    # Read on every tick, written only when a notification is sent
+    _cache_count: Optional[str] = redis_client.cached_get(cache_key)
     _notify_times: int = int(_cache_count) if _cache_count else 0
     if _notify_times >= config.GOLD_CONFIG.DUPLICATE_NOTIFY_TIMES:
         return True, _notify_times
@@ -131,7 +148,7 @@ def save_notify_times(notify_key: GoldPriceState, notify_times: int) -> None:
     redis_client.set(cache_key, notify_times, config.GOLD_CONFIG.DUPLICATE_NOTIFY_TIME_LIMIT)
 
 
-@celery_app.task(ignore_result=True, time_limit=600)
+@celery_app.task(base=SingleFlightTask, ignore_result=True, time_limit=600)
 def gold_price_remind() -> None:
     """
     黄金价格上涨提醒
@@ -143,7 +160,7 @@ def gold_price_remind() -> None:
     wechat: GoldWorkWeChat = inject.instance(GoldWorkWeChat)
 
     # 查询数据
-    with inject.instance(MainRDB).get_session() as session:
+    with inject.instance(MainRDB).get_read_session() as session:
         gold_price_ls: List[GoldPrice] = (
             session.query(GoldPrice)
             .order_by(desc(GoldPrice.time))
@@ -11,7 +11,7 @@ from uuid import uuid4
 import inject
 from celery import Celery
 
-from infra.dependencies import Config, Registry
+from infra.dependencies import Config, Registry, SingleFlightTask
 from infra.services.music.youtube import YouTubeMusic
 from infra.utils.network import check_port
 
@@ -19,7 +19,7 @@ logger = logging.getLogger(__name__)
 celery_app: Celery = inject.instance(Celery)
 
 
-@celery_app.task(ignore_result=True, time_limit=600)
+@celery_app.task(base=SingleFlightTask, ignore_result=True, time_limit=600)
 def sync_play_list() -> None:
     """
     黄金价格上涨提醒
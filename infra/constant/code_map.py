@@ -28,5 +28,6 @@ CODE_MAP = {
     StatusCode.WEB_APP_PERMISSION_DENIED: "Permission denied",
     StatusCode.WEB_APP_INVALID_TOKEN: "Invalid token",
     StatusCode.WEB_APP_AUTHORIZED_FAIL: "Authorized failed",
+    StatusCode.WEB_APP_TOO_MANY_REQUESTS: "Too many requests",
     StatusCode.SUCCESS: "success",
 }
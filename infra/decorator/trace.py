@@ -6,6 +6,7 @@ TraceId module
 """
 
 import functools
+import inspect
 import logging
 from abc import ABCMeta, abstractmethod
 from typing import Any, Callable, Optional
@@ -47,6 +48,22 @@ class ITrace(metaclass=ABCMeta):
         """
 
         def wrapper_outer(func: Callable) -> Any:
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs) -> Any:  # type: ignore[no-untyped-def]
+                    """
+                    :param args:
+                    :param kwargs:
+                    :return:
+                    """
+                    logger.debug(f"user_kwargs is {user_kwargs}.")
+                    # set trace id
+                    inject.instance(Registry).set_trace_id(cls.trace_id(*args, **kwargs))
+                    return await func(*args, **kwargs)
+
+                return async_wrapper
+
             @functools.wraps(func)
             def wrapper(*args, **kwargs) -> Any:  # type: ignore[no-untyped-def]
                 """
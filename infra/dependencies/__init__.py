@@ -6,12 +6,33 @@ manager all 3rd part dependency
 """
 
 import logging
+from functools import partial
+from typing import Optional
 
+import inject
 from inject import Binder, autoparams
 from work_wechat import WorkWeChat
 
-from infra.dependencies.auth import Auth, AuthStore, RequestStore, get_auth_by_config
-from infra.dependencies.celery import Celery, get_celery_by_config
+from infra.dependencies.async_redis_client import (
+    AsyncLock,
+    AsyncMainRedis,
+    get_async_main_redis_by_config,
+)
+from infra.dependencies.auth import (
+    Auth,
+    AuthStore,
+    BaseRequestStore,
+    RequestStore,
+    get_auth_by_config,
+)
+from infra.dependencies.celery import (
+    Celery,
+    SingleFlightTask,
+    get_beat_lock_status,
+    get_celery_by_config,
+    get_single_flight_skips,
+    ping_broker,
+)
 from infra.dependencies.config import (
     ClashConfig,
     ClashSubscribeIetm,
@@ -21,10 +42,14 @@ from infra.dependencies.config import (
     bind_config,
 )
 from infra.dependencies.migration import Migration, get_migration_instance
+from infra.dependencies.rate_limit import RateLimiter, get_rate_limiter
 from infra.dependencies.rdb import MainRDB, get_main_rdb_by_config
 from infra.dependencies.redis_client import MainRedis, Redis, get_main_redis_by_config
 from infra.dependencies.registry import Registry, bind_registry
+from infra.dependencies.response_cache import CachePolicy, ResponseCache, get_response_cache
 from infra.enums import RuntimeEnv
+from infra.utils.health import HealthChecker
+from infra.utils.sampler import SystemSampler
 
 __all__ = (
     "instances_bind",
@@ -34,14 +59,23 @@ __all__ = (
     "HospitalReserveConfig",
     "YouTubeSubscribeConfig",
     "Celery",
+    "SingleFlightTask",
     "MainRDB",
     "MainRedis",
     "Redis",
+    "AsyncMainRedis",
+    "AsyncLock",
     "Auth",
+    "BaseRequestStore",
     "RequestStore",
     "AuthStore",
     "Registry",
     "Migration",
+    "RateLimiter",
+    "CachePolicy",
+    "ResponseCache",
+    "SystemSampler",
+    "HealthChecker",
     "GoldWorkWeChat",
     "HospitalWorkWeChat",
     "MusicWorkWeChat",
@@ -86,6 +120,14 @@ def bind_main_redis(_config: Config) -> MainRedis:
     return get_main_redis_by_config(_config.REDIS_DATASOURCE_CONFIG)
 
 
+@autoparams()
+def bind_async_main_redis(_config: Config) -> AsyncMainRedis:
+    """
+    :return: AsyncMainRedis instance, it shares the config of MainRedis
+    """
+    return get_async_main_redis_by_config(_config.REDIS_DATASOURCE_CONFIG)
+
+
 @autoparams()
 def bind_migration(_config: Config, _main_rdb: MainRDB) -> Migration:
     """
@@ -99,7 +141,84 @@ def bind_auth(_config: Config) -> Auth:
     """
     :return: Auth instance
     """
-    return get_auth_by_config(_config.AUTH_CONFIG, auth_role=_config.ENV != RuntimeEnv.DEVELOPMENT)
+    # The shared user cache is opt-in, do not touch redis otherwise
+    redis_client: Optional[MainRedis] = (
+        inject.instance(MainRedis) if _config.AUTH_CONFIG.USER_CACHE_TTL > 0 else None
+    )
+    return get_auth_by_config(
+        _config.AUTH_CONFIG,
+        auth_role=_config.ENV != RuntimeEnv.DEVELOPMENT,
+        redis_client=redis_client,
+    )
+
+
+@autoparams()
+def bind_rate_limiter(_config: Config, _main_redis: MainRedis) -> RateLimiter:
+    """
+    :return: RateLimiter instance
+    """
+    return get_rate_limiter(
+        _main_redis,
+        prefix=f"rate-limit:{_config.PROJECT_NAME}-{_config.ENV.value}",
+        # Every worker may spend its part of the remaining tokens locally
+        local_share=1 / max(_config.SERVER_WORKER, 1),
+        local_ttl=_config.RATE_LIMIT_LOCAL_TTL,
+    )
+
+
+@autoparams()
+def bind_response_cache(_config: Config, _main_redis: MainRedis) -> ResponseCache:
+    """
+    :return: ResponseCache instance
+    """
+    return get_response_cache(
+        _main_redis,
+        # No hash tag, the entries spread over the cluster slots, each tag set has its own
+        prefix=f"response-cache:{_config.PROJECT_NAME}-{_config.ENV.value}",
+        local_size=_config.RESPONSE_CACHE_LOCAL_SIZE,
+        local_ttl=_config.RESPONSE_CACHE_LOCAL_TTL,
+    )
+
+
+@autoparams()
+def bind_system_sampler(
+    _config: Config, _main_rdb: MainRDB, _main_redis: MainRedis
+) -> SystemSampler:
+    """
+    :return: SystemSampler instance, started by each worker
+    """
+    sampler: SystemSampler = SystemSampler(
+        interval=_config.SAMPLER_INTERVAL, size=_config.SAMPLER_SIZE
+    )
+    sampler.register_pool_probe("mysql", _main_rdb.pool_status)
+    sampler.register_pool_probe("redis", _main_redis.pool_status)
+    return sampler
+
+
+@autoparams()
+def bind_health_checker(
+    _config: Config, _main_rdb: MainRDB, _main_redis: MainRedis, _celery: Celery
+) -> HealthChecker:
+    """
+    :return: HealthChecker instance, started by each worker
+    """
+    checker: HealthChecker = HealthChecker(
+        interval=_config.HEALTH_CHECK_INTERVAL, timeout=_config.HEALTH_CHECK_TIMEOUT
+    )
+    checker.register_probe("mysql", _main_rdb.ping)
+    checker.register_probe("redis", _main_redis.ping)
+    # The api server keeps serving reads without the task queue
+    checker.register_probe(
+        "celery_broker", partial(ping_broker, _celery, _config.HEALTH_CHECK_TIMEOUT), critical=False
+    )
+    checker.register_probe("celery_beat", partial(get_beat_lock_status, _celery), critical=False)
+    # Runs of SingleFlightTask skipped because the previous one was still running
+    checker.register_probe(
+        "celery_single_flight",
+        partial(get_single_flight_skips, _celery, _main_redis),
+        critical=False,
+    )
+    return checker
 
 
 @autoparams()
@@ -145,9 +264,14 @@ def instances_bind(binder: Binder) -> None:
     binder.bind_to_constructor(Celery, bind_celery)
     binder.bind_to_constructor(MainRDB, bind_main_rdb)
     binder.bind_to_constructor(MainRedis, bind_main_redis)
+    binder.bind_to_constructor(AsyncMainRedis, bind_async_main_redis)
     binder.bind_to_constructor(Migration, bind_migration)
     binder.bind_to_constructor(Auth, bind_auth)
     binder.bind_to_constructor(Registry, bind_registry)
+    binder.bind_to_constructor(RateLimiter, bind_rate_limiter)
+    binder.bind_to_constructor(ResponseCache, bind_response_cache)
+    binder.bind_to_constructor(SystemSampler, bind_system_sampler)
+    binder.bind_to_constructor(HealthChecker, bind_health_checker)
     binder.bind_to_constructor(GoldWorkWeChat, init_gold_work_wechat)
     binder.bind_to_constructor(MusicWorkWeChat, init_music_work_wechat)
     binder.bind_to_constructor(HospitalWorkWeChat, init_hospital_work_wechat)
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+"""
+dependency: asyncio redis component for the api event loop
+"""
+
+import asyncio
+import logging
+import time
+from types import TracebackType
+from typing import Any, Dict, Optional, Type, cast
+from uuid import uuid4
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis_lock import (
+    EXTEND_SCRIPT,
+    UNLOCK_SCRIPT,
+    AlreadyAcquired,
+    InvalidTimeout,
+    NotAcquired,
+    NotExpirable,
+    TimeoutNotUsable,
+    TimeoutTooLarge,
+)
+
+from infra.dependencies.redis_client import RedisConfig, parse_addresses
+from infra.enums import RedisMode
+
+__all__ = [
+    "get_async_main_redis_by_config",
+    "AsyncLock",
+    "AsyncMainRedis",
+]
+
+logger = logging.getLogger(__name__)
+
+# Longest blpop on the lock signal, it stays below the socket timeout
+LOCK_SIGNAL_WAIT: int = 1
+
+
+class AsyncMainRedis(Redis):  # pylint: disable=R0901,W0223
+    """
+    asyncio counterpart of MainRedis, one pool per process and event loop
+    """
+
+    def pool_status(self) -> Dict[str, int]:
+        """
+        connection pool usage
+        """
+        pool: Any = self.connection_pool
+        # pylint: disable=W0212
+        available: int = len(pool._available_connections)
+        in_use: int = len(pool._in_use_connections)
+        return {
+            "max_connections": pool.max_connections,
+            "created": available + in_use,
+            "in_use": in_use,
+            "available": available,
+        }
+
+
+class AsyncLock:
+    """
+    asyncio distributed lock, the same keys and scripts as redis_lock.Lock
+    so sync and async code can exclude each other
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        redis_client: Redis,
+        name: str,
+        *,
+        expire: Optional[int] = None,
+        id: Optional[str] = None,  # pylint: disable=W0622
+        auto_renewal: bool = False,
+        signal_expire: int = 1000,
+    ) -> None:
+        """
+        init method
+        :param redis_client: asyncio redis client
+        :param name: lock name, see hash_tag for a cluster
+        :param expire: lock timeout [seconds], None never expires
+        :param id: lock owner, a random id by default
+        :param auto_renewal: extend the lock every 2/3 of expire while it is held
+        :param signal_expire: lifetime of the release signal [milliseconds]
+        """
+        if auto_renewal and expire is None:
+            raise ValueError("Expire may not be None when auto_renewal is set")
+        if expire is not None and int(expire) < 0:
+            raise ValueError("A negative expire is not acceptable.")
+        self._client: Any = redis_client
+        self._name: str = f"lock:{name}"
+        self._signal: str = f"lock-signal:{name}"
+        self._expire: Optional[int] = int(expire) if expire else None
+        self._id: str = id or uuid4().hex
+        self._signal_expire = signal_expire
+        self._renewal_interval: Optional[float] = (
+            self._expire * 2 / 3 if auto_renewal and self._expire else None
+        )
+        self._renewal_task: Optional[asyncio.Task] = None
+        self._unlock_script: Any = redis_client.register_script(UNLOCK_SCRIPT)
+        self._extend_script: Any = redis_client.register_script(EXTEND_SCRIPT)
+
+    @property
+    def id(self) -> str:  # pylint: disable=C0103
+        """
+        lock owner
+        """
+        return self._id
+
+    async def get_owner_id(self) -> Optional[str]:
+        """
+        owner of the lock, None when it is free
+        """
+        owner: Any = await self._client.get(self._name)
+        if isinstance(owner, bytes):
+            return owner.decode("ascii", "replace")
+        return cast(Optional[str], owner)
+
+    async def locked(self) -> bool:
+        """
+        whether anyone holds the lock
+        """
+        return bool(await self._client.exists(self._name))
+
+    async def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        :param blocking: wait until the lock is released
+        :param timeout: longest wait [seconds], None waits forever
+        :return: whether the lock was acquired
+        """
+        if self._renewal_task is not None:
+            raise AlreadyAcquired("Already acquired from this Lock instance.")
+        if not blocking and timeout is not None:
+            raise TimeoutNotUsable("Timeout cannot be used if blocking=False")
+        if timeout is not None:
+            if timeout < 0:
+                raise InvalidTimeout(f"Timeout ({timeout}) cannot be less than or equal to 0")
+            if self._expire and not self._renewal_interval and timeout > self._expire:
+                raise TimeoutTooLarge(
+                    f"Timeout ({timeout}) cannot be greater than expire ({self._expire})"
+                )
+        deadline: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        while not await self._client.set(self._name, self._id, nx=True, ex=self._expire):
+            if not blocking:
+                logger.warning(f"Failed to acquire Lock({self._name!r}).")
+                return False
+            wait: float = LOCK_SIGNAL_WAIT
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            # Woken by the release signal, polls again after the wait in case it was missed
+            await self._client.blpop([self._signal], max(wait, 0.01))
+        if self._renewal_interval is not None:
+            self._renewal_task = asyncio.create_task(self._renew())
+        return True
+
+    async def extend(self, expire: Optional[int] = None) -> None:
+        """
+        :param expire: new lock timeout [seconds], the one of init by default
+        """
+        if expire:
+            expire = int(expire)
+            if expire < 0:
+                raise ValueError("A negative expire is not acceptable.")
+        elif self._expire is not None:
+            expire = self._expire
+        else:
+            raise TypeError(
+                "To extend a lock 'expire' must be provided as an argument to extend() "
+                "method or at initialization time."
+            )
+        error: int = await self._extend_script(
+            keys=[self._name, self._signal], args=[self._id, expire]
+        )
+        if error == 1:
+            raise NotAcquired(f"Lock {self._name} is not acquired or it already expired.")
+        if error == 2:
+            raise NotExpirable(f"Lock {self._name} has no assigned expiration time")
+        if error:
+            raise RuntimeError(f"Unsupported error code {error} from EXTEND script")
+
+    async def release(self) -> None:
+        """
+        release the lock acquired by this instance, waiters are signalled
+        """
+        if self._renewal_task is not None:
+            self._renewal_task.cancel()
+            self._renewal_task = None
+        error: int = await self._unlock_script(
+            keys=[self._name, self._signal], args=[self._id, self._signal_expire]
+        )
+        if error == 1:
+            raise NotAcquired(f"Lock({self._name}) is not acquired or it already expired.")
+        if error:
+            raise RuntimeError(f"Unsupported error code {error} from UNLOCK script.")
+
+    async def _renew(self) -> None:
+        """
+        extend the lock until it is released
+        """
+        interval: float = cast(float, self._renewal_interval)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.extend()
+            except NotAcquired:
+                logger.warning(f"Lock({self._name!r}) expired before it was renewed")
+                return
+            # pylint: disable=W0703
+            except Exception:
+                logger.warning(f"failed to renew Lock({self._name!r})", exc_info=True)
+
+    async def __aenter__(self) -> "AsyncLock":
+        await self.acquire(blocking=True)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.release()
+
+
+def get_async_main_redis_by_config(config: RedisConfig) -> AsyncMainRedis:
+    """
+    asyncio client of the server of get_main_redis_by_config, with its own pool
+    Connections belong to the event loop that opened them, create it in the worker process
+    :param config: RedisConfig instance
+    :return: AsyncMainRedis instance, a RedisCluster in cluster mode
+    """
+    mode: RedisMode = RedisMode(config.MODE.lower())
+    connection_kwargs: Dict[str, Any] = {
+        "password": config.PASSWORD or None,
+        "decode_responses": config.DECODE_RESPONSES,
+        "socket_timeout": config.SOCKET_TIMEOUT,
+        "socket_connect_timeout": config.SOCKET_CONNECT_TIMEOUT,
+        "socket_keepalive": config.SOCKET_KEEPALIVE,
+    }
+    if mode is RedisMode.CLUSTER:
+        # The cluster client has the command api of AsyncMainRedis
+        return cast(
+            AsyncMainRedis,
+            RedisCluster(
+                startup_nodes=[
+                    ClusterNode(_host, _port)
+                    for _host, _port in parse_addresses(config.CLUSTER_NODES)
+                ],
+                max_connections=config.MAX_CONNECTIONS,
+                **connection_kwargs,
+            ),
+        )
+    connection_kwargs.update(db=config.DATABASE, health_check_interval=config.HEALTH_CHECK_INTERVAL)
+    if mode is RedisMode.SENTINEL:
+        sentinel: Sentinel = Sentinel(  # type: ignore[no-untyped-call]
+            parse_addresses(config.SENTINELS),
+            sentinel_kwargs={
+                "password": config.SENTINEL_PASSWORD or None,
+                "socket_timeout": config.SOCKET_TIMEOUT,
+                "socket_connect_timeout": config.SOCKET_CONNECT_TIMEOUT,
+            },
+        )
+        # The asyncio sentinel pool does not block, callers beyond MAX_CONNECTIONS fail at once
+        return cast(
+            AsyncMainRedis,
+            sentinel.master_for(
+                config.SENTINEL_SERVICE,
+                redis_class=AsyncMainRedis,
+                connection_pool_class=SentinelConnectionPool,
+                max_connections=config.MAX_CONNECTIONS,
+                **connection_kwargs,
+            ),
+        )
+    pool: BlockingConnectionPool = BlockingConnectionPool(
+        max_connections=config.MAX_CONNECTIONS,
+        # The pool waits with asyncio.timeout, fractions of a second work
+        timeout=config.POOL_TIMEOUT,  # type: ignore[arg-type]
+        host=config.HOST,
+        port=config.PORT,
+        **connection_kwargs,
+    )
+    instance: AsyncMainRedis = AsyncMainRedis(connection_pool=pool)
+    return instance
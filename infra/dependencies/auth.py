@@ -7,10 +7,16 @@ dependencies: auth component
 
 import contextvars
 import functools
+import hashlib
 import logging
 import threading
+import time
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Union
+
+import jwt
+import orjson
+from redis import Redis, RedisError
 
 from infra.exceptions import (
     AuthenticationFailed,
@@ -21,18 +27,21 @@ from infra.exceptions import (
     PermissionDenied,
 )
 from infra.utils import decode_token
+from infra.utils.cache import LRUCache
 
 __all__ = [
+    "BaseRequestStore",
     "RequestStore",
     "AuthStore",
     "Auth",
     "get_auth_by_config",
     "AuthConfig",
+    "VerifiedToken",
 ]
 logger = logging.getLogger(__name__)
 # Define context to store http request object data
-request_store: contextvars.ContextVar[Optional["RequestStore"]] = contextvars.ContextVar(
-    "request_store"
+request_store: contextvars.ContextVar[Optional[Union["RequestStore", "BaseRequestStore"]]] = (
+    contextvars.ContextVar("request_store")
 )
 
 
@@ -48,6 +57,66 @@ class AuthConfig:
     JWT_EXPIRE_TIME: int = 86400
     # jwt token secret key
     JWT_SECRET_KEY: str = ""
+    # Verified token cache size per process [0 disables the cache]
+    TOKEN_CACHE_SIZE: int = 4096
+    # How long a verified token is trusted without calling the handlers again [seconds]
+    # also the longest time other processes may miss a logout or a role change
+    TOKEN_CACHE_TTL: int = 60
+    # Redis cache TTL of user info and roles shared by processes [seconds, 0 disables]
+    # user info must be JSON serializable, it is returned decoded from JSON on a hit
+    USER_CACHE_TTL: int = 0
+    # jwt claim identifying the user, used to invalidate every token of a user
+    USER_ID_CLAIM: str = "user_id"
+    # Redis key prefix of the user cache
+    USER_CACHE_PREFIX: str = "auth:user"
+
+
+class BaseRequestStore:
+    """
+    http request info read on access, LazyRequestStore reads it from the ASGI scope
+    RequestStore holds the same fields as plain values, it does not inherit the
+    read-only properties, they would shadow its dataclass fields
+    """
+
+    @property
+    def client_ip(self) -> str:
+        """user ip"""
+        raise NotImplementedError
+
+    @property
+    def base_url(self) -> str:
+        """base url"""
+        raise NotImplementedError
+
+    @property
+    def url(self) -> str:
+        """full url"""
+        raise NotImplementedError
+
+    @property
+    def method(self) -> str:
+        """http method"""
+        raise NotImplementedError
+
+    @property
+    def header(self) -> str:
+        """http headers"""
+        raise NotImplementedError
+
+    @property
+    def body(self) -> bytes:
+        """http body"""
+        raise NotImplementedError
+
+    @property
+    def path_params(self) -> Dict[str, Any]:
+        """path params"""
+        raise NotImplementedError
+
+    @property
+    def query_params(self) -> Dict[str, Any]:
+        """query params"""
+        raise NotImplementedError
 
 
 @dataclass
@@ -80,20 +149,58 @@ class AuthStore:
     user_info: Any
 
 
+@dataclass
+class VerifiedToken:
+    """
+    verified token cache entry
+    """
+
+    # jwt object
+    jwt_obj: Dict[str, Any]
+    # user info
+    user_info: Any
+    # user id claim value
+    user_id: Any = None
+    # user roles, filled on first role check
+    roles: Optional[List[str]] = None
+
+
+def hash_token(token: str) -> str:
+    """
+    cache key of a token, the raw token never becomes a key
+    :param token: jwt token
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 class Auth:
     """
     Auth dependencies
     support role based permission check
+    Verified tokens are kept in a per-process LRU cache until the earlier of
+    exp and TOKEN_CACHE_TTL, user info and roles can be shared through Redis
     """
 
-    def __init__(self, config: AuthConfig, auth_role: bool = False):
+    def __init__(
+        self, config: AuthConfig, auth_role: bool = False, redis_client: Optional[Redis] = None
+    ):
         """
         init method
         :param config:
+        :param auth_role:
+        :param redis_client: redis client of the shared user cache
         """
         self.jwt_secret = config.JWT_SECRET_KEY
         self.jwt_expire_time = config.JWT_EXPIRE_TIME
         self.auth_role = auth_role
+        self.token_cache_ttl = config.TOKEN_CACHE_TTL
+        self.user_cache_ttl = config.USER_CACHE_TTL
+        self.user_id_claim = config.USER_ID_CLAIM
+        self.user_cache_prefix = config.USER_CACHE_PREFIX
+        # Verified token cache
+        self.token_cache: LRUCache[VerifiedToken] = LRUCache(config.TOKEN_CACHE_SIZE)
+        # Shared user cache, disabled without redis or ttl
+        self.redis_client: Optional[Redis] = redis_client if config.USER_CACHE_TTL > 0 else None
         # Store tokens and decouple from frameworks
         self.registry = threading.local()
         # Get the user role handler
@@ -191,21 +298,23 @@ class Auth:
         """
         return getattr(self.registry, "token", None)
 
-    def set_request(self, request: RequestStore) -> None:
+    def set_request(self, request: Union[RequestStore, BaseRequestStore]) -> None:
         """
         Set request, this operation is done in before request
         Used to save user request information
-        :param request: RequestStore object
+        :param request: RequestStore or BaseRequestStore object
         :raises InvalidTypeException: invalid type
         """
-        if not isinstance(request, RequestStore):
-            raise InvalidTypeException("request object must be a instance of RequestStore")
+        if not isinstance(request, (RequestStore, BaseRequestStore)):
+            raise InvalidTypeException(
+                "request object must be a instance of RequestStore or BaseRequestStore"
+            )
         self.registry.request = request
         request_store.set(request)
 
-    def get_request(self) -> Optional[RequestStore]:
+    def get_request(self) -> Optional[Union[RequestStore, BaseRequestStore]]:
         """
-        get RequestStore
+        get RequestStore or BaseRequestStore
         :return: http request instance
         """
         return getattr(self.registry, "request", None) or request_store.get(None)
@@ -216,24 +325,190 @@ class Auth:
         """
         return getattr(self.registry, "auth_store", None)
 
-    def raise_for_valid_token(self, **user_kwargs: Optional[Any]) -> None:
+    def _user_cache_key(self, user_id: Any, token_hash: str) -> str:
         """
-        valid token
+        redis key of the user cache, every token of a user shares it
+        :param user_id: user id claim value
+        :param token_hash: token hash, used when the token has no user id claim
+        """
+        if user_id is None:
+            return f"{self.user_cache_prefix}:token:{token_hash}"
+        return f"{self.user_cache_prefix}:{user_id}"
+
+    def _get_shared(self, key: str, name: str) -> Any:
+        """
+        read a field of the shared user cache
+        :param key: redis key
+        :param name: field name
+        :return: None when missing
+        """
+        if self.redis_client is None:
+            return None
+        try:
+            value: Any = self.redis_client.hget(key, name)
+        except RedisError:
+            logger.warning(f"failed to read user cache {key}", exc_info=True)
+            return None
+        return orjson.loads(value) if value is not None else None
+
+    def _set_shared(self, key: str, name: str, value: Any) -> None:
+        """
+        write a field of the shared user cache
+        :param key: redis key
+        :param name: field name
+        :param value: JSON serializable value
+        """
+        if self.redis_client is None:
+            return
+        try:
+            data: str = orjson.dumps(value).decode()
+        except TypeError:
+            logger.debug(f"{name} is not JSON serializable, skip user cache")
+            return
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.hset(key, name, data)
+                pipe.expire(key, self.user_cache_ttl)
+                pipe.execute()
+        except RedisError:
+            logger.warning(f"failed to write user cache {key}", exc_info=True)
+
+    def _cache_ttl(self, jwt_obj: Dict[str, Any]) -> float:
+        """
+        how long a verified token stays cached
+        :param jwt_obj: jwt dict
+        """
+        ttl: float = self.token_cache_ttl
+        exp: Any = jwt_obj.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        return ttl
+
+    def _verify_token(self, token: str, **user_kwargs: Optional[Any]) -> VerifiedToken:
+        """
+        verify the token and load the user, results are cached
+        :param token: jwt token
         :param user_kwargs: Additional custom parameters
         :raises AuthenticationFailed: auth failed
         :raises NotFoundException: user not found
         """
-        token: Optional[str] = self.get_token()
-        if not token:
-            raise AuthenticationFailed()
+        token_hash: str = hash_token(token)
+        cache_key: Optional[Hashable] = None
+        try:
+            cache_key = (token_hash, tuple(sorted(user_kwargs.items())))
+            hash(cache_key)
+        except TypeError:
+            # Unhashable custom parameters bypass the cache
+            cache_key = None
+        if cache_key is not None:
+            verified: Optional[VerifiedToken] = self.token_cache.get(cache_key)
+            if verified is not None:
+                return verified
         jwt_obj: Dict[str, Any] = decode_token(token, self.jwt_secret)
-        user_info: Any = self.__get_user_info(jwt_obj, **user_kwargs)
+        user_id: Any = jwt_obj.get(self.user_id_claim)
+        # The shared cache does not know the custom parameters
+        shared_key: Optional[str] = (
+            None if user_kwargs else self._user_cache_key(user_id, token_hash)
+        )
+        user_info: Any = self._get_shared(shared_key, "user_info") if shared_key else None
+        from_shared: bool = user_info is not None
+        if not from_shared:
+            user_info = self.__get_user_info(jwt_obj, **user_kwargs)
         if user_info is None:
             logger.error("user not found, token is {token}")
             raise NotFoundException(f"user info not found, token is {token}")
         self.__do_user_define_valid(user_info, jwt_obj)
-        _auth_store: AuthStore = AuthStore(token=token, jwt_obj=jwt_obj, user_info=user_info)
+        if shared_key and not from_shared:
+            self._set_shared(shared_key, "user_info", user_info)
+        verified = VerifiedToken(jwt_obj=jwt_obj, user_info=user_info, user_id=user_id)
+        if shared_key:
+            verified.roles = self._get_shared(shared_key, "roles")
+        if cache_key is not None:
+            self.token_cache.set(cache_key, verified, self._cache_ttl(jwt_obj))
+        return verified
+
+    def raise_for_valid_token(self, **user_kwargs: Optional[Any]) -> None:
+        """
+        valid token
+        :param user_kwargs: Additional custom parameters
+        :raises AuthenticationFailed: auth failed
+        :raises NotFoundException: user not found
+        """
+        token: Optional[str] = self.get_token()
+        if not token:
+            raise AuthenticationFailed()
+        verified: VerifiedToken = self._verify_token(token, **user_kwargs)
+        _auth_store: AuthStore = AuthStore(
+            token=token, jwt_obj=verified.jwt_obj, user_info=verified.user_info
+        )
         self.registry.auth_store = _auth_store
+        self.registry.verified_token = verified
+
+    def get_user_roles(self, **user_kwargs: Optional[Any]) -> List[str]:
+        """
+        roles of the current user, cached with the verified token
+        :param user_kwargs: Additional custom parameters
+        :raises NotFoundException: empty auth_store
+        :raises InvalidTypeException: invalid type
+        """
+        auth_store: Optional[AuthStore] = self.get_auth_store()
+        if auth_store is None:
+            raise NotFoundException("empty auth_store")
+        verified: Optional[VerifiedToken] = getattr(self.registry, "verified_token", None)
+        if verified is not None and verified.roles is not None:
+            return verified.roles
+        user_roles: List[str] = self.__get_user_roles(auth_store.user_info, **user_kwargs)
+        if not isinstance(user_roles, list):
+            logger.error(
+                f"get_user_roles_handler must return a list, "
+                f"get {user_roles}, type {type(user_roles)}"
+            )
+            raise InvalidTypeException("user_roles must be list")
+        if verified is not None:
+            verified.roles = user_roles
+            if not user_kwargs:
+                self._set_shared(
+                    self._user_cache_key(verified.user_id, hash_token(auth_store.token)),
+                    "roles",
+                    user_roles,
+                )
+        return user_roles
+
+    def invalidate_token(self, token: str) -> None:
+        """
+        drop a token from the caches, call it on logout
+        other processes drop it within TOKEN_CACHE_TTL
+        :param token: jwt token
+        """
+        token_hash: str = hash_token(token)
+        self.token_cache.pop_matching(
+            lambda _key, _: isinstance(_key, tuple) and _key[0] == token_hash
+        )
+        if self.redis_client is None:
+            return
+        user_id: Any = None
+        try:
+            user_id = jwt.decode(token, options={"verify_signature": False}).get(self.user_id_claim)
+        except jwt.PyJWTError:
+            logger.debug("invalidate a malformed token")
+        try:
+            self.redis_client.delete(self._user_cache_key(user_id, token_hash))
+        except RedisError:
+            logger.warning("failed to invalidate user cache", exc_info=True)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """
+        drop every cached token of a user, call it after a role or user info change
+        other processes drop them within TOKEN_CACHE_TTL
+        :param user_id: USER_ID_CLAIM value
+        """
+        self.token_cache.pop_matching(lambda _, _value: _value.user_id == user_id)
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.delete(self._user_cache_key(user_id, ""))
+        except RedisError:
+            logger.warning(f"failed to invalidate user cache of {user_id}", exc_info=True)
 
     def auth(
         self, require_roles: Optional[List[str]] = None, **user_kwargs: Optional[Any]
@@ -260,16 +535,7 @@ class Auth:
                 # Determine user_roles
                 if not isinstance(require_roles, list):
                     raise InvalidTypeException("require_roles must be list")
-                auth_store: Optional[AuthStore] = self.get_auth_store()
-                if auth_store is None:
-                    raise NotFoundException("empty auth_store")
-                user_roles: List[str] = self.__get_user_roles(auth_store.user_info, **user_kwargs)
-                if not isinstance(user_roles, list):
-                    logger.error(
-                        f"get_user_roles_handler must return a list, "
-                        f"get {user_roles}, type {type(user_roles)}"
-                    )
-                    raise InvalidTypeException("user_roles must be list")
+                user_roles: List[str] = self.get_user_roles(**user_kwargs)
                 if not self.auth_role or not require_roles:
                     return func(*args, **kwargs)
                 cross_roles: Set[str] = set(user_roles) & set(require_roles)
@@ -291,6 +557,8 @@ class Auth:
         """
         if hasattr(self.registry, "auth_store"):
             del self.registry.auth_store
+        if hasattr(self.registry, "verified_token"):
+            del self.registry.verified_token
         if hasattr(self.registry, "token"):
             del self.registry.token
         if hasattr(self.registry, "request"):
@@ -298,11 +566,14 @@ class Auth:
             request_store.set(None)
 
 
-def get_auth_by_config(config: AuthConfig, auth_role: bool = False) -> Auth:
+def get_auth_by_config(
+    config: AuthConfig, auth_role: bool = False, redis_client: Optional[Redis] = None
+) -> Auth:
     """
     :param config:
     :param auth_role:
+    :param redis_client: redis client of the shared user cache
     :return: Auth instance
     """
-    instance: Auth = Auth(config, auth_role=auth_role)
+    instance: Auth = Auth(config, auth_role=auth_role, redis_client=redis_client)
     return instance
@@ -5,32 +5,112 @@ dependencies: celery component
 """
 
 import importlib
-import json
 import logging
 import pkgutil
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
 from types import ModuleType
-from typing import List
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
-from celery import Celery
+import inject
+from celery import Celery, Task
 from kombu import Exchange, Queue
 from kombu.serialization import register
 from orjson import dumps, loads
 
-from infra.enums.common import RuntimeEnv
-from infra.handlers.json import JSONEncoderHandler
+from infra.dependencies.redis_client import MainRedis, tagged_key
+from infra.enums.common import RuntimeEnv, WorkerPool
+from infra.handlers.json import json_dumps
 
 # Export dependencies. All subsequent dependencies are exported from common.dependencies
 __all__ = [
     "Celery",
     "get_celery_by_config",
+    "get_queue_name",
+    "get_worker_argv",
+    "get_worker_pool",
     "CeleryConfig",
+    "CeleryQueueConfig",
+    "ping_broker",
+    "get_beat_lock_status",
+    "get_single_flight_skips",
+    "SingleFlightTask",
 ]
 
 logger = logging.getLogger(__name__)
 # Register a new encoder/decoder
 register("orjson", dumps, loads, content_type="application/json", content_encoding="utf-8")
 
+# Extend the lease only while the holder still owns it
+EXTEND_LEASE_SCRIPT: str = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT: str = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# do not check snake_case naming style
+# pylint: disable=C0103,R0902
+@dataclass
+class CeleryQueueConfig:
+    """
+    a dedicated queue and the worker pool that consumes it
+    """
+
+    # Queue name suffix, also the argument of manager.py run-queue-tasks
+    NAME: str = ""
+    # Task name patterns routed to the queue [fnmatch], the first matching queue wins
+    TASKS: List[str] = field(default_factory=list)
+    # prefork for CPU-bound tasks, threads or gevent for I/O-bound tasks
+    # Time limits are only enforced by prefork
+    POOL: str = WorkerPool.PREFORK.value
+    # Processes, threads or greenlets of the worker
+    CONCURRENCY: int = 2
+    # Messages reserved per pool slot, 1 keeps a long task from holding queued ones
+    PREFETCH_MULTIPLIER: int = 1
+
+
+def default_queues() -> List[CeleryQueueConfig]:
+    """
+    queues of the scheduled tasks by workload class
+    """
+    schedule_task_root: str = "celery_tasks.schedule_tasks"
+    return [
+        # Latency-critical 5s ticks, never behind a long task
+        CeleryQueueConfig(
+            NAME="critical",
+            TASKS=[f"{schedule_task_root}.gold_task.*"],
+            POOL=WorkerPool.PREFORK.value,
+            CONCURRENCY=2,
+        ),
+        # I/O-bound http calls
+        CeleryQueueConfig(
+            NAME="io",
+            TASKS=[
+                f"{schedule_task_root}.hospital_reserve_task.*",
+                f"{schedule_task_root}.refresh_clash_task.*",
+            ],
+            POOL=WorkerPool.THREADS.value,
+            CONCURRENCY=8,
+        ),
+        # CPU-bound multi-minute downloads and transcoding
+        CeleryQueueConfig(
+            NAME="cpu",
+            TASKS=[f"{schedule_task_root}.music_task.*"],
+            POOL=WorkerPool.PREFORK.value,
+            CONCURRENCY=1,
+        ),
+    ]
+
 
 # do not check snake_case naming style
 # pylint: disable=C0103,R0902
@@ -53,6 +133,74 @@ class CeleryConfig:
     WORKER_NUM: int = 2
     # The maximum number of tasks that can be executed by each worker process
     MAX_TASKS_PER_CHILD: int = 20
+    # Dedicated queues, tasks matching none stay on the beat or the default queue
+    QUEUES: List[CeleryQueueConfig] = field(default_factory=default_queues)
+
+
+def get_queue_name(app_name: str, env: RuntimeEnv, name: str) -> str:
+    """
+    :param app_name: app name
+    :param env: RuntimeEnv
+    :param name: CeleryQueueConfig.NAME
+    :return: name of a dedicated queue
+    """
+    return f"{app_name}-{env.value}-{name}-queue"
+
+
+def _get_queue_config(config: CeleryConfig, name: str) -> CeleryQueueConfig:
+    """
+    :param config: CeleryConfig instance
+    :param name: CeleryQueueConfig.NAME
+    :return: CeleryQueueConfig instance
+    :raises ValueError: the queue is not configured
+    """
+    queue: Optional[CeleryQueueConfig] = next((_q for _q in config.QUEUES if _q.NAME == name), None)
+    if queue is None:
+        raise ValueError(
+            f"unknown celery queue {name}, configured: {[_q.NAME for _q in config.QUEUES]}"
+        )
+    return queue
+
+
+def get_worker_pool(config: CeleryConfig, name: str) -> WorkerPool:
+    """
+    pool type of the worker of a dedicated queue
+    :param config: CeleryConfig instance
+    :param name: CeleryQueueConfig.NAME
+    :return: WorkerPool
+    """
+    return WorkerPool(_get_queue_config(config, name).POOL.lower())
+
+
+def get_worker_argv(app_name: str, config: CeleryConfig, env: RuntimeEnv, name: str) -> List[str]:
+    """
+    worker arguments of a dedicated queue
+    :param app_name: app name
+    :param config: CeleryConfig instance
+    :param env: RuntimeEnv
+    :param name: CeleryQueueConfig.NAME
+    :return: celery worker argv
+    """
+    queue: CeleryQueueConfig = _get_queue_config(config, name)
+    pool: WorkerPool = get_worker_pool(config, name)
+    argv: List[str] = [
+        "worker",
+        "-l",
+        "INFO",
+        "-n",
+        f"{app_name}-{env.value}-{name}@%h",
+        "-P",
+        pool.value,
+        "-c",
+        f"{queue.CONCURRENCY}",
+        "-Q",
+        get_queue_name(app_name, env, name),
+        "--prefetch-multiplier",
+        f"{queue.PREFETCH_MULTIPLIER}",
+    ]
+    if pool is WorkerPool.PREFORK:
+        argv += ["--max-tasks-per-child", f"{config.MAX_TASKS_PER_CHILD}"]
+    return argv
 
 
 def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -> Celery:
@@ -77,6 +225,17 @@ def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -
                 _sub_modules.append(f"{_pkg}.{_sub_module_name}")
         return _sub_modules
 
+    def get_task_queue(_task: str, _default: str) -> str:
+        """
+        queue of a task, the first dedicated queue with a matching pattern
+        _task: task name
+        _default: queue of the tasks matching no dedicated queue
+        """
+        for _queue in config.QUEUES:
+            if any(fnmatchcase(_task, _pattern) for _pattern in _queue.TASKS):
+                return get_queue_name(app_name, env, _queue.NAME)
+        return _default
+
     # Asynchronous task root directory
     async_task_root: str = "celery_tasks.async_tasks"
     # Scheduled task root directory
@@ -94,43 +253,54 @@ def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -
             "task": f"{schedule_task_root}.gold_task.sync_gold_price",
             "args": (),
             "schedule": 5,
-            "options": {"queue": f"{app_name}-{env.value}-beat-queue"},
         },
         # 黄金通知
         f"{schedule_task_root}.gold_task.gold_price_remind": {
             "task": f"{schedule_task_root}.gold_task.gold_price_remind",
             "args": (),
             "schedule": 5,
-            "options": {"queue": f"{app_name}-{env.value}-beat-queue"},
         },
         # 医院预约挂号
         f"{schedule_task_root}.hospital_reserve_task.reserve_notify_task": {
             "task": f"{schedule_task_root}.hospital_reserve_task.reserve_notify_task",
             "args": (),
             "schedule": 600,
-            "options": {"queue": f"{app_name}-{env.value}-beat-queue"},
         },
         # 同步播放列表
         f"{schedule_task_root}.music_task.sync_play_list": {
             "task": f"{schedule_task_root}.music_task.sync_play_list",
             "args": (),
             "schedule": 600,
-            "options": {"queue": f"{app_name}-{env.value}-beat-queue"},
         },
         # 刷新CLASH配置
         f"{schedule_task_root}.refresh_clash_task.sync_clash_config": {
             "task": f"{schedule_task_root}.refresh_clash_task.sync_clash_config",
             "args": (),
             "schedule": 600,
-            "options": {"queue": f"{app_name}-{env.value}-beat-queue"},
         },
     }
 
+    # An explicit queue option overrides task_routes, set the routed one
+    for _entry in beat_schedule.values():
+        _entry["options"] = {
+            "queue": get_task_queue(str(_entry["task"]), f"{app_name}-{env.value}-beat-queue")
+        }
+    dedicated_routes: Dict[str, Dict[str, str]] = {}
+    for _queue in config.QUEUES:
+        for _pattern in _queue.TASKS:
+            # The first matching queue wins, like for the beat schedule
+            dedicated_routes.setdefault(
+                _pattern,
+                {
+                    "queue": get_queue_name(app_name, env, _queue.NAME),
+                    "routing_key": f"{app_name}-{env.value}-{_queue.NAME}-routing",
+                },
+            )
     logger.info(
         "\n*********************************Scheduled Tasks*********************************\n"
         "%s"
         "\n*********************************Scheduled Tasks*********************************\n",
-        json.dumps(beat_schedule, indent=4, cls=JSONEncoderHandler),
+        json_dumps(beat_schedule, indent=True),
     )
     _celery.conf.update(
         beat_schedule=beat_schedule,
@@ -161,6 +331,20 @@ def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -
                 # Queue persistence
                 durable=True,
             ),
+            # Dedicated queues per workload class
+            *[
+                Queue(
+                    get_queue_name(app_name, env, _queue.NAME),
+                    Exchange(
+                        f"{app_name}-{env.value}-exchange",
+                        durable=True,
+                        delivery_mode=2,
+                    ),
+                    routing_key=f"{app_name}-{env.value}-{_queue.NAME}-routing",
+                    durable=True,
+                )
+                for _queue in config.QUEUES
+            ],
         ],
         # Define routes [some tasks require separate queue processing for speed-up, defined here]
         task_routes={
@@ -169,6 +353,8 @@ def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -
                 "queue": f"{app_name}-queue",
                 "routing_key": f"{app_name}-{env.value}-routing",
             },
+            # Glob patterns of the dedicated queues, also used by delay/apply_async
+            **dedicated_routes,
         },
         # Default Queue
         task_default_queue=f"{app_name}-{env.value}-queue",
@@ -215,12 +401,160 @@ def get_celery_by_config(app_name: str, config: CeleryConfig, env: RuntimeEnv) -
         redbeat_key_prefix=f"{app_name}-{env.value}-redbeat",
         # Lock timeout
         redbeat_lock_timeout=config.REDBEAT_LOCK_TIMEOUT,
+        # Redis keys of SingleFlightTask
+        single_flight_prefix=f"{app_name}-{env.value}-single-flight",
         # Retry
         broker_transport_options={
             "max_retries": 3,  # max retry times
             "interval_start": 0,  # Start retry time
             "interval_step": 0.2,  # Each retry interval
             "interval_max": 0.2,  # maximum interval time
+            # Notice dead broker connections behind NAT or a load balancer
+            "socket_keepalive": True,
+            "health_check_interval": 30,
         },
     )
     return _celery
+
+
+def ping_broker(celery_app: Celery, timeout: float) -> Dict[str, Any]:
+    """
+    connect to the broker once without the configured retries
+    :param celery_app: Celery instance
+    :param timeout: connect timeout [seconds]
+    :return: broker transport
+    """
+    with celery_app.connection_for_write() as connection:
+        connection.ensure_connection(max_retries=1, interval_start=0, timeout=timeout)
+        return {"transport": connection.transport_cls}
+
+
+def get_beat_lock_status(celery_app: Celery) -> Dict[str, Any]:
+    """
+    the redbeat lock is held by the running celery beat, it expires when the beat stops
+    :param celery_app: Celery instance
+    :return: remaining lock time [milliseconds]
+    """
+    # redbeat is only needed by the beat and by this probe
+    # pylint: disable=C0415
+    from redbeat.schedulers import RedBeatConfig, get_redis
+
+    lock_key: str = RedBeatConfig(celery_app).lock_key
+    ttl: int = get_redis(celery_app).pttl(lock_key)
+    if ttl == -2:
+        raise RuntimeError(f"no celery beat holds {lock_key}")
+    return {"lock_key": lock_key, "lock_ttl_ms": ttl}
+
+
+class SingleFlightTask(Task):  # type: ignore[misc] # pylint: disable=W0223
+    """
+    Task base class that runs one execution at a time across all workers
+    A run holds a redis lease that a heartbeat thread extends, so the lease of a
+    worker killed by the time limit expires after lease_time. A run that finds the
+    lease held is skipped and counted, or with single_flight_coalesce all the runs
+    skipped meanwhile are merged into one run, queued with the arguments of the
+    current run when it ends
+    usage: @celery_app.task(base=SingleFlightTask, single_flight_coalesce=True)
+    """
+
+    # Lease lifetime without heartbeat [seconds], the heartbeat runs every third of it
+    lease_time: float = 30.0
+    # Queue one more run after the current one instead of dropping the skipped runs
+    single_flight_coalesce: bool = False
+
+    def redis_client(self) -> MainRedis:
+        """
+        redis holding the leases
+        """
+        client: MainRedis = inject.instance(MainRedis)
+        return client
+
+    def single_flight_key(self, *parts: str) -> str:
+        """
+        :param parts: key parts after the task name
+        :return: redis key of this task, the keys of a task share a cluster slot
+        """
+        return tagged_key(self.app.conf.single_flight_prefix, self.name, *parts)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        redis_client: MainRedis = self.redis_client()
+        lease_key: str = self.single_flight_key("lease")
+        token: str = uuid4().hex
+        lease_ms: int = int(self.lease_time * 1000)
+        if not redis_client.set(lease_key, token, nx=True, px=lease_ms):
+            self._skip(redis_client)
+            return None
+        stop: threading.Event = threading.Event()
+        heartbeat: threading.Thread = threading.Thread(
+            target=self._heartbeat,
+            args=(redis_client, lease_key),
+            kwargs={"token": token, "lease_ms": lease_ms, "stop": stop},
+            name=f"single-flight-{self.name}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            return super().__call__(*args, **kwargs)
+        finally:
+            stop.set()
+            heartbeat.join(self.lease_time)
+            redis_client.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, token)
+            # Checked after the release, a run starting meanwhile costs one extra run,
+            # not a lost one
+            if self.single_flight_coalesce and redis_client.delete(
+                self.single_flight_key("pending")
+            ):
+                self.apply_async(args, kwargs)
+
+    def _skip(self, redis_client: MainRedis) -> None:
+        """
+        record a run skipped while another one holds the lease
+        :param redis_client: MainRedis instance
+        """
+        skips: Any = redis_client.hincrby(
+            tagged_key(self.app.conf.single_flight_prefix, "skips"), self.name, 1
+        )
+        if self.single_flight_coalesce:
+            # Lives as long as the running execution may
+            redis_client.set(self.single_flight_key("pending"), 1, ex=int(self.time_limit or 3600))
+        logger.info(f"skip {self.name}, the previous run is still in flight [{skips} skipped]")
+
+    def _heartbeat(
+        self,
+        redis_client: MainRedis,
+        lease_key: str,
+        *,
+        token: str,
+        lease_ms: int,
+        stop: threading.Event,
+    ) -> None:
+        """
+        extend the lease until the run ends
+        :param redis_client: MainRedis instance
+        :param lease_key: lease key
+        :param token: lease owner
+        :param lease_ms: lease lifetime [milliseconds]
+        :param stop: set when the run ends
+        """
+        while not stop.wait(self.lease_time / 3):
+            try:
+                if not redis_client.eval(EXTEND_LEASE_SCRIPT, 1, lease_key, token, str(lease_ms)):
+                    logger.warning(f"{self.name} lost its single flight lease")
+                    return
+            # pylint: disable=W0703
+            except Exception:
+                logger.warning(f"failed to extend the lease of {self.name}", exc_info=True)
+
+
+def get_single_flight_skips(
+    celery_app: Celery, redis_client: Optional[MainRedis] = None
+) -> Dict[str, int]:
+    """
+    runs skipped by SingleFlightTask since the counters were created
+    :param celery_app: Celery instance
+    :param redis_client: MainRedis instance, the bound one by default
+    :return: task name: skipped runs
+    """
+    redis_client = redis_client or inject.instance(MainRedis)
+    skips: Any = redis_client.hgetall(tagged_key(celery_app.conf.single_flight_prefix, "skips"))
+    return {(_k.decode() if isinstance(_k, bytes) else _k): int(_v) for _k, _v in skips.items()}
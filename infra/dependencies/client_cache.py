@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+"""
+dependency: redis client side cache
+Hot keys are served from process memory. Redis tracks the keys read by the cache
+connection and sends an invalidation message when one changes [Redis 6+ tracking
+in redirect mode, it does not need RESP3]
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+
+__all__ = [
+    "ClientSideCache",
+]
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL: str = "__redis__:invalidate"
+# Delay after the first failed connection, doubled after each following one [seconds]
+RETRY_INTERVAL: float = 1.0
+RETRY_INTERVAL_MAX: float = 60.0
+# Caches reset in forked children
+_caches: "weakref.WeakSet[ClientSideCache]" = weakref.WeakSet()
+
+
+class ClientSideCache:
+    """
+    Cache of GET results invalidated by redis, one per process
+    A listener connection receives the invalidation messages, a data connection
+    reads the missing keys with tracking redirected to the listener. Entries are
+    only served while the listener is connected, and expire after ttl in any case
+    Failed connections are retried with an exponential backoff, a server that rejects
+    CLIENT ID or CLIENT TRACKING disables the cache and every read goes to the fallback
+    """
+
+    # pylint: disable=R0902,R0913
+    def __init__(
+        self,
+        connection_class: Callable[..., Any],
+        connection_kwargs: Dict[str, Any],
+        fallback: Callable[[str], Any],
+        *,
+        max_size: int = 10000,
+        ttl: float = 60.0,
+    ) -> None:
+        """
+        init method
+        :param connection_class: connection class of the client pool
+        :param connection_kwargs: connection arguments of the client pool
+        :param fallback: reads a key without the cache while tracking is down
+        :param max_size: cached key count, the oldest key is dropped beyond it
+        :param ttl: longest lifetime of an entry [seconds], bounds staleness on lost messages
+        """
+        self.connection_class = connection_class
+        self.connection_kwargs = connection_kwargs
+        self.fallback = fallback
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+        # key: (value, expire time)
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        # key: token of the read in flight, dropped when the key is invalidated meanwhile
+        self._pending: Dict[str, object] = {}
+        self._entries_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        # redis connections, untyped in redis-py
+        self._data: Any = None
+        self._listener_id: Optional[int] = None
+        # Entries are valid only while the listener is subscribed
+        self._tracking: bool = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._thread_lock = threading.Lock()
+        # Failed connections of the data connection in a row, no connection before _retry_at
+        self._failures: int = 0
+        self._retry_at: float = 0.0
+        # Set once the server rejected tracking
+        self._disabled: bool = False
+        _caches.add(self)
+
+    def get(self, key: str) -> Any:
+        """
+        GET through the cache
+        :param key: redis key
+        """
+        entry: Optional[Tuple[Any, float]] = self._entries.get(key)
+        if entry is not None and self._tracking and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        if not self._tracking:
+            if not self._disabled:
+                self._start()
+            return self.fallback(key)
+        return self._load(key)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        cache usage of this process
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "tracking": int(self._tracking),
+        }
+
+    def close(self) -> None:
+        """
+        stop the listener and drop the entries
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2)
+            self._thread = None
+        self._disconnect_data()
+
+    def _load(self, key: str) -> Any:
+        """
+        read a missing key on the tracked connection
+        :param key: redis key
+        """
+        with self._data_lock:
+            if not self._tracking or not self._connect_data():
+                return self.fallback(key)
+            token: object = object()
+            self._pending[key] = token
+            try:
+                self._data.send_command("GET", key)
+                value: Any = self._data.read_response()
+            except ResponseError:
+                # An error of the key itself [WRONGTYPE], the connection is still usable
+                self._pending.pop(key, None)
+                return self.fallback(key)
+            # pylint: disable=W0703
+            except Exception:
+                self._pending.pop(key, None)
+                self._data.disconnect()
+                self._backoff("client side cache read failed")
+                return self.fallback(key)
+            self._failures = 0
+            with self._entries_lock:
+                # Not stored when the key was invalidated after the read
+                if self._pending.pop(key, None) is token and self._tracking:
+                    if len(self._entries) >= self.max_size and key not in self._entries:
+                        self._entries.pop(next(iter(self._entries)), None)
+                    self._entries[key] = (value, time.monotonic() + self.ttl)
+            return value
+
+    def _connect_data(self) -> bool:
+        """
+        connect the data connection with tracking, called with _data_lock held
+        :return: False when the key is read by the fallback instead
+        """
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            if self._data is None:
+                self._data = self.connection_class(**self.connection_kwargs)
+                self._data.register_connect_callback(self._enable_tracking)
+            # Tracking is enabled on connect, before the read is marked
+            self._data.connect()
+        except ResponseError as e:
+            # redis-py keeps the socket when the connect callback fails
+            self._data.disconnect()
+            self._disable(f"CLIENT TRACKING is rejected: {e}")
+            return False
+        # pylint: disable=W0703
+        except Exception:
+            if self._data is not None:
+                self._data.disconnect()
+            self._backoff("client side cache connection failed")
+            return False
+        return True
+
+    def _backoff(self, message: str) -> None:
+        """
+        skip the data connection for a while, called in the except block of a failure
+        :param message: log message
+        """
+        self._failures += 1
+        delay: float = _retry_delay(self._failures)
+        self._retry_at = time.monotonic() + delay
+        _log_failure(message, self._failures, delay)
+
+    def _disable(self, reason: str) -> None:
+        """
+        stop the cache for good, every read goes to the fallback
+        :param reason: log message
+        """
+        if self._disabled:
+            return
+        self._disabled = True
+        self._tracking = False
+        self._stop.set()
+        self._flush()
+        logger.warning(f"client side cache is disabled, {reason}")
+
+    def _enable_tracking(self, connection: Any) -> None:
+        """
+        connect callback of the data connection
+        Keys read before a reconnect are not tracked anymore
+        :param connection: data connection
+        """
+        self._flush()
+        connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", self._listener_id)
+        connection.read_response()
+
+    def _invalidate(self, keys: Optional[List[Any]]) -> None:
+        """
+        drop invalidated keys
+        :param keys: keys of the message, None after FLUSHALL
+        """
+        if keys is None:
+            self._flush()
+            return
+        with self._entries_lock:
+            for _key in keys:
+                key: str = _key.decode() if isinstance(_key, bytes) else _key
+                self._pending.pop(key, None)
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def _flush(self) -> None:
+        """
+        drop every entry and read in flight
+        """
+        with self._entries_lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def _disconnect_data(self) -> None:
+        """
+        drop the data connection, it reconnects with tracking to the current listener
+        """
+        self._tracking = False
+        self._flush()
+        with self._data_lock:
+            if self._data is not None:
+                self._data.disconnect()
+                self._data = None
+
+    def _start(self) -> None:
+        """
+        start the listener thread of this process
+        """
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._listen, name=f"redis-client-cache-{os.getpid()}", daemon=True
+            )
+            self._thread.start()
+
+    def _listen(self) -> None:
+        """
+        listener thread, reconnects until closed
+        """
+        failures: int = 0
+        while not self._stop.is_set():
+            delay: float = RETRY_INTERVAL
+            listener: Any = self.connection_class(**self.connection_kwargs)
+            try:
+                listener.send_command("CLIENT", "ID")
+                listener_id: int = int(listener.read_response())
+                listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+                listener.read_response()
+                self._listener_id = listener_id
+                # Keys read with tracking to a former listener would never be invalidated
+                self._disconnect_data()
+                self._tracking = True
+                failures = 0
+                while not self._stop.is_set():
+                    if not listener.can_read(timeout=1):
+                        continue
+                    message: Any = listener.read_response()
+                    if isinstance(message, list) and message[0] in ("message", b"message"):
+                        self._invalidate(message[2])
+            except ResponseError as e:
+                self._disable(f"CLIENT ID or SUBSCRIBE is rejected: {e}")
+            # pylint: disable=W0703
+            except Exception:
+                failures += 1
+                delay = _retry_delay(failures)
+                _log_failure("client side cache listener failed", failures, delay)
+            finally:
+                self._tracking = False
+                self._flush()
+                listener.disconnect()
+            self._stop.wait(delay)
+
+    def _reset(self) -> None:
+        """
+        forget the connections and the listener inherited from the parent process
+        """
+        self._tracking = False
+        self._entries = {}
+        self._pending = {}
+        self._entries_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._data = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._failures = 0
+        self._retry_at = 0.0
+
+
+def _retry_delay(failures: int) -> float:
+    """
+    exponential backoff
+    :param failures: failed connections in a row
+    :return: delay before the next connection [seconds]
+    """
+    return min(RETRY_INTERVAL * 2.0 ** (failures - 1), RETRY_INTERVAL_MAX)
+
+
+def _log_failure(message: str, failures: int, delay: float) -> None:
+    """
+    the traceback of the first failure in a row only, called in an except block
+    :param message: log message
+    :param failures: failed connections in a row
+    :param delay: delay before the next connection [seconds]
+    """
+    if failures == 1:
+        logger.warning(f"{message}, retry in {delay:.0f}s", exc_info=True)
+    else:
+        logger.debug(f"{message} {failures} times in a row, retry in {delay:.0f}s")
+
+
+def _reset_after_fork() -> None:
+    """
+    The listener thread does not survive fork, so the entries could not be invalidated
+    """
+    for _cache in list(_caches):
+        _cache._reset()  # pylint: disable=W0212
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
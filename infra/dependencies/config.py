@@ -20,7 +20,7 @@ from infra.dependencies.celery import CeleryConfig
 from infra.dependencies.rdb import RDBConfig
 from infra.dependencies.redis_client import RedisConfig
 from infra.enums import RuntimeEnv, Switch
-from infra.handlers.json import JSONEncoderHandler
+from infra.handlers.json import json_dumps
 
 __all__ = (
     "Config",
@@ -186,6 +186,10 @@ class Config:
     ENV: RuntimeEnv = RuntimeEnv(
         os.getenv("ENV_FOR_DYNACONF", RuntimeEnv.DEVELOPMENT.value).upper()
     )
+    # Write logs through a queue and a listener thread
+    LOG_QUEUE: Switch = Switch(int(os.getenv("LOG_QUEUE", f"{Switch.Open.value}")))
+    # Records kept in the log queue, new records are dropped when it is full
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
     # Log configuration
     LOG_CONFIG_PATH: str = os.getenv("LOG_CONFIG_PATH") or os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
@@ -200,6 +204,35 @@ class Config:
     SLOW_API_LIMIT_TIME: int = 1
     # Configure remote http timeout
     REMOTE_HTTP_TIMEOUT: int = 10
+    # Maximum request body size after decompression [bytes, 0 means unlimited]
+    MAX_REQUEST_BODY_SIZE: int = 16 * 1024 * 1024
+    # Compressed bodies larger than this are decompressed in a worker thread [bytes]
+    REQUEST_DECOMPRESS_THREAD_THRESHOLD: int = 256 * 1024
+    # Responses smaller than this are not compressed [bytes]
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Single response bodies larger than this are compressed in a worker thread [bytes]
+    COMPRESSION_THREAD_THRESHOLD: int = 256 * 1024
+    # Cache-Control max-age of static assets without a content hash in the name [seconds]
+    STATIC_CACHE_MAX_AGE: int = 3600
+    # Cache-Control max-age of content hashed static assets, like app.3f2a9c1b.js [seconds]
+    STATIC_IMMUTABLE_MAX_AGE: int = 365 * 24 * 3600
+    # How long a process admits rate limited requests from its local share of tokens [seconds]
+    RATE_LIMIT_LOCAL_TTL: float = 1.0
+    # Entry count of the local response cache tier [0 disables it]
+    RESPONSE_CACHE_LOCAL_SIZE: int = 1024
+    # Longest life of a local response cache entry [seconds]
+    RESPONSE_CACHE_LOCAL_TTL: float = 5.0
+    # System metrics sample interval [seconds]
+    SAMPLER_INTERVAL: float = 1.0
+    # System metrics kept per worker [samples]
+    SAMPLER_SIZE: int = 300
+    # Dependency probe interval [seconds]
+    HEALTH_CHECK_INTERVAL: float = 10.0
+    # Longest wait for one dependency probe [seconds]
+    HEALTH_CHECK_TIMEOUT: float = 3.0
+    # Shared metrics directory of api server workers, a fresh temporary one when empty
+    # [the same rule as api_server/gunicorn.conf.py]
+    METRICS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
     # Project name
     PROJECT_NAME: str = "jingdong_financial"
     # Project path
@@ -269,5 +302,5 @@ def bind_config() -> Config:
             )
     _config: Config = from_dict(Config, config_dict)
     logger.info("============================load dynaconf config============================")
-    logger.info(json.dumps(config_dict, cls=JSONEncoderHandler, indent=4))
+    logger.info(json_dumps(config_dict, indent=True))
     return _config
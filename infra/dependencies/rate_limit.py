@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+dependency: rate limit component
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from redis import Redis, RedisError
+
+__all__ = [
+    "RateLimiter",
+    "get_rate_limiter",
+]
+
+logger = logging.getLogger(__name__)
+
+# Token bucket, refill and take in one atomic call
+# KEYS[1]: bucket key
+# ARGV: rate [tokens/s], burst [capacity], cost, pending [tokens already spent locally]
+# return: allowed, remaining tokens, retry after [s]
+TOKEN_BUCKET_SCRIPT: str = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local pending = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = burst
+    ts = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - pending
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+@dataclass
+class LocalBudget:
+    """
+    tokens this process may spend without asking redis
+    """
+
+    # tokens granted by the last redis call
+    budget: float
+    # bucket of the last redis call, the spent tokens are settled into it
+    rate: float
+    burst: int
+    # monotonic time the budget stops admitting requests
+    expire_at: float
+    # tokens spent since the last redis call, kept past expire_at until settled
+    spent: float = 0
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter shared by processes through redis
+    After each redis call a process keeps local_share of the remaining tokens,
+    requests are admitted locally until that share is spent or local_ttl passes,
+    then the spent tokens are settled with the next redis call of the key, or
+    on their own once the budget is evicted
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        *,
+        prefix: str = "rate-limit",
+        local_share: float = 0.0,
+        local_ttl: float = 1.0,
+        local_size: int = 10000,
+    ) -> None:
+        """
+        init method
+        :param redis_client: redis client
+        :param prefix: bucket key prefix
+        :param local_share: share of the remaining tokens spent locally, 0 disables the pre-check
+        :param local_ttl: how long a local budget admits requests [seconds]
+        :param local_size: local budget count, the least recently used one is settled beyond it
+        """
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.local_share = local_share
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        # Expired budgets stay until their spent tokens are settled
+        self._local: "OrderedDict[str, LocalBudget]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._script: Any = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def try_acquire_local(self, key: str, cost: float = 1) -> bool:
+        """
+        spend from the local budget without touching redis
+        :param key: bucket key
+        :param cost: tokens of the request
+        :return: False when redis must decide
+        """
+        with self._lock:
+            local: Optional[LocalBudget] = self._local.get(key)
+            if (
+                local is None
+                or local.expire_at <= time.monotonic()
+                or local.spent + cost > local.budget
+            ):
+                return False
+            local.spent += cost
+            self._local.move_to_end(key)
+        return True
+
+    def acquire(self, key: str, rate: float, burst: int, cost: float = 1) -> Tuple[bool, float]:
+        """
+        take tokens from the bucket, fail open when redis is unavailable
+        :param key: bucket key
+        :param rate: refill rate [tokens/s]
+        :param burst: bucket capacity
+        :param cost: tokens of the request
+        :return: allowed, retry after [seconds]
+        """
+        if self.try_acquire_local(key, cost):
+            return True, 0.0
+        with self._lock:
+            local: Optional[LocalBudget] = self._local.pop(key, None)
+        pending: float = local.spent if local is not None else 0
+        try:
+            result: List[Any] = self._script(
+                keys=[f"{self.prefix}:{key}"], args=[rate, burst, cost, pending]
+            )
+        except RedisError:
+            logger.warning(f"rate limit is skipped, failed to call redis: {key}", exc_info=True)
+            if pending:
+                # Settled with the next call instead
+                self._store(key, LocalBudget(0, rate, burst, 0, spent=pending))
+            return True, 0.0
+        allowed: bool = bool(int(result[0]))
+        if allowed and self.local_share > 0:
+            budget: float = float(result[1]) * self.local_share
+            if budget >= cost:
+                self._store(
+                    key, LocalBudget(budget, rate, burst, time.monotonic() + self.local_ttl)
+                )
+        return allowed, float(result[2])
+
+    def _store(self, key: str, local: LocalBudget) -> None:
+        """
+        keep a local budget, settle the tokens spent from the evicted ones
+        :param key: bucket key
+        :param local: local budget
+        """
+        evicted: List[Tuple[str, LocalBudget]] = []
+        with self._lock:
+            self._local[key] = local
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                evicted.append(self._local.popitem(last=False))
+        for _key, _local in evicted:
+            if _local.spent:
+                self._settle(_key, _local)
+
+    def _settle(self, key: str, local: LocalBudget) -> None:
+        """
+        take the tokens spent locally from the bucket
+        :param key: bucket key
+        :param local: evicted local budget
+        """
+        try:
+            self._script(
+                keys=[f"{self.prefix}:{key}"], args=[local.rate, local.burst, 0, local.spent]
+            )
+        except RedisError:
+            logger.warning(f"failed to settle {local.spent} rate limit tokens: {key}")
+
+
+def get_rate_limiter(
+    redis_client: Redis, prefix: str, local_share: float, local_ttl: float
+) -> RateLimiter:
+    """
+    :param redis_client: redis client
+    :param prefix: bucket key prefix
+    :param local_share: share of the remaining tokens spent locally
+    :param local_ttl: how long a local budget is trusted [seconds]
+    :return: RateLimiter instance
+    """
+    return RateLimiter(redis_client, prefix=prefix, local_share=local_share, local_ttl=local_ttl)
@@ -5,23 +5,108 @@
 dependencies: relational database component
 """
 
+import contextvars
 import importlib
 import logging
-from dataclasses import dataclass
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from sqlalchemy import Engine, create_engine
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Connection, Engine, Insert, Table, create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
 
 from infra.models.base import Base
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    "BulkUpsertResult",
     "RDBConfig",
+    "ReplicaConfig",
+    "Replica",
     "MainRDB",
+    "InstrumentedQueuePool",
+    "create_rdb_engine",
+    "instrument_pool",
     "get_main_rdb_by_config",
+    "read_your_writes_scope",
+    "StatementScope",
+    "statement_scope",
+    "open_statement_scope",
+    "close_statement_scope",
+    "fingerprint",
+    "statement_stats",
 ]
 
+DB_POOL_CHECKOUT_WAIT: Histogram = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_POOL_CHECKOUT_TIMEOUTS: Counter = Counter(
+    "db_pool_checkout_timeouts",
+    "checkouts that gave up after the pool timeout",
+    ["pool"],
+)
+DB_POOL_IN_USE: Gauge = Gauge(
+    "db_pool_connections_in_use",
+    "database connections checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_READS: Counter = Counter(
+    "db_read_sessions",
+    "read sessions by the pool they were routed to",
+    ["pool"],
+)
+DB_STATEMENT_DURATION: Histogram = Histogram(
+    "db_statement_duration_seconds",
+    "sql statement latency",
+    ["pool", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_STATEMENT_FLAGS: Counter = Counter(
+    "db_statement_flags",
+    "slow statements and repeated statements of one unit of work",
+    ["pool", "flag"],
+)
+# Distinct fingerprints kept in the per process statement stats
+STATEMENT_STATS_SIZE: int = 500
+# Engines disposed in forked children
+_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+# perf_counter of the last write of the current request, set by read_your_writes_scope
+_write_scope: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "rdb_write_scope", default=None
+)
+
+
+# do not check snake_case naming style
+# pylint: disable=C0103,R0902
+@dataclass
+class ReplicaConfig:
+    """
+    mysql read replica config, empty credentials are taken from the primary
+    """
+
+    HOST: str = ""
+    PORT: int = 3306
+    # Share of the reads relative to the other replicas
+    WEIGHT: int = 1
+    USERNAME: str = ""
+    PASSWORD: str = ""
+
 
 # do not check snake_case naming style
 # pylint: disable=C0103,R0902
@@ -36,6 +121,399 @@ class RDBConfig:
     HOST: str = ""
     DATABASE: str = ""
     PORT: int = 3306
+    # Connections kept open per process, size it to the worker threads
+    POOL_SIZE: int = 10
+    # Extra connections opened under load and closed when returned
+    MAX_OVERFLOW: int = 20
+    # Longest wait for a free connection before TimeoutError [seconds]
+    POOL_TIMEOUT: float = 10.0
+    # Connections older than this are replaced on checkout [seconds]
+    POOL_RECYCLE: int = 3600
+    # Test connections on checkout, costs one round trip
+    POOL_PRE_PING: bool = True
+    # Read replicas, every read goes to the primary when it is empty
+    REPLICAS: List[ReplicaConfig] = field(default_factory=list)
+    # Replicas further behind the primary are skipped [seconds]
+    REPLICA_MAX_LAG: float = 5.0
+    # Replica lag check interval [seconds]
+    REPLICA_CHECK_INTERVAL: float = 5.0
+    # Reads follow a write of the same request to the primary for this long [seconds]
+    READ_YOUR_WRITES_WINDOW: float = 5.0
+    # Statements slower than this are logged with redacted parameters [seconds]
+    SLOW_STATEMENT_TIME: float = 0.5
+    # A statement repeated this often in one request or task is flagged as N+1
+    N_PLUS_ONE_THRESHOLD: int = 10
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waits for a connection
+    The pool label is the pool logging name, which survives dispose
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        name: str = self._orig_logging_name or "default"
+        start: float = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(name).observe(time.perf_counter() - start)
+
+
+def _dispose_after_fork() -> None:
+    """
+    Replace the pools inherited from the parent process, the sockets stay open for the parent
+    """
+    for _engine in list(_engines):
+        _engine.dispose(close=False)
+        DB_POOL_IN_USE.labels(_engine.pool.logging_name or "default").set(0)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """
+    count checked out connections, and dispose the pool in forked children
+    :param engine: Engine instance
+    :param name: pool label
+    """
+    in_use: Any = DB_POOL_IN_USE.labels(name)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(_connection: Any, record: ConnectionPoolEntry, _proxy: Any) -> None:
+        record.info["checkout_pid"] = os.getpid()
+        in_use.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(_connection: Any, record: ConnectionPoolEntry) -> None:
+        # A connection checked out before fork is counted by the parent
+        if record.info.pop("checkout_pid", None) == os.getpid():
+            in_use.dec()
+
+    _engines.add(engine)
+
+
+_LITERALS: re.Pattern = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|\?|:\w+\b")
+_IN_LISTS: re.Pattern = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LISTS: re.Pattern = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACES: re.Pattern = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    statement with literals and placeholders replaced, IN lists and VALUES rows collapsed
+    :param statement: sql statement
+    """
+    normalized: str = _LITERALS.sub("?", _SPACES.sub(" ", statement).strip())
+    normalized = _IN_LISTS.sub("(...)", normalized)
+    return _ROW_LISTS.sub("(...)", normalized)
+
+
+def redact(parameters: Any) -> Any:
+    """
+    replace parameter values by their types
+    :param parameters: statement parameters, a dict, a sequence or a list of them
+    """
+    if isinstance(parameters, dict):
+        return {_k: type(_v).__name__ for _k, _v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return [redact(parameters[0]), f"... {len(parameters)} rows"]
+        return [type(_v).__name__ for _v in parameters]
+    return type(parameters).__name__
+
+
+class StatementScope:
+    """
+    statements of one request or task
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        init method
+        :param name: request or task name
+        """
+        self.name = name
+        self.trace_id: str = ""
+        self.count: int = 0
+        self.duration: float = 0.0
+        self.fingerprints: Dict[str, int] = {}
+        self.flagged: Set[str] = set()
+
+
+# Statements of the current request or task
+_statement_scope: contextvars.ContextVar[Optional[StatementScope]] = contextvars.ContextVar(
+    "rdb_statement_scope", default=None
+)
+# fingerprint: [count, total duration, max duration]
+_statement_stats: Dict[str, List[float]] = {}
+
+
+def open_statement_scope(name: str) -> contextvars.Token:
+    """
+    start counting the statements of a request or task
+    :param name: request or task name
+    :return: token of close_statement_scope
+    """
+    return _statement_scope.set(StatementScope(name))
+
+
+def close_statement_scope(token: contextvars.Token) -> Optional[StatementScope]:
+    """
+    stop counting and log the statement count with the trace id
+    :param token: token of open_statement_scope
+    :return: the closed scope
+    """
+    scope: Optional[StatementScope] = _statement_scope.get()
+    try:
+        _statement_scope.reset(token)
+    except ValueError:
+        # Closed in another context than it was opened in
+        _statement_scope.set(None)
+    if scope is not None and scope.count:
+        logger.debug(
+            f"[T-{scope.trace_id}] {scope.name}: {scope.count} statements "
+            f"({len(scope.fingerprints)} distinct) in {scope.duration * 1000:.1f}ms"
+        )
+    return scope
+
+
+@contextmanager
+def statement_scope(name: str) -> Iterator[StatementScope]:
+    """
+    count the statements of a request or task
+    :param name: request or task name
+    """
+    token: contextvars.Token = open_statement_scope(name)
+    try:
+        yield _statement_scope.get()  # type: ignore[misc]
+    finally:
+        close_statement_scope(token)
+
+
+def statement_stats(limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    statements of this process with the longest total time
+    :param limit: statement count
+    """
+    stats: List[Tuple[str, List[float]]] = sorted(
+        list(_statement_stats.items()), key=lambda _i: _i[1][1], reverse=True
+    )[:limit]
+    return [
+        {
+            "statement": _f,
+            "count": int(_s[0]),
+            "total_ms": round(_s[1] * 1000, 3),
+            "mean_ms": round(_s[1] * 1000 / _s[0], 3),
+            "max_ms": round(_s[2] * 1000, 3),
+        }
+        for _f, _s in stats
+    ]
+
+
+def _current_trace_id() -> str:
+    """
+    trace id of the current request or task
+    """
+    # pylint: disable=C0415
+    import inject
+
+    from infra.dependencies.registry import Registry
+
+    try:
+        return inject.instance(Registry).get_trace_id() or ""
+    except inject.InjectorException:
+        return ""
+
+
+def instrument_statements(
+    engine: Engine, name: str, slow_time: float, n_plus_one_threshold: int
+) -> None:
+    """
+    time every statement by fingerprint, log slow statements and flag N+1 patterns
+    :param engine: Engine instance
+    :param name: pool label
+    :param slow_time: statements slower than this are logged [seconds]
+    :param n_plus_one_threshold: repeats of a fingerprint in one scope that flag N+1
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(connection: Connection, *_: Any) -> None:
+        connection.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(
+        connection: Connection,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        _executemany: bool,
+    ) -> None:
+        duration: float = time.perf_counter() - connection.info["statement_start"].pop()
+        key: str = fingerprint(statement)
+        DB_STATEMENT_DURATION.labels(name, key.split(" ", 1)[0].upper()).observe(duration)
+        stats: Optional[List[float]] = _statement_stats.get(key)
+        if stats is None and len(_statement_stats) < STATEMENT_STATS_SIZE:
+            stats = _statement_stats.setdefault(key, [0, 0.0, 0.0])
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+        if duration >= slow_time:
+            DB_STATEMENT_FLAGS.labels(name, "slow").inc()
+            logger.warning(
+                f"slow statement {duration * 1000:.1f}ms on {name}: "
+                f"{statement} parameters: {redact(parameters)}"
+            )
+        scope: Optional[StatementScope] = _statement_scope.get()
+        if scope is None:
+            return
+        if not scope.trace_id:
+            scope.trace_id = _current_trace_id()
+        scope.count += 1
+        scope.duration += duration
+        repeats: int = scope.fingerprints.get(key, 0) + 1
+        scope.fingerprints[key] = repeats
+        if repeats >= n_plus_one_threshold and key not in scope.flagged:
+            scope.flagged.add(key)
+            DB_STATEMENT_FLAGS.labels(name, "n_plus_one").inc()
+            logger.warning(f"N+1 statement in {scope.name}, repeated {repeats} times: {key}")
+
+
+def create_rdb_engine(config: RDBConfig, name: str) -> Engine:
+    """
+    mysql engine with an instrumented connection pool
+    :param config: RDBConfig instance
+    :param name: pool label of the metrics
+    :return: Engine instance
+    """
+    engine: Engine = create_engine(
+        (
+            f"mysql+pymysql://{config.USERNAME}:{config.PASSWORD}@"
+            f"{config.HOST}:{config.PORT}/{config.DATABASE}"
+        ),
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.POOL_SIZE,
+        max_overflow=config.MAX_OVERFLOW,
+        pool_timeout=config.POOL_TIMEOUT,
+        pool_recycle=config.POOL_RECYCLE,
+        pool_pre_ping=config.POOL_PRE_PING,
+        pool_logging_name=name,
+        isolation_level="READ COMMITTED",
+    )
+    instrument_pool(engine, name)
+    instrument_statements(engine, name, config.SLOW_STATEMENT_TIME, config.N_PLUS_ONE_THRESHOLD)
+    return engine
+
+
+@contextmanager
+def read_your_writes_scope() -> Iterator[None]:
+    """
+    Reads of the scope follow its writes to the primary, one scope per request
+    The scope is shared with the threads that inherit the context
+    """
+    token: contextvars.Token = _write_scope.set([0.0])
+    try:
+        yield
+    finally:
+        _write_scope.reset(token)
+
+
+def replication_lag(connection: Connection) -> float:
+    """
+    replica lag behind the primary
+    :param connection: replica connection
+    :return: lag [seconds], 0 for a server that is not a replica
+    :raises RuntimeError: replication is stopped
+    :raises DBAPIError: neither status statement could be run, the lag is unknown
+    """
+    column: str = "Seconds_Behind_Source"
+    try:
+        row: Any = connection.execute(text("SHOW REPLICA STATUS")).mappings().first()
+    except DBAPIError:
+        # Before mysql 8.0.22, its error is raised, a replica of unknown lag is not routable
+        column = "Seconds_Behind_Master"
+        row = connection.execute(text("SHOW SLAVE STATUS")).mappings().first()
+    if row is None:
+        return 0.0
+    if row.get(column) is None:
+        raise RuntimeError("replication is stopped")
+    return float(row[column])
+
+
+class Replica:
+    """
+    read replica and its routing state
+    """
+
+    def __init__(self, name: str, engine: Engine, weight: int = 1) -> None:
+        """
+        init method
+        :param name: pool label
+        :param engine: replica engine
+        :param weight: share of the reads
+        """
+        self.name = name
+        self.engine = engine
+        self.weight = max(weight, 0)
+        self.Session = sessionmaker(bind=engine, class_=Session)
+        # Routable once the first lag check passed
+        self.healthy: bool = False
+        self.lag: Optional[float] = None
+        self.last_error: str = ""
+        # smooth weighted round-robin state
+        self.current_weight: int = 0
+
+    def measure_lag(self) -> float:
+        """
+        :return: lag [seconds]
+        """
+        with self.engine.connect() as connection:
+            return replication_lag(connection)
+
+    def refresh(self, max_lag: float) -> None:
+        """
+        check the replica and update its routing state
+        :param max_lag: largest lag of a routable replica [seconds]
+        """
+        # noinspection PyBroadException
+        try:
+            lag: float = self.measure_lag()
+        # pylint: disable=W0703
+        except Exception as e:
+            if self.healthy or not self.last_error:
+                logger.warning(f"replica {self.name} is unavailable: {e}")
+            self.healthy, self.lag, self.last_error = False, None, f"{type(e).__name__}: {e}"
+            return
+        healthy: bool = lag <= max_lag
+        if healthy != self.healthy:
+            logger.warning(f"replica {self.name} lag is {lag}s, routable: {healthy}")
+        self.healthy, self.lag, self.last_error = healthy, lag, ""
+
+
+@dataclass
+class BulkUpsertResult:
+    """
+    outcome of IDB.bulk_upsert
+    """
+
+    rows: int = 0
+    chunks: int = 0
+    # wall time [seconds]
+    duration: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """throughput"""
+        return self.rows / self.duration if self.duration else 0.0
 
 
 class IDB:
@@ -43,9 +521,216 @@ class IDB:
     Database interface
     """
 
-    def __init__(self, engine: Engine):
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        replicas: Optional[List[Replica]] = None,
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+        read_your_writes_window: float = 5.0,
+    ):
+        """
+        init method
+        :param engine: primary engine
+        :param replicas: read replicas
+        :param max_lag: largest lag of a routable replica [seconds]
+        :param check_interval: replica lag check interval [seconds]
+        :param read_your_writes_window: reads follow a write to the primary for this long [seconds]
+        """
         self.engine = engine
         self.Session = sessionmaker(bind=engine, class_=Session)
+        self.replicas: List[Replica] = [_r for _r in replicas or [] if _r.weight > 0]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_your_writes_window = read_your_writes_window
+        self._route_lock = threading.Lock()
+        # Last write of threads outside a read_your_writes_scope
+        self._local = threading.local()
+        # pid of the process the replica monitor runs in
+        self._monitor_pid: Optional[int] = None
+        self._monitor_lock = threading.Lock()
+        event.listen(self.Session, "after_flush", self._mark_write)
+
+    def _mark_write(self, *_: Any) -> None:
+        """
+        after_flush of a primary session, only flushes with changes reach here
+        """
+        scope: Optional[List[float]] = _write_scope.get()
+        if scope is not None:
+            scope[0] = time.perf_counter()
+        else:
+            self._local.last_write = time.perf_counter()
+
+    def _wrote_recently(self) -> bool:
+        """
+        the current request or thread wrote within the read-your-writes window
+        """
+        scope: Optional[List[float]] = _write_scope.get()
+        last_write: float = scope[0] if scope is not None else getattr(self._local, "last_write", 0)
+        return bool(last_write) and time.perf_counter() - last_write < self.read_your_writes_window
+
+    def _start_monitor(self) -> None:
+        """
+        check replica lag in a daemon thread of the current process
+        """
+        with self._monitor_lock:
+            if self._monitor_pid == os.getpid():
+                return
+            self._monitor_pid = os.getpid()
+            threading.Thread(
+                target=self._monitor, name=f"replica-monitor-{os.getpid()}", daemon=True
+            ).start()
+
+    def _monitor(self) -> None:
+        """
+        replica monitor thread, ends when the process forks
+        """
+        pid: int = os.getpid()
+        while self._monitor_pid == pid:
+            self.refresh_replicas()
+            time.sleep(self.check_interval)
+
+    def refresh_replicas(self) -> None:
+        """
+        check the lag of every replica
+        """
+        for _replica in self.replicas:
+            _replica.refresh(self.max_lag)
+
+    def _pick_replica(self) -> Optional[Replica]:
+        """
+        smooth weighted round-robin over the routable replicas
+        """
+        with self._route_lock:
+            total: int = 0
+            best: Optional[Replica] = None
+            for _replica in self.replicas:
+                if not _replica.healthy:
+                    continue
+                _replica.current_weight += _replica.weight
+                total += _replica.weight
+                if best is None or _replica.current_weight > best.current_weight:
+                    best = _replica
+            if best is not None:
+                best.current_weight -= total
+            return best
+
+    def get_read_session(self, read_your_writes: bool = True) -> Session:
+        """
+        session of a replica for reads, falls back to the primary when no replica is routable
+        :param read_your_writes: read from the primary after a write of the same request
+        """
+        if not self.replicas:
+            return self.get_session()
+        if self._monitor_pid != os.getpid():
+            self._start_monitor()
+        replica: Optional[Replica] = None
+        if not (read_your_writes and self._wrote_recently()):
+            replica = self._pick_replica()
+        if replica is None:
+            DB_READS.labels("primary").inc()
+            return self.get_session()
+        DB_READS.labels(replica.name).inc()
+        return replica.Session()
+
+    def _upsert_statement(
+        self, table: Table, conflict_columns: Sequence[str], update_columns: Sequence[str]
+    ) -> Insert:
+        """
+        insert that updates the rows already present, executed with a list of rows
+        pymysql sends a chunk as one multi-row INSERT ... ON DUPLICATE KEY UPDATE, and the
+        statement is compiled once through the sqlalchemy cache
+        :param table: target table
+        :param conflict_columns: unique columns that identify a present row
+        :param update_columns: columns overwritten on a present row
+        """
+        dialect: str = self.engine.dialect.name
+        if dialect not in ("mysql", "sqlite", "postgresql"):
+            raise NotImplementedError(f"bulk_upsert does not support {dialect}")
+        statement: Any = importlib.import_module(f"sqlalchemy.dialects.{dialect}").insert(table)
+        if dialect == "mysql":
+            # Any unique key of the table triggers the update
+            if not update_columns:
+                return statement.prefix_with("IGNORE")  # type: ignore[no-any-return]
+            return statement.on_duplicate_key_update(  # type: ignore[no-any-return]
+                {_c: statement.inserted[_c] for _c in update_columns}
+            )
+        if not update_columns:
+            return statement.on_conflict_do_nothing(  # type: ignore[no-any-return]
+                index_elements=list(conflict_columns)
+            )
+        return statement.on_conflict_do_update(  # type: ignore[no-any-return]
+            index_elements=list(conflict_columns),
+            set_={_c: statement.excluded[_c] for _c in update_columns},
+        )
+
+    def bulk_upsert(
+        self,
+        model: Any,
+        rows: Iterable[Union[Dict[str, Any], Sequence[Any]]],
+        *,
+        chunk_size: int = 1000,
+        conflict_columns: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> BulkUpsertResult:
+        """
+        insert rows in chunks of multi-row statements, rows already present are updated
+        No ORM object is built, each chunk is committed in its own transaction
+        :param model: model class or table
+        :param rows: dicts of column values with the same keys, or tuples in the order of columns
+        :param chunk_size: rows per statement
+        :param conflict_columns: unique columns that identify a present row, the primary key by
+            default. mysql matches any unique key, it uses them only for the default update_columns
+        :param update_columns: columns overwritten on a present row, every other given column by
+            default, empty keeps present rows unchanged
+        :param columns: column names of tuple rows, every table column by default
+        :return: BulkUpsertResult instance
+        """
+        table: Table = getattr(model, "__table__", model)
+        conflict: List[str] = list(conflict_columns or [_c.name for _c in table.primary_key])
+        tuple_columns: List[str] = list(columns or [_c.name for _c in table.columns])
+        statement: Optional[Insert] = None
+        result: BulkUpsertResult = BulkUpsertResult()
+        start: float = time.perf_counter()
+        iterator: Iterator[Union[Dict[str, Any], Sequence[Any]]] = iter(rows)
+        while True:
+            chunk: List[Dict[str, Any]] = [
+                _r if isinstance(_r, dict) else dict(zip(tuple_columns, _r))
+                for _r in islice(iterator, chunk_size)
+            ]
+            if not chunk:
+                break
+            if statement is None:
+                updates: Sequence[str] = (
+                    [_c for _c in chunk[0] if _c not in conflict]
+                    if update_columns is None
+                    else update_columns
+                )
+                statement = self._upsert_statement(table, conflict, updates)
+            with self.engine.begin() as connection:
+                connection.execute(statement, chunk)
+            result.rows += len(chunk)
+            result.chunks += 1
+        if result.rows:
+            # Core statements skip the session flush hook
+            self._mark_write()
+        result.duration = time.perf_counter() - start
+        logger.info(
+            f"bulk upsert {table.name}: {result.rows} rows in {result.chunks} chunks, "
+            f"{result.duration:.3f}s, {result.rows_per_second:.0f} rows/s"
+        )
+        return result
+
+    def replica_status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        routing state of every replica
+        """
+        return {
+            _r.name: {"healthy": _r.healthy, "lag": _r.lag, "last_error": _r.last_error}
+            for _r in self.replicas
+        }
 
     def get_engine(self) -> Engine:
         """get engine object"""
@@ -59,6 +744,25 @@ class IDB:
         """return session object"""
         return self.get_session()
 
+    def pool_status(self) -> Dict[str, int]:
+        """
+        connection pool usage
+        """
+        pool = self.engine.pool
+        return {
+            "size": getattr(pool, "size", lambda: 0)(),
+            "checked_out": getattr(pool, "checkedout", lambda: 0)(),
+            "checked_in": getattr(pool, "checkedin", lambda: 0)(),
+            "overflow": getattr(pool, "overflow", lambda: 0)(),
+        }
+
+    def ping(self) -> None:
+        """
+        run a trivial query on a pooled connection, raises when the database is unreachable
+        """
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
     def generate_table(self) -> None:
         """
         create table
@@ -76,15 +780,25 @@ class MainRDB(IDB):
 
 def get_main_rdb_by_config(config: RDBConfig) -> MainRDB:
     """
-    :param config: RedisConfig instance
-    :return: MainRedis instance
+    :param config: RDBConfig instance
+    :return: MainRDB instance
     """
-    engine = create_engine(
-        (
-            f"mysql+pymysql://{config.USERNAME}:{config.PASSWORD}@"
-            f"{config.HOST}:{config.PORT}/{config.DATABASE}"
-        ),
-        pool_recycle=3600,
-        isolation_level="READ COMMITTED",
+    replicas: List[Replica] = []
+    for _i, _replica in enumerate(config.REPLICAS):
+        replica_config: RDBConfig = replace(
+            config,
+            HOST=_replica.HOST,
+            PORT=_replica.PORT,
+            USERNAME=_replica.USERNAME or config.USERNAME,
+            PASSWORD=_replica.PASSWORD or config.PASSWORD,
+            REPLICAS=[],
+        )
+        name: str = f"replica-{_i}"
+        replicas.append(Replica(name, create_rdb_engine(replica_config, name), _replica.WEIGHT))
+    return MainRDB(
+        create_rdb_engine(config, "main"),
+        replicas=replicas,
+        max_lag=config.REPLICA_MAX_LAG,
+        check_interval=config.REPLICA_CHECK_INTERVAL,
+        read_your_writes_window=config.READ_YOUR_WRITES_WINDOW,
     )
-    return MainRDB(engine)
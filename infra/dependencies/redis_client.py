@@ -5,19 +5,53 @@ dependency: redis component
 """
 
 import logging
-from dataclasses import dataclass
+import os
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
 
-from redis import Redis
+from prometheus_client import Counter, Gauge
+from redis import BlockingConnectionPool, Redis
+from redis.cluster import ClusterNode, RedisCluster
+from redis.connection import Connection
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.sentinel import Sentinel, SentinelConnectionPool
+
+from infra.dependencies.client_cache import ClientSideCache
+from infra.enums import RedisMode
 
 __all__ = [
     "get_main_redis_by_config",
+    "create_redis_pool",
+    "create_redis_cluster",
+    "create_sentinel_redis",
+    "hash_tag",
+    "parse_addresses",
+    "tagged_key",
+    "InstrumentedConnectionPool",
+    "InstrumentedSentinelConnectionPool",
     "MainRedis",
+    "MainRedisCluster",
     "Redis",
     "RedisConfig",
 ]
 
 logger = logging.getLogger(__name__)
 
+REDIS_POOL_CONNECTIONS: Gauge = Gauge(
+    "redis_pool_connections",
+    "redis connections of the process pool by state, the created sum sizes maxclients",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_TIMEOUTS: Counter = Counter(
+    "redis_pool_timeouts",
+    "callers that gave up waiting for a free redis connection",
+    ["pool"],
+)
+# Pools reset in forked children
+_pools: "weakref.WeakSet[InstrumentedConnectionPool]" = weakref.WeakSet()
+
 
 # do not check snake_case naming style
 # pylint: disable=C0103,R0902
@@ -32,6 +66,185 @@ class RedisConfig:
     DATABASE: int = 0
     PORT: int = 6379
     DECODE_RESPONSES: bool = True
+    # Connections per process, callers wait for a free one beyond it
+    MAX_CONNECTIONS: int = 50
+    # Longest wait for a free connection [seconds]
+    POOL_TIMEOUT: float = 5.0
+    # Longest wait for a reply [seconds]
+    SOCKET_TIMEOUT: float = 5.0
+    # Longest wait for a new connection [seconds]
+    SOCKET_CONNECT_TIMEOUT: float = 2.0
+    # TCP keepalive, so dead peers behind NAT or a load balancer are noticed
+    SOCKET_KEEPALIVE: bool = True
+    # Connections idle for longer are pinged before use [seconds]
+    HEALTH_CHECK_INTERVAL: int = 30
+    # standalone, sentinel or cluster
+    MODE: str = RedisMode.STANDALONE.value
+    # Sentinel addresses "host:port", HOST and PORT are ignored in sentinel mode
+    SENTINELS: List[str] = field(default_factory=list)
+    # Name of the monitored primary
+    SENTINEL_SERVICE: str = "mymaster"
+    # Password of the sentinels, empty when they do not require one
+    SENTINEL_PASSWORD: str = ""
+    # Startup node addresses "host:port" of the cluster, the other nodes are discovered
+    CLUSTER_NODES: List[str] = field(default_factory=list)
+    # Keys cached in process memory by cached_get, 0 disables the client side cache
+    CLIENT_CACHE_SIZE: int = 0
+    # Longest lifetime of a cached key [seconds], invalidation messages drop it earlier
+    CLIENT_CACHE_TTL: float = 60.0
+
+
+def hash_tag(*parts: Any) -> str:
+    """
+    keys containing the same hash tag are stored in the same cluster slot
+    :param parts: tag parts, joined by ":"
+    :return: "{part:part}"
+    """
+    return "{" + ":".join(str(_p) for _p in parts) + "}"
+
+
+def tagged_key(tag: str, *parts: Any) -> str:
+    """
+    a key in the slot of the tag, for keys used together by multi-key commands,
+    transactions or scripts [locks, throttles, tag sets]
+    :param tag: hash tag content, must not contain braces
+    :param parts: key parts after the tag
+    :return: "{tag}:part:part"
+    """
+    return ":".join([hash_tag(tag), *(str(_p) for _p in parts)])
+
+
+def parse_addresses(addresses: List[str]) -> List[Tuple[str, int]]:
+    """
+    :param addresses: "host:port" strings
+    :return: (host, port) pairs
+    """
+    result: List[Tuple[str, int]] = []
+    for _address in addresses:
+        host, _, port = _address.strip().rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"invalid redis address {_address!r}, expected host:port")
+        result.append((host, int(port)))
+    return result
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    BlockingConnectionPool that reports its connections to prometheus
+    Callers wait up to the pool timeout for a free connection instead of failing at once
+    """
+
+    def __init__(self, name: str = "main", **kwargs: Any) -> None:
+        """
+        init method
+        :param name: pool label
+        :param kwargs: BlockingConnectionPool arguments
+        """
+        self.name = name
+        self._created_gauge: Any = REDIS_POOL_CONNECTIONS.labels(name, "created")
+        self._in_use_gauge: Any = REDIS_POOL_CONNECTIONS.labels(name, "in_use")
+        super().__init__(**kwargs)  # type: ignore[no-untyped-call]
+        _pools.add(self)
+
+    def reset(self) -> None:
+        """
+        drop every connection, called on init and after fork
+        """
+        super().reset()  # type: ignore[no-untyped-call]
+        # ids of the connections handed out
+        self._leased: Set[int] = set()
+        self._created_gauge.set(0)
+        self._in_use_gauge.set(0)
+
+    def make_connection(self) -> Connection:
+        connection: Connection = super().make_connection()  # type: ignore[no-untyped-call]
+        self._created_gauge.set(len(self._connections))
+        return connection
+
+    def get_connection(self, *args: Any, **kwargs: Any) -> Connection:
+        try:
+            connection: Connection = super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            if str(e) == "No connection available.":
+                REDIS_POOL_TIMEOUTS.labels(self.name).inc()
+            raise
+        self._leased.add(id(connection))
+        self._in_use_gauge.inc()
+        return connection
+
+    def release(self, connection: Connection) -> None:
+        # Only connections handed out by get_connection of this process are counted
+        if id(connection) in self._leased:
+            self._leased.discard(id(connection))
+            self._in_use_gauge.dec()
+        super().release(connection)  # type: ignore[no-untyped-call]
+
+    def status(self) -> Dict[str, int]:
+        """
+        connection usage
+        """
+        idle: int = sum(_c is not None for _c in list(self.pool.queue))
+        return {
+            "max_connections": self.max_connections,
+            "created": len(self._connections),
+            "in_use": len(self._connections) - idle,
+            "available": idle,
+        }
+
+
+class InstrumentedSentinelConnectionPool(SentinelConnectionPool, InstrumentedConnectionPool):
+    """
+    InstrumentedConnectionPool whose connections ask the sentinels for the primary address
+    After a failover idle connections reconnect to the new primary, connections
+    in use when it happened are dropped on release
+    """
+
+    def disconnect(self, inuse_connections: bool = True) -> None:
+        """
+        the sentinel proxy disconnects the idle connections when the primary changes
+        :param inuse_connections: also disconnect the connections handed out
+        """
+        if inuse_connections:
+            super().disconnect()  # type: ignore[no-untyped-call]
+            return
+        for _connection in list(self.pool.queue):
+            if _connection is not None:
+                _connection.disconnect()
+
+    def release(self, connection: Connection) -> None:
+        owned: bool = self.owns_connection(connection)  # type: ignore[no-untyped-call]
+        if not owned and connection in self._connections:
+            # A connection to the former primary, the pool makes a new one in its place
+            self._connections.remove(connection)
+            self._created_gauge.set(len(self._connections))
+        super().release(connection)
+
+
+def _reset_after_fork() -> None:
+    """
+    Drop the connections inherited from the parent process without closing them
+    """
+    for _pool in list(_pools):
+        _pool.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _pool_status(pool: Any) -> Dict[str, int]:
+    """
+    :param pool: connection pool of a client
+    :return: connection usage
+    """
+    if isinstance(pool, InstrumentedConnectionPool):
+        return pool.status()
+    return {
+        "max_connections": pool.max_connections,
+        "created": getattr(pool, "_created_connections", 0),
+        "in_use": len(getattr(pool, "_in_use_connections", ())),
+        "available": len(getattr(pool, "_available_connections", ())),
+    }
 
 
 class MainRedis(Redis):  # type: ignore[misc] # pylint: disable=R0901,W0223
@@ -39,19 +252,151 @@ class MainRedis(Redis):  # type: ignore[misc] # pylint: disable=R0901,W0223
     redis connect factory
     """
 
+    # Opt-in, see RedisConfig.CLIENT_CACHE_SIZE
+    client_cache: Optional[ClientSideCache] = None
 
-def get_main_redis_by_config(config: RedisConfig) -> MainRedis:
+    def pool_status(self) -> Dict[str, int]:
+        """
+        connection pool usage
+        """
+        return _pool_status(self.connection_pool)
+
+    def cached_get(self, key: str) -> Any:
+        """
+        GET served from process memory when the client side cache is enabled,
+        for hot keys that rarely change
+        :param key: redis key
+        """
+        if self.client_cache is None:
+            return self.get(key)
+        return self.client_cache.get(key)
+
+
+class MainRedisCluster(RedisCluster):  # pylint: disable=R0901,W0223
+    """
+    redis cluster client, each node has its own connection pool
+    Multi-key commands, transactions and scripts need keys of one slot, see tagged_key
     """
+
+    def pool_status(self) -> Dict[str, int]:
+        """
+        connection pool usage summed over the nodes
+        """
+        status: Dict[str, int] = {"max_connections": 0, "created": 0, "in_use": 0, "available": 0}
+        for _node in self.get_nodes():  # type: ignore[no-untyped-call]
+            if _node.redis_connection is None:
+                continue
+            for _key, _value in _pool_status(_node.redis_connection.connection_pool).items():
+                status[_key] += _value
+        return status
+
+    def cached_get(self, key: str) -> Any:
+        """
+        the client side cache is not supported in cluster mode
+        :param key: redis key
+        """
+        return self.get(key)
+
+
+def create_redis_pool(config: RedisConfig, name: str) -> InstrumentedConnectionPool:
+    """
+    the connection pool of a redis server, one per process
     :param config: RedisConfig instance
-    :return: MainRedis instance
+    :param name: pool label of the metrics
+    :return: InstrumentedConnectionPool instance
     """
-    instance: MainRedis = MainRedis(
+    return InstrumentedConnectionPool(
+        name=name,
+        max_connections=config.MAX_CONNECTIONS,
+        timeout=config.POOL_TIMEOUT,
         host=config.HOST,
         port=config.PORT,
         db=config.DATABASE,
         password=config.PASSWORD,
-        **{
-            "decode_responses": config.DECODE_RESPONSES,
+        decode_responses=config.DECODE_RESPONSES,
+        socket_timeout=config.SOCKET_TIMEOUT,
+        socket_connect_timeout=config.SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=config.SOCKET_KEEPALIVE,
+        health_check_interval=config.HEALTH_CHECK_INTERVAL,
+    )
+
+
+def create_sentinel_redis(config: RedisConfig, name: str) -> MainRedis:
+    """
+    client of the primary monitored by the sentinels, followed on failover
+    :param config: RedisConfig instance
+    :param name: pool label of the metrics
+    :return: MainRedis instance
+    """
+    sentinel: Sentinel = Sentinel(  # type: ignore[no-untyped-call]
+        parse_addresses(config.SENTINELS),
+        sentinel_kwargs={
+            "password": config.SENTINEL_PASSWORD or None,
+            "socket_timeout": config.SOCKET_TIMEOUT,
+            "socket_connect_timeout": config.SOCKET_CONNECT_TIMEOUT,
+            "socket_keepalive": config.SOCKET_KEEPALIVE,
         },
     )
+    instance: MainRedis = sentinel.master_for(  # type: ignore[no-untyped-call]
+        config.SENTINEL_SERVICE,
+        redis_class=MainRedis,
+        connection_pool_class=InstrumentedSentinelConnectionPool,
+        name=name,
+        max_connections=config.MAX_CONNECTIONS,
+        timeout=config.POOL_TIMEOUT,
+        db=config.DATABASE,
+        password=config.PASSWORD or None,
+        decode_responses=config.DECODE_RESPONSES,
+        socket_timeout=config.SOCKET_TIMEOUT,
+        socket_connect_timeout=config.SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=config.SOCKET_KEEPALIVE,
+        health_check_interval=config.HEALTH_CHECK_INTERVAL,
+    )
+    return instance
+
+
+def create_redis_cluster(config: RedisConfig) -> MainRedisCluster:
+    """
+    cluster client, the slot map is loaded from the startup nodes when it is created
+    :param config: RedisConfig instance
+    :return: MainRedisCluster instance
+    """
+    startup_nodes: List[ClusterNode] = [
+        ClusterNode(_host, _port)  # type: ignore[no-untyped-call]
+        for _host, _port in parse_addresses(config.CLUSTER_NODES)
+    ]
+    instance: MainRedisCluster = MainRedisCluster(
+        startup_nodes=startup_nodes,
+        # connections per node
+        max_connections=config.MAX_CONNECTIONS,
+        password=config.PASSWORD or None,
+        decode_responses=config.DECODE_RESPONSES,
+        socket_timeout=config.SOCKET_TIMEOUT,
+        socket_connect_timeout=config.SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=config.SOCKET_KEEPALIVE,
+    )
+    return instance
+
+
+def get_main_redis_by_config(config: RedisConfig) -> MainRedis:
+    """
+    :param config: RedisConfig instance
+    :return: MainRedis instance, a MainRedisCluster in cluster mode
+    """
+    mode: RedisMode = RedisMode(config.MODE.lower())
+    if mode is RedisMode.CLUSTER:
+        # The cluster client has the command api of MainRedis
+        return cast(MainRedis, create_redis_cluster(config))
+    if mode is RedisMode.SENTINEL:
+        instance: MainRedis = create_sentinel_redis(config, "main")
+    else:
+        instance = MainRedis(connection_pool=create_redis_pool(config, "main"))
+    if config.CLIENT_CACHE_SIZE > 0:
+        instance.client_cache = ClientSideCache(
+            instance.connection_pool.connection_class,
+            instance.connection_pool.connection_kwargs,
+            instance.get,
+            max_size=config.CLIENT_CACHE_SIZE,
+            ttl=config.CLIENT_CACHE_TTL,
+        )
     return instance
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+"""
+dependency: response cache component
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+import orjson
+from redis import Redis, RedisError
+
+from infra.dependencies.redis_client import hash_tag
+from infra.utils.cache import LRUCache
+
+__all__ = [
+    "CachePolicy",
+    "CachedResponse",
+    "ResponseCache",
+    "get_response_cache",
+]
+
+logger = logging.getLogger(__name__)
+
+# Take the entries of a tag and drop its set in one atomic call, so an entry
+# tagged meanwhile lands in a new set instead of being lost
+# KEYS: tag set
+# return: entry keys
+POP_TAG_SCRIPT: str = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+redis.call('DEL', KEYS[1])
+return keys
+"""
+# Entries dropped per DEL call
+DELETE_CHUNK_SIZE: int = 1000
+# Add an entry to a tag set, the set lives as long as its longest entry
+# [PEXPIRE GT/NX needs redis 7, and a rejected command would fail the whole MULTI]
+# KEYS: tag set
+# ARGV: entry key, entry ttl [milliseconds]
+TAG_ENTRY_SCRIPT: str = """
+redis.call('SADD', KEYS[1], ARGV[1])
+if redis.call('PTTL', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    response cache policy of a route
+    requests with Authorization or Cookie bypass the cache unless vary_headers lists them
+    """
+
+    # how long a response is fresh [seconds]
+    ttl: int
+    # how long a stale response is served while it is refreshed in the background [seconds]
+    stale_ttl: int = 0
+    # request headers that are part of the cache key
+    vary_headers: Tuple[str, ...] = ()
+    # tags used to invalidate the cached responses
+    tags: Tuple[str, ...] = ()
+
+
+@dataclass
+class CachedResponse:
+    """
+    serialized response
+    """
+
+    body: bytes
+    status_code: int
+    headers: List[Tuple[str, str]]
+    # epoch time until the response is fresh
+    fresh_until: float
+    # epoch time until the response may be served stale
+    stale_until: float
+    tags: Tuple[str, ...] = field(default_factory=tuple)
+
+    def dumps(self) -> bytes:
+        """
+        serialize for redis
+        """
+        return orjson.dumps(
+            {
+                # latin-1 maps every byte to one code point, so any body round-trips
+                "body": self.body.decode("latin-1"),
+                "status_code": self.status_code,
+                "headers": self.headers,
+                "fresh_until": self.fresh_until,
+                "stale_until": self.stale_until,
+                "tags": self.tags,
+            }
+        )
+
+    @classmethod
+    def loads(cls, data: Any) -> "CachedResponse":
+        """
+        deserialize from redis
+        :param data: value of dumps
+        """
+        value: Dict[str, Any] = orjson.loads(data)
+        return cls(
+            body=value["body"].encode("latin-1"),
+            status_code=value["status_code"],
+            # json arrays back to tuples
+            headers=[(_h[0], _h[1]) for _h in value["headers"]],
+            fresh_until=value["fresh_until"],
+            stale_until=value["stale_until"],
+            tags=tuple(value["tags"]),
+        )
+
+
+class ResponseCache:
+    """
+    Two tier response cache: a per-process LRU in front of redis
+    Local entries live at most local_ttl seconds, which is also the longest time
+    other processes may serve a response invalidated by tag
+    In cluster mode the entries spread over the slots, each tag set has its own
+    hash tag, the scripts only touch one key and entries are dropped slot by slot
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        prefix: str = "response-cache",
+        local_size: int = 1024,
+        local_ttl: float = 5.0,
+    ) -> None:
+        """
+        init method
+        :param redis_client: redis client
+        :param prefix: redis key prefix
+        :param local_size: local entry count, 0 disables the local tier
+        :param local_ttl: longest life of a local entry [seconds]
+        """
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.local_ttl = local_ttl
+        self._local: LRUCache[CachedResponse] = LRUCache(local_size)
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pop_tag_script: Any = redis_client.register_script(POP_TAG_SCRIPT)
+
+    def make_key(
+        self,
+        method: str,
+        path: str,
+        query_string: str,
+        headers: Mapping[str, str],
+        *,
+        vary_headers: Tuple[str, ...] = (),
+    ) -> str:
+        """
+        cache key of a request
+        :param method: http method
+        :param path: url path
+        :param query_string: raw query string, parameter order does not matter
+        :param headers: request headers
+        :param vary_headers: headers that are part of the key
+        """
+        query: str = "&".join(sorted(query_string.split("&"))) if query_string else ""
+        vary: str = "\n".join(f"{_h}={headers.get(_h, '')}" for _h in vary_headers)
+        digest: str = hashlib.sha256(f"{method} {path}?{query}\n{vary}".encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get_local(self, key: str) -> Optional[CachedResponse]:
+        """
+        get a response from the local tier
+        :param key: cache key
+        """
+        return self._local.get(key)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        get a response, the redis tier fills the local tier [blocking]
+        :param key: cache key
+        """
+        entry: Optional[CachedResponse] = self._local.get(key)
+        if entry is not None:
+            return entry
+        try:
+            data: Any = self.redis_client.get(key)
+        except RedisError:
+            logger.warning(f"failed to read response cache {key}", exc_info=True)
+            return None
+        if data is None:
+            return None
+        entry = CachedResponse.loads(data)
+        self._set_local(key, entry)
+        return entry
+
+    def _set_local(self, key: str, entry: CachedResponse) -> None:
+        """
+        add a response to the local tier
+        :param key: cache key
+        :param entry: response
+        """
+        self._local.set(key, entry, min(self.local_ttl, entry.stale_until - time.time()))
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        """
+        add a response to both tiers [blocking]
+        :param key: cache key
+        :param entry: response
+        """
+        self._set_local(key, entry)
+        ttl_ms: int = int((entry.stale_until - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            # The entry and its tag sets may be on different nodes, no MULTI
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, entry.dumps(), px=ttl_ms)
+                for _tag in entry.tags:
+                    pipe.eval(TAG_ENTRY_SCRIPT, 1, self.tag_key(_tag), key, str(ttl_ms))
+                pipe.execute()
+        except RedisError:
+            logger.warning(f"failed to write response cache {key}", exc_info=True)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        drop every response with any of the tags [blocking]
+        :param tags: tags
+        :return: dropped redis entry count
+        """
+        if not tags:
+            return 0
+        tag_set: Set[str] = set(tags)
+        self._local.pop_matching(lambda _, _entry: bool(tag_set.intersection(_entry.tags)))
+        dropped: int = 0
+        try:
+            keys: Set[Any] = set()
+            for _tag in tag_set:
+                keys.update(
+                    self._pop_tag_script(keys=[self.tag_key(_tag)], client=self.redis_client)
+                )
+            entries: List[Any] = list(keys)
+            for _i in range(0, len(entries), DELETE_CHUNK_SIZE):
+                # The cluster client splits the keys by slot
+                deleted: Any = self.redis_client.delete(*entries[_i : _i + DELETE_CHUNK_SIZE])
+                dropped += int(deleted)
+        except RedisError:
+            logger.warning(f"failed to invalidate response cache tags {tags}", exc_info=True)
+        return dropped
+
+    def tag_key(self, tag: str) -> str:
+        """
+        redis set of the entry keys of a tag, in the cluster slot of the tag
+        :param tag: cache tag
+        """
+        return f"{self.prefix}:tag:{hash_tag(tag)}"
+
+    def try_begin_refresh(self, key: str) -> bool:
+        """
+        claim the background refresh of a stale response in this process
+        :param key: cache key
+        :return: False when a refresh is already running
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        """
+        release the background refresh claim
+        :param key: cache key
+        """
+        with self._lock:
+            self._refreshing.discard(key)
+
+
+def get_response_cache(
+    redis_client: Redis, prefix: str, local_size: int, local_ttl: float
+) -> ResponseCache:
+    """
+    :param redis_client: redis client
+    :param prefix: redis key prefix
+    :param local_size: local entry count
+    :param local_ttl: longest life of a local entry [seconds]
+    :return: ResponseCache instance
+    """
+    return ResponseCache(redis_client, prefix=prefix, local_size=local_size, local_ttl=local_ttl)
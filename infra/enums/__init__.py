@@ -4,11 +4,13 @@
 enums: enums module
 """
 
-from infra.enums.common import RuntimeEnv, Switch
+from infra.enums.common import RedisMode, RuntimeEnv, Switch, WorkerPool
 from infra.enums.status_code import StatusCode
 
 __all__ = [
     "Switch",
     "RuntimeEnv",
+    "RedisMode",
+    "WorkerPool",
     "StatusCode",
 ]
@@ -27,3 +27,29 @@ class RuntimeEnv(Enum):
     PROD = "PROD"
     # Dev
     DEVELOPMENT = "DEVELOPMENT"
+
+
+class RedisMode(Enum):
+    """
+    Redis deployment
+    """
+
+    # One server
+    STANDALONE = "standalone"
+    # Primary found through sentinels, followed on failover
+    SENTINEL = "sentinel"
+    # Keys sharded over the slots of the nodes
+    CLUSTER = "cluster"
+
+
+class WorkerPool(Enum):
+    """
+    Celery worker pool
+    """
+
+    # Processes, for CPU-bound tasks, supports time limits
+    PREFORK = "prefork"
+    # Threads, for I/O-bound tasks
+    THREADS = "threads"
+    # Greenlets, for many concurrent I/O-bound tasks, needs gevent installed
+    GEVENT = "gevent"
@@ -45,6 +45,7 @@ class StatusCode(Enum):
     WEB_APP_PERMISSION_DENIED = 4003
     WEB_APP_INVALID_TOKEN = 4004
     WEB_APP_AUTHORIZED_FAIL = 4005
+    WEB_APP_TOO_MANY_REQUESTS = 4006
 
     # success
     SUCCESS = 0
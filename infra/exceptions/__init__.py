@@ -20,6 +20,7 @@ from infra.exceptions.http import (
     HTTPException,
     InvalidToken,
     PermissionDenied,
+    TooManyRequests,
 )
 
 __all__ = [
@@ -39,4 +40,5 @@ __all__ = [
     "InvalidToken",
     "AuthorizedFail",
     "HandlerNotCallableException",
+    "TooManyRequests",
 ]
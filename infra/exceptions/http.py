@@ -17,6 +17,7 @@ __all__ = [
     "PermissionDenied",
     "InvalidToken",
     "AuthorizedFail",
+    "TooManyRequests",
 ]
 
 
@@ -78,3 +79,17 @@ class AuthorizedFail(WebAppException):
         msg: str = CODE_MAP[StatusCode.WEB_APP_AUTHORIZED_FAIL],
     ) -> None:
         super().__init__(StatusCode.WEB_APP_AUTHORIZED_FAIL, msg)
+
+
+class TooManyRequests(WebAppException):
+    """
+    rate limited exception for 429
+    """
+
+    def __init__(
+        self,
+        retry_after: float = 0,
+        msg: str = CODE_MAP[StatusCode.WEB_APP_TOO_MANY_REQUESTS],
+    ) -> None:
+        super().__init__(StatusCode.WEB_APP_TOO_MANY_REQUESTS, msg)
+        self.retry_after = retry_after
@@ -6,10 +6,11 @@ handlers: handler module
 """
 
 from infra.handlers.json.encoder import JSONEncoderHandler
-from infra.handlers.logging.logger import TraceIdFormatter, init_logger
+from infra.handlers.logging.logger import JSONFormatter, TraceIdFormatter, init_logger
 
 __all__ = [
     "init_logger",
     "JSONEncoderHandler",
+    "JSONFormatter",
     "TraceIdFormatter",
 ]
@@ -6,7 +6,10 @@ handlers: http module
 """
 
 from infra.handlers.http.error import bind_app_exception_handler
+from infra.handlers.http.static import PrecompressedStaticFiles, precompress_directory
 
 __all__ = [
     "bind_app_exception_handler",
+    "PrecompressedStaticFiles",
+    "precompress_directory",
 ]
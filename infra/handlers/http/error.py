@@ -5,20 +5,22 @@ handlers: web api global exception error handler
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+import math
+from typing import Any, Dict, List, Optional, Union
 
 import inject
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import ORJSONResponse
 
-from infra.dependencies import Auth, RequestStore
+from infra.dependencies import Auth, BaseRequestStore, RequestStore
 from infra.enums import StatusCode
 from infra.exceptions import (
     AppException,
     AuthenticationFailed,
     HTTPException,
     PermissionDenied,
+    TooManyRequests,
     WebAppException,
 )
 from infra.utils import make_json_response
@@ -35,7 +37,7 @@ async def record_request_log(_request: Optional[Request]) -> None:
     record request log
     """
     auth: Auth = inject.instance(Auth)
-    request_store: RequestStore = auth.get_request() or RequestStore()
+    request_store: Union[RequestStore, BaseRequestStore] = auth.get_request() or RequestStore()
     logger.warning(
         f"request_url: {request_store.url}, method: {request_store.method}, "
         f"header: {request_store.header}, "
@@ -100,6 +102,15 @@ async def handler_web_app_exception_error(
     :param exception: exception object
     :return: ORJSONResponse fastapi response
     """
+    # deal with rate limited requests, skip the request log so abusive clients stay cheap
+    if isinstance(exception, TooManyRequests):
+        return ORJSONResponse(
+            status_code=429,
+            content=make_json_response(
+                StatusCode.WEB_APP_TOO_MANY_REQUESTS, None, exception.errors()
+            ),
+            headers={"Retry-After": str(max(1, math.ceil(exception.retry_after)))},
+        )
     # record request log
     await record_request_log(request)
     # deal with authentication exception
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+handlers: precompressed static files
+"""
+
+import logging
+import mimetypes
+import os
+import re
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+from infra.utils.compression import (
+    compress,
+    is_compressible_type,
+    negotiate_encoding,
+    supported_encodings,
+)
+
+__all__ = [
+    "PrecompressedStaticFiles",
+    "precompress_directory",
+]
+
+logger = logging.getLogger(__name__)
+# Sibling file suffix of each encoding
+ENCODING_SUFFIXES: Dict[str, str] = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+# Build time compression level of each encoding
+ENCODING_LEVELS: Dict[str, int] = {"zstd": 19, "br": 11, "gzip": 9}
+# Content hash in a file name, like app.3f2a9c1b.js or app-3f2a9c1b.min.js
+HASHED_NAME_PATTERN: str = r"[.-][0-9a-fA-F]{8,}\."
+
+
+def _compress_file(path: str, encoding: str) -> Optional[str]:
+    """
+    write the compressed sibling of a file when it is missing or stale
+    :param path: original file path
+    :param encoding: content encoding
+    :return: sibling path, None when compressing does not pay off
+    """
+    sibling: str = path + ENCODING_SUFFIXES[encoding]
+    if os.path.exists(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+        return sibling
+    with open(path, "rb") as f:
+        data: bytes = f.read()
+    compressed: bytes = compress(encoding, data, ENCODING_LEVELS.get(encoding))
+    if len(compressed) >= len(data):
+        return None
+    # Write to a temporary file first, so concurrent workers never serve a partial file
+    tmp_path: str = f"{sibling}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, sibling)
+    return sibling
+
+
+def precompress_directory(directory: str, minimum_size: int = 1024) -> Dict[str, Dict[str, str]]:
+    """
+    compress every compressible file of a directory into .zst/.br/.gz siblings
+    :param directory: static directory
+    :param minimum_size: smaller files are skipped [bytes]
+    :return: {real path of the original file: {encoding: sibling path}}
+    """
+    variants: Dict[str, Dict[str, str]] = {}
+    suffixes = tuple(ENCODING_SUFFIXES.values())
+    encodings = [_e for _e in supported_encodings() if _e in ENCODING_SUFFIXES]
+    for root, _, files in os.walk(directory):
+        for _name in files:
+            if _name.endswith(suffixes) or _name.endswith(".tmp"):
+                continue
+            path: str = os.path.realpath(os.path.join(root, _name))
+            media_type: Optional[str] = mimetypes.guess_type(_name)[0]
+            if not media_type or not is_compressible_type(media_type):
+                continue
+            try:
+                if os.path.getsize(path) < minimum_size:
+                    continue
+                for _encoding in encodings:
+                    sibling: Optional[str] = _compress_file(path, _encoding)
+                    if sibling is not None:
+                        variants.setdefault(path, {})[_encoding] = sibling
+            except OSError:
+                logger.warning(f"failed to precompress static file {path}", exc_info=True)
+    return variants
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving the precompressed sibling negotiated from Accept-Encoding,
+    with caching headers [html is revalidated, assets with a content hash in the name
+    are immutable, the others expire after max_age]
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str,
+        html: bool = False,
+        minimum_size: int = 1024,
+        max_age: int = 3600,
+        immutable_max_age: int = 365 * 24 * 3600,
+        hashed_name_pattern: str = HASHED_NAME_PATTERN,
+        precompress: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """
+        init method
+        :param directory: static directory
+        :param html: run in HTML mode
+        :param minimum_size: smaller files are not precompressed [bytes]
+        :param max_age: Cache-Control max-age of non html files without a content hash [seconds]
+        :param immutable_max_age: Cache-Control max-age of files with a content hash [seconds]
+        :param hashed_name_pattern: regex finding the content hash in a file name
+        :param precompress: compress missing or stale siblings now,
+                            otherwise only siblings built beforehand are served
+        """
+        super().__init__(directory=directory, html=html, **kwargs)
+        self.max_age = max_age
+        self.immutable_max_age = immutable_max_age
+        self.hashed_name = re.compile(hashed_name_pattern)
+        self.variants: Dict[str, Dict[str, str]] = {}
+        if os.path.isdir(directory):
+            if precompress:
+                self.variants = precompress_directory(directory, minimum_size)
+            else:
+                self.variants = self._scan_variants(directory)
+
+    @staticmethod
+    def _scan_variants(directory: str) -> Dict[str, Dict[str, str]]:
+        """
+        collect siblings built beforehand
+        :param directory: static directory
+        """
+        variants: Dict[str, Dict[str, str]] = {}
+        for root, _, files in os.walk(directory):
+            names = set(files)
+            for _name in files:
+                for _encoding, _suffix in ENCODING_SUFFIXES.items():
+                    if _name + _suffix in names:
+                        path: str = os.path.realpath(os.path.join(root, _name))
+                        variants.setdefault(path, {})[_encoding] = path + _suffix
+        return variants
+
+    def cache_control(self, path: str, media_type: str) -> str:
+        """
+        Cache-Control of a file, a redeployed file keeps its name unless it is content hashed
+        :param path: file path
+        :param media_type: file media type
+        """
+        if media_type == "text/html":
+            return "no-cache"
+        if self.hashed_name.search(os.path.basename(path)):
+            return f"public, max-age={self.immutable_max_age}, immutable"
+        return f"public, max-age={self.max_age}"
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers: Headers = Headers(scope=scope)
+        media_type: str = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers: Dict[str, str] = {"Cache-Control": self.cache_control(str(full_path), media_type)}
+        path: PathLike = full_path
+        variants: Optional[Dict[str, str]] = self.variants.get(os.path.realpath(full_path))
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+            encoding: Optional[str] = None
+            # Byte ranges always refer to the original file
+            if "range" not in request_headers:
+                encoding = negotiate_encoding(
+                    request_headers.get("accept-encoding", ""), list(variants)
+                )
+            if encoding is not None:
+                try:
+                    sibling_stat: os.stat_result = os.stat(variants[encoding])
+                except OSError:
+                    logger.warning(f"precompressed file {variants[encoding]} is gone")
+                else:
+                    # A sibling older than the original is stale
+                    if sibling_stat.st_mtime >= stat_result.st_mtime:
+                        path, stat_result = variants[encoding], sibling_stat
+                        headers["Content-Encoding"] = encoding
+        response: Response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
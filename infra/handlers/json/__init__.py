@@ -5,8 +5,10 @@
 handlers: json handler
 """
 
-from infra.handlers.json.encoder import JSONEncoderHandler
+from infra.handlers.json.encoder import JSONEncoderHandler, json_dumps, orjson_default
 
 __all__ = [
     "JSONEncoderHandler",
+    "json_dumps",
+    "orjson_default",
 ]
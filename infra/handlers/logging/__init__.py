@@ -4,8 +4,12 @@
 handlers: logging handler
 """
 
-from infra.handlers.logging.logger import init_logger
+from infra.handlers.logging.filters import LogSampler
+from infra.handlers.logging.logger import JSONFormatter, TraceIdFormatter, init_logger
 
 __all__ = [
     "init_logger",
+    "JSONFormatter",
+    "LogSampler",
+    "TraceIdFormatter",
 ]
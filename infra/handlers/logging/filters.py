@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+handlers: logging filters
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+__all__ = [
+    "LogSampler",
+    "report_dropped_records",
+]
+
+# Samplers flushed on stop and reset in forked children
+_samplers: "weakref.WeakSet[LogSampler]" = weakref.WeakSet()
+
+
+class LogSampler(logging.Filter):
+    """
+    Sample and rate limit the records of a high-volume logger
+    Warnings and errors always pass. Attach it to the logger, not to a handler,
+    so dropped records are never formatted or queued
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate_limit: int = 0) -> None:
+        """
+        init method
+        :param sample_rate: share of the records kept, 0 ~ 1
+        :param rate_limit: records kept per second, 0 means unlimited
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self._window: int = int(time.monotonic())
+        self._count: int = 0
+        self._dropped: int = 0
+        # Logger of the dropped records, the sampler is attached to it
+        self._name: str = ""
+        self._lock = threading.Lock()
+        _samplers.add(self)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        :param record: LogRecord instance
+        :return: False to drop the record
+        """
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.rate_limit <= 0:
+            return True
+        window: int = int(time.monotonic())
+        dropped: int = 0
+        with self._lock:
+            if window != self._window:
+                dropped, self._dropped = self._dropped, 0
+                self._window, self._count = window, 0
+            self._count += 1
+            allowed: bool = self._count <= self.rate_limit
+            if not allowed:
+                self._dropped += 1
+                self._name = record.name
+        if dropped:
+            self._warn(dropped)
+        return allowed
+
+    def report_dropped(self) -> None:
+        """
+        report the records dropped in the current window now, without waiting
+        for a record of the next window [before a shutdown or a reconfiguration]
+        """
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            self._warn(dropped)
+
+    def _warn(self, dropped: int) -> None:
+        """
+        :param dropped: dropped record count
+        """
+        # Passes this filter as a warning
+        logging.getLogger(self._name).warning(
+            f"{dropped} log records were dropped, more than {self.rate_limit}/s"
+        )
+
+    def _reset(self) -> None:
+        """
+        forget the counts inherited from the parent process, the parent reports them
+        """
+        self._lock = threading.Lock()
+        self._window, self._count, self._dropped = int(time.monotonic()), 0, 0
+
+
+def report_dropped_records() -> None:
+    """
+    report the records dropped by every sampler in its current window
+    """
+    for _sampler in list(_samplers):
+        _sampler.report_dropped()
+
+
+def _reset_after_fork() -> None:
+    """
+    The child starts with empty windows
+    """
+    for _sampler in list(_samplers):
+        _sampler._reset()  # pylint: disable=W0212
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -6,39 +6,110 @@ handlers: logger handler
 
 import configparser
 import logging
+from datetime import datetime
 from logging.config import fileConfig
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 import inject
+import orjson
 
 from infra.dependencies.registry import Registry
+from infra.handlers.logging.filters import LogSampler
+from infra.handlers.logging.queue import start_queue_logging, stop_queue_logging
 
 __all__ = [
     "init_logger",
+    "JSONFormatter",
     "TraceIdFormatter",
+    "TraceIdRecordFactory",
 ]
 
 
-class TraceIdFormatter(logging.Formatter):
+class TraceIdRecordFactory:
     """
-    subclass of logging.Formatter
+    LogRecord factory that stores the trace id when the record is created
+    The record is formatted later in the listener thread, where the request
+    context of the caller is gone
     """
 
-    def format(self, record: logging.LogRecord) -> str:
+    def __init__(self, factory: Callable[..., logging.LogRecord]) -> None:
+        """
+        init method
+        :param factory: the previous record factory
+        """
+        self.factory = factory
+        self._injector: Optional[inject.Injector] = None
+        self._registry: Optional[Registry] = None
+
+    def get_trace_id(self) -> str:
+        """
+        trace id of the current request or task
+        """
+        injector: Optional[inject.Injector] = inject.get_injector()
+        if injector is None:
+            return ""
+        if injector is not self._injector:
+            # Set before resolving, a record logged while resolving gets no trace id
+            self._injector, self._registry = injector, None
+            self._registry = injector.get_instance(Registry)
+        if self._registry is None:
+            return ""
+        return self._registry.get_trace_id() or ""
+
+    def __call__(self, *args: Any, **kwargs: Any) -> logging.LogRecord:
+        record: logging.LogRecord = self.factory(*args, **kwargs)
         # noinspection PyBroadException
         try:
-            registry: Registry = inject.instance(Registry)
-            # Add trace id to log messages
-            record.trace_id = registry.get_trace_id() or ""
+            record.trace_id = self.get_trace_id()
         # pylint: disable=W0703
         except Exception:
             record.trace_id = ""
+        return record
+
+
+class TraceIdFormatter(logging.Formatter):
+    """
+    subclass of logging.Formatter
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        # The trace id is stored by TraceIdRecordFactory
+        record.trace_id = getattr(record, "trace_id", "")
         # Add tags to log messages
         record.tag = getattr(record, "tag", "default")
         # Remove all line breaks
         return super().format(record).replace("\n", " ")
 
 
+class JSONFormatter(logging.Formatter):
+    """
+    one json object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat("T", "milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", ""),
+            "tag": getattr(record, "tag", "default"),
+            "process": record.process,
+            "thread": record.thread,
+            "file": record.filename,
+            "line": record.lineno,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return orjson.dumps(data, default=str).decode()
+
+
 def init_logger(log_config_file: Optional[str] = None) -> None:
     """
     load logger config
@@ -46,6 +117,12 @@ def init_logger(log_config_file: Optional[str] = None) -> None:
     """
     # pylint: disable=C0415
     from infra.dependencies import Config
+    from infra.enums import Switch
+
+    if not isinstance(logging.getLogRecordFactory(), TraceIdRecordFactory):
+        logging.setLogRecordFactory(TraceIdRecordFactory(logging.getLogRecordFactory()))
+    # fileConfig closes the handlers the listener is writing to
+    stop_queue_logging()
 
     config_cp: configparser.ConfigParser = configparser.ConfigParser()
 
@@ -60,9 +137,23 @@ def init_logger(log_config_file: Optional[str] = None) -> None:
     root_logger = logging.getLogger()
     loggers = [root_logger]
     for i in map(str.strip, config_cp["loggers"]["keys"].split(",")):
-        if i == "root":
-            continue
-        loggers.append(logging.getLogger(i))
+        section: configparser.SectionProxy = config_cp[f"logger_{i}"]
+        logger: logging.Logger = root_logger
+        if i != "root":
+            logger = logging.getLogger(section["qualname"])
+            loggers.append(logger)
+        for _filter in [_f for _f in logger.filters if isinstance(_f, LogSampler)]:
+            _filter.report_dropped()
+            logger.removeFilter(_filter)
+        # Optional sampling of high-volume loggers [levels below WARNING]
+        sample_rate: float = section.getfloat("sample_rate", 1.0)
+        rate_limit: int = section.getint("rate_limit", 0)
+        if sample_rate < 1 or rate_limit > 0:
+            logger.addFilter(LogSampler(sample_rate=sample_rate, rate_limit=rate_limit))
+
+    for _logger in loggers:
+        _logger.setLevel(Config.LOG_LEVEL)
 
-    for logger in loggers:
-        logger.setLevel(Config.LOG_LEVEL)
+    # Format and write records in a listener thread
+    if Config.LOG_QUEUE == Switch.Open:
+        start_queue_logging(loggers, Config.LOG_QUEUE_SIZE)
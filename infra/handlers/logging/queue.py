@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+handlers: non-blocking logging through a queue
+The calling thread only builds the record and puts it into a queue,
+a listener thread formats it and writes it to the real handlers
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+from infra.handlers.logging.filters import report_dropped_records
+
+__all__ = [
+    "NonBlockingQueueHandler",
+    "start_queue_logging",
+    "stop_queue_logging",
+]
+
+# Formats tracebacks in the calling thread, the frames must not outlive the call
+_exception_formatter: logging.Formatter = logging.Formatter()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+# logger: its own handlers, restored when the listener stops
+_logger_handlers: Dict[logging.Logger, List[logging.Handler]] = {}
+_fork_hook_registered: bool = False
+_lock = threading.Lock()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller
+    Records are dropped and counted when the queue is full
+    """
+
+    def __init__(self, log_queue: "queue.SimpleQueue[logging.LogRecord]", queue_size: int) -> None:
+        """
+        init method
+        :param log_queue: lock-free queue
+        :param queue_size: records kept before new ones are dropped
+        """
+        super().__init__(log_queue)
+        self.log_queue: "queue.SimpleQueue[logging.LogRecord]" = log_queue
+        self.queue_size = queue_size
+        self.dropped: int = 0
+
+    def set_queue(self, log_queue: "queue.SimpleQueue[logging.LogRecord]") -> None:
+        """
+        replace the queue
+        :param log_queue: lock-free queue
+        """
+        self.queue = self.log_queue = log_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        merge the arguments into the message, unlike QueueHandler.prepare the
+        record is neither formatted nor copied here: this handler is the only one
+        of its loggers, and the listener formatters still see every field
+        :param record: LogRecord instance
+        :return: the record, safe to hand over to another thread
+        """
+        message: str = record.getMessage()
+        record.message = message
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        put without waiting
+        :param record: LogRecord instance
+        """
+        # qsize of SimpleQueue is cheap, a bounded queue.Queue would take a lock per put
+        if self.log_queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            return
+        self.log_queue.put_nowait(record)
+
+
+def _collect_handlers(loggers: List[logging.Logger]) -> List[logging.Handler]:
+    """
+    the distinct handlers of the loggers, loggers of one config file share instances
+    :param loggers: loggers
+    """
+    handlers: List[logging.Handler] = []
+    for _logger in loggers:
+        for _handler in _logger.handlers:
+            if _handler not in handlers and not isinstance(_handler, QueueHandler):
+                handlers.append(_handler)
+    return handlers
+
+
+def _restart_after_fork() -> None:
+    """
+    The listener thread does not survive fork, start a new one in the child
+    The queue is replaced, its lock may have been held by another thread at fork time
+    """
+    global _listener  # pylint: disable=W0603
+    if _listener is None or _queue_handler is None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler.set_queue(log_queue)
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def start_queue_logging(loggers: List[logging.Logger], queue_size: int) -> None:
+    """
+    move the handlers of the loggers behind one queue and start the listener thread
+    :param loggers: loggers configured with real handlers
+    :param queue_size: records kept before new ones are dropped
+    """
+    global _listener, _queue_handler, _fork_hook_registered  # pylint: disable=W0603
+    with _lock:
+        stop_queue_logging()
+        handlers: List[logging.Handler] = _collect_handlers(loggers)
+        if not handlers:
+            return
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = NonBlockingQueueHandler(log_queue, queue_size)
+        for _logger in loggers:
+            if _logger.handlers:
+                _logger_handlers[_logger] = _logger.handlers
+                _logger.handlers = [_queue_handler]
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        if not _fork_hook_registered:
+            os.register_at_fork(after_in_child=_restart_after_fork)
+            # Drain the queue before logging.shutdown closes the handlers
+            atexit.register(stop_queue_logging)
+            _fork_hook_registered = True
+
+
+def stop_queue_logging() -> None:
+    """
+    write the queued records and stop the listener thread
+    """
+    global _listener  # pylint: disable=W0603
+    if _listener is None:
+        return
+    # Queued before the listener drains the queue
+    report_dropped_records()
+    listener: QueueListener = _listener
+    _listener = None
+    # The thread is missing in a forked child that did not restart it
+    if getattr(listener, "_thread", None) is not None:
+        listener.stop()
+    for _logger, _handlers in _logger_handlers.items():
+        _logger.handlers = _handlers
+    _logger_handlers.clear()
+    if _queue_handler is not None and _queue_handler.dropped:
+        logging.getLogger(__name__).warning(
+            f"{_queue_handler.dropped} log records were dropped, the log queue was full"
+        )
@@ -5,8 +5,13 @@
 middlewares: middlewares module
 """
 
-from infra.middlewares.http import user_define_http_middleware
+from infra.middlewares.compression import CompressionMiddleware
+from infra.middlewares.http import LazyRequestStore, RequestContextMiddleware
+from infra.middlewares.metrics import MetricsMiddleware
 
 __all__ = [
-    "user_define_http_middleware",
+    "CompressionMiddleware",
+    "LazyRequestStore",
+    "RequestContextMiddleware",
+    "MetricsMiddleware",
 ]
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+middlewares: response compression middlewares module
+"""
+
+import logging
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infra.utils.compression import (
+    ICompressor,
+    get_compressor,
+    is_compressible_type,
+    negotiate_encoding,
+)
+
+__all__ = [
+    "CompressionMiddleware",
+]
+
+logger = logging.getLogger(__name__)
+# Status codes that must not be compressed
+UNCOMPRESSED_STATUS = (204, 206, 304)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware
+    Compress responses with the encoding negotiated from Accept-Encoding [zstd, br, gzip],
+    bodies under minimum_size are sent as is, streaming responses are compressed chunk
+    by chunk, and large single bodies are compressed in a worker thread
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        thread_threshold: int = 256 * 1024,
+    ) -> None:
+        """
+        init method
+        :param app: ASGI application
+        :param minimum_size: smaller bodies are not compressed [bytes]
+        :param thread_threshold: larger single bodies are compressed in a worker thread [bytes]
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding: Optional[str] = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder: CompressionResponder = CompressionResponder(
+            send, encoding, self.minimum_size, self.thread_threshold
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """
+    compress the response of one request
+    """
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int, thread_threshold: int) -> None:
+        """
+        init method
+        :param send: ASGI send
+        :param encoding: negotiated content encoding
+        :param minimum_size: smaller bodies are not compressed [bytes]
+        :param thread_threshold: larger single bodies are compressed in a worker thread [bytes]
+        """
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+        self.initial_message: Message = {}
+        self.started: bool = False
+        self.passthrough: bool = False
+        self.compressor: Optional[ICompressor] = None
+
+    def _should_compress(self) -> bool:
+        """
+        decide from the response start message
+        """
+        if self.initial_message["status"] in UNCOMPRESSED_STATUS:
+            return False
+        headers: Headers = Headers(raw=self.initial_message["headers"])
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        return is_compressible_type(headers.get("content-type", ""))
+
+    def _set_headers(self, content_length: Optional[int]) -> None:
+        """
+        update headers of the start message for the compressed body
+        :param content_length: compressed length, None for streaming
+        """
+        headers: MutableHeaders = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send(self, message: Message) -> None:
+        """
+        ASGI send wrapper
+        :param message: ASGI message
+        """
+        if message["type"] == "http.response.start":
+            self.initial_message = message
+            self.passthrough = not self._should_compress()
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self._send(self.initial_message)
+                await self._send(message)
+                return
+            self.compressor = get_compressor(self.encoding)
+            if not more_body:
+                # Complete body, compress in one go
+                compressed: bytes = await self._compress(body, finish=True)
+                self._set_headers(len(compressed))
+                await self._send(self.initial_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            self._set_headers(None)
+            await self._send(self.initial_message)
+        elif self.passthrough:
+            await self._send(message)
+            return
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": await self._compress(body, finish=not more_body),
+                "more_body": more_body,
+            }
+        )
+
+    async def _compress(self, body: bytes, finish: bool) -> bytes:
+        """
+        compress a chunk, large chunks are compressed in a worker thread
+        :param body: raw chunk
+        :param finish: end the stream after this chunk
+        """
+        assert self.compressor is not None
+        compressor: ICompressor = self.compressor
+
+        def _do() -> bytes:
+            data: bytes = compressor.compress(body) if body else b""
+            return data + compressor.finish() if finish else data
+
+        if len(body) > self.thread_threshold:
+            return await run_in_threadpool(_do)
+        return _do()
@@ -7,96 +7,166 @@ middlewares: http middlewares module
 
 import logging
 import time
-from typing import Callable
+from functools import cached_property
+from typing import Any, Dict, List
 
 import inject
-from fastapi import Request, Response
 from fastapi.responses import ORJSONResponse
-from starlette.types import Message
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from infra.dependencies import Auth, Config, RequestStore
+from infra.dependencies import Auth, BaseRequestStore, Config
+from infra.dependencies.rdb import read_your_writes_scope, statement_scope
 from infra.enums import StatusCode
 from infra.utils import make_json_response
 
 __all__ = [
-    "user_define_http_middleware",
+    "LazyRequestStore",
+    "RequestContextMiddleware",
 ]
 
 logger = logging.getLogger(__name__)
 config: Config = inject.instance(Config)
 
 
-async def _set_body(request: Request, body: bytes) -> None:
+class LazyRequestStore(BaseRequestStore):
     """
-    set body
-    for fix: https://github.com/tiangolo/fastapi/issues/394
-    :param request: request
-    :param body: body bytes
-    :return: body bytes
+    Request info read from the ASGI scope
+    Every field is materialized on first access, the body is recorded while
+    the application reads it, so nothing is buffered in advance
     """
 
-    async def receive() -> Message:
-        return {"type": "http.request", "body": body}
-
-    # pylint: disable=W0212
-    request._receive = receive
-
+    def __init__(self, scope: Scope) -> None:
+        """
+        init method
+        :param scope: ASGI scope
+        """
+        self._connection: HTTPConnection = HTTPConnection(scope)
+        self._body_chunks: List[bytes] = []
+
+    def __repr__(self) -> str:
+        # Only what the scope already holds, the other fields stay lazy
+        return (
+            f"{self.__class__.__name__}"
+            f"({self._connection.scope['method']} {self._connection.scope['path']})"
+        )
 
-async def _get_body(request: Request) -> bytes:
+    def record_body(self, chunk: bytes) -> None:
+        """
+        record a chunk of the request body
+        :param chunk: body chunk
+        """
+        if chunk:
+            self._body_chunks.append(chunk)
+
+    @cached_property
+    def client_ip(self) -> str:
+        """get user ip"""
+        headers_list: List[str] = self._connection.headers.getlist("X-Forwarded-For")
+        if headers_list:
+            return headers_list[0]
+        return self._connection.client.host if self._connection.client else ""
+
+    @cached_property
+    def base_url(self) -> str:
+        """base url"""
+        return str(self._connection.base_url)
+
+    @cached_property
+    def url(self) -> str:
+        """full url"""
+        return str(self._connection.url)
+
+    @cached_property
+    def method(self) -> str:
+        """http method"""
+        return str(self._connection.scope["method"])
+
+    @cached_property
+    def header(self) -> str:
+        """http headers"""
+        return str(self._connection.headers)
+
+    @property
+    def body(self) -> bytes:
+        """the part of the body read by the application so far"""
+        if len(self._body_chunks) > 1:
+            self._body_chunks = [b"".join(self._body_chunks)]
+        return self._body_chunks[0] if self._body_chunks else b""
+
+    @property
+    def path_params(self) -> Dict[str, Any]:
+        """path params, filled in once the router has matched the route"""
+        return self._connection.path_params
+
+    @cached_property
+    def query_params(self) -> Dict[str, Any]:
+        """query params"""
+        return dict(self._connection.query_params)
+
+
+class RequestContextMiddleware:
     """
-    get body
-    for fix: https://github.com/tiangolo/fastapi/issues/394
-    :param request: request
-    :return: body bytes
+    Pure ASGI middleware
+    Bind a lazily built RequestStore to Auth for each http request,
+    report slow apis and turn unexpected errors into a 500 json response
     """
-    body: bytes = await request.body()
-    await _set_body(request, body)
-    return body
-
 
-async def user_define_http_middleware(request: Request, call_next: Callable) -> Response:
-    """
-    User-defined middleware
-    :param request: request object
-    :param call_next: next middleware
-    :return: Response instance
-    """
-    # get user ip
-    headers_list = request.headers.getlist("X-Forwarded-For")
-    client_ip: str = headers_list[0] if headers_list else request.client.host
-    auth: Auth = inject.instance(Auth)
-    body: bytes = await _get_body(request)
-    request_store: RequestStore = RequestStore()
-    request_store.client_ip = client_ip
-    request_store.base_url = str(request.base_url)
-    request_store.url = str(request.url)
-    request_store.method = request.method
-    request_store.header = str(request.headers)
-    request_store.body = body
-    request_store.path_params = request.path_params
-    request_store.query_params = dict(request.query_params)
-    auth.set_request(request_store)
-    logger.debug(f"user_define_http_middleware: get request, content is {request_store}")
-    # Record request start time
-    start_time: float = time.time()
-    # noinspection PyBroadException
-    try:
-        response = await call_next(request)
-    # pylint: disable=W0703
-    except Exception:
-        response = ORJSONResponse(
-            status_code=500,
-            content=make_json_response(
-                code=StatusCode.UNEXPECTED_ERROR,
-            ),
-        )
-        logger.error("unexpected error", exc_info=True)
-    finally:
-        auth.clear()
-
-    process_time: float = time.time() - start_time
-    if process_time > config.SLOW_API_LIMIT_TIME:
-        logger.warning(
-            f"slow api found, process_time {int(process_time)}s: {request.method} {request.url}"
-        )
-    return response
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        init method
+        :param app: ASGI application
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        auth: Auth = inject.instance(Auth)
+        request_store: LazyRequestStore = LazyRequestStore(scope)
+        auth.set_request(request_store)
+        response_started: bool = False
+
+        async def receive_wrapper() -> Message:
+            message: Message = await receive()
+            if message["type"] == "http.request":
+                request_store.record_body(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        # Record request start time
+        start_time: float = time.perf_counter()
+        # noinspection PyBroadException
+        try:
+            # Reads after a write of this request go to the primary,
+            # statements of this request are counted under its trace id
+            with read_your_writes_scope(), statement_scope(f"{scope['method']} {scope['path']}"):
+                await self.app(scope, receive_wrapper, send_wrapper)
+        # pylint: disable=W0703
+        except Exception:
+            logger.error("unexpected error", exc_info=True)
+            # The response can not be replaced once it has started
+            if response_started:
+                raise
+            response = ORJSONResponse(
+                status_code=500,
+                content=make_json_response(
+                    code=StatusCode.UNEXPECTED_ERROR,
+                ),
+            )
+            await response(scope, receive, send)
+        finally:
+            auth.clear()
+
+        process_time: float = time.perf_counter() - start_time
+        if process_time > config.SLOW_API_LIMIT_TIME:
+            logger.warning(
+                f"slow api found, process_time {int(process_time)}s: "
+                f"{request_store.method} {request_store.url}"
+            )
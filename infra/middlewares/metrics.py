@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+middlewares: http metrics middlewares module
+"""
+
+import logging
+import time
+from typing import Any, Dict, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    "MetricsMiddleware",
+    "REQUEST_LATENCY",
+    "REQUESTS_IN_FLIGHT",
+    "REQUEST_SIZE",
+    "RESPONSE_SIZE",
+]
+
+logger = logging.getLogger(__name__)
+# Route label of requests no route matched, keeps the label cardinality bounded
+UNMATCHED_ROUTE: str = "<unmatched>"
+
+REQUEST_LATENCY: Histogram = Histogram(
+    "http_request_duration_seconds",
+    "http request latency",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT: Gauge = Gauge(
+    "http_requests_in_flight",
+    "http requests being processed",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_SIZE: Counter = Counter(
+    "http_request_size_bytes",
+    "http request body size",
+    ["route", "method"],
+)
+RESPONSE_SIZE: Counter = Counter(
+    "http_response_size_bytes",
+    "http response body size",
+    ["route", "method", "status"],
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware
+    Record latency, in-flight requests and body sizes per route, method and status
+    labelled children are cached, so recording is a few dict lookups and increments
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        init method
+        :param app: ASGI application
+        """
+        self.app = app
+        self._in_flight: Dict[str, Any] = {}
+        self._children: Dict[Tuple[str, str, int], Tuple[Any, Any, Any]] = {}
+
+    def _get_children(self, route: str, method: str, status: int) -> Tuple[Any, Any, Any]:
+        """
+        labelled latency, request size and response size children
+        :param route: route path template
+        :param method: http method
+        :param status: response status
+        """
+        key: Tuple[str, str, int] = (route, method, status)
+        children = self._children.get(key)
+        if children is None:
+            children = (
+                REQUEST_LATENCY.labels(route, method, str(status)),
+                REQUEST_SIZE.labels(route, method),
+                RESPONSE_SIZE.labels(route, method, str(status)),
+            )
+            self._children[key] = children
+        return children
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method: str = scope["method"]
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = REQUESTS_IN_FLIGHT.labels(method)
+        status: int = 500
+        request_size: int = 0
+        response_size: int = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message: Message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.inc()
+        start_time: float = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            process_time: float = time.perf_counter() - start_time
+            in_flight.dec()
+            # The router stores the matched route in the scope
+            route: Any = scope.get("route")
+            route_path: str = getattr(route, "path", UNMATCHED_ROUTE) if route else UNMATCHED_ROUTE
+            latency, request_counter, response_counter = self._get_children(
+                route_path, method, status
+            )
+            latency.observe(process_time)
+            if request_size:
+                request_counter.inc(request_size)
+            if response_size:
+                response_counter.inc(response_size)
@@ -5,12 +5,13 @@
 model: orm base model
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Sequence
 
 from sqlalchemy import BigInteger, Column, DateTime, Integer, String, func
 from sqlalchemy.orm import DeclarativeBase
 
 from infra.models.mixin import ToDictMixin
+from infra.models.serializer import get_serializer
 
 __all__ = ["Base", "BaseModel"]
 
@@ -22,7 +23,16 @@ class Base(DeclarativeBase):  # type: ignore[misc]
         """
         orm model to dict
         """
-        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+        return get_serializer(type(self)).serialize(self)
+
+    @classmethod
+    def models_to_columns(cls, rows: Sequence["Base"]) -> Dict[str, List[Any]]:
+        """
+        orm models to column arrays
+        :param rows: model instances of this class
+        :return: column name: values of every row
+        """
+        return get_serializer(cls).columns(rows)
 
 
 class BaseModel(Base, ToDictMixin):
@@ -6,7 +6,9 @@ model: mixin model
 """
 
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from infra.models.serializer import DATETIME_FORMAT, get_serializer
 
 __all = ["ToDictMixin"]
 
@@ -16,26 +18,39 @@ class ToDictMixin:
     convert model to dict
     """
 
+    def _dict_keys(self) -> Optional[Tuple[str, ...]]:
+        """
+        the dict_keys to serialize, None means every table column
+        """
+        keys: Any = getattr(self, "dict_keys", None)
+        return tuple(keys) if keys is not None else None
+
     # do not use it directly
     def to_dict(self) -> Dict[str, Any]:
         """
         convert model to dict
         """
-        res: Dict[str, Any] = {}
-        if hasattr(self, "dict_keys"):
-            keys = self.dict_keys
+        keys: Optional[Tuple[str, ...]] = self._dict_keys()
+        try:
+            return get_serializer(type(self), keys, datetime_format=True).serialize(self)
+        except AttributeError:
+            # A key the instance does not have as an attribute
+            if keys is None:
+                keys = tuple(_c.name for _c in getattr(getattr(self, "__table__"), "columns"))
+            res: Dict[str, Any] = {}
             for c in keys:
                 v = getattr(self, c, None)
-                if isinstance(v, datetime):
-                    res.update({c: v.strftime("%Y-%m-%d %H:%M:%S")})
-                else:
-                    res.update({c: v})
-        else:
-            keys = getattr(getattr(self, "__table__"), "columns")
-            for c in keys:
-                v = getattr(self, c.name, None)
-                if isinstance(v, datetime):
-                    res.update({c.name: v.strftime("%Y-%m-%d %H:%M:%S")})
-                else:
-                    res.update({c.name: v})
-        return res
+                res[c] = v.strftime(DATETIME_FORMAT) if isinstance(v, datetime) else v
+            return res
+
+    @classmethod
+    def to_columns(cls, rows: Sequence["ToDictMixin"]) -> Dict[str, List[Any]]:
+        """
+        convert models of this class to column arrays, formatted like to_dict
+        :param rows: model instances
+        :return: key: values of every row
+        """
+        keys: Any = getattr(cls, "dict_keys", None)
+        return get_serializer(
+            cls, tuple(keys) if keys is not None else None, datetime_format=True
+        ).columns(rows)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+model: compiled model serializers
+A serializer is generated once per model class and field set: one itemgetter
+reads every loaded column from the instance __dict__ in C [no descriptor per
+column], a generated function builds the dict in one expression
+Rows with an expired or deferred column fall back to attrgetter, which loads it
+"""
+
+import threading
+from datetime import datetime
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "DATETIME_FORMAT",
+    "ModelSerializer",
+    "get_serializer",
+]
+
+DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+# (model class, field names, format datetime): serializer
+_serializers: Dict[Tuple[type, Optional[Tuple[str, ...]], bool], "ModelSerializer"] = {}
+_lock = threading.Lock()
+
+
+def format_datetime(value: Any) -> Any:
+    """
+    format a datetime column value like strftime(DATETIME_FORMAT)
+    :param value: datetime or None
+    """
+    if value is None:
+        return None
+    # isoformat is three times faster, it differs for aware datetimes and years before 1000
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(" ", "seconds")
+    return value.strftime(DATETIME_FORMAT)
+
+
+def format_any(value: Any) -> Any:
+    """
+    format a value of unknown type
+    :param value: any value
+    """
+    return format_datetime(value) if isinstance(value, datetime) else value
+
+
+class ModelSerializer:
+    """
+    serializer of one model class and field set
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        formatters: Sequence[Optional[Callable]],
+        from_state: bool = False,
+    ) -> None:
+        """
+        init method
+        :param names: field names, also the attribute names
+        :param formatters: formatter of each field, None keeps the value
+        :param from_state: read loaded values from the instance __dict__ first
+        """
+        self.names: Tuple[str, ...] = tuple(names)
+        self.formatters: Tuple[Optional[Callable], ...] = tuple(formatters)
+        self.from_state = from_state and bool(self.names)
+        self.getter: Callable[[Any], Any] = self._wrap(attrgetter, self.names)
+        self.state_getter: Callable[[Any], Any] = self._wrap(itemgetter, self.names)
+        self.serialize: Callable[[Any], Dict[str, Any]] = self._compile()
+
+    @staticmethod
+    def _wrap(getter_type: Callable, names: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+        """
+        a getter that always returns a tuple
+        :param getter_type: attrgetter or itemgetter
+        :param names: field names
+        """
+        if not names:
+            return lambda _: ()
+        getter: Callable[[Any], Any] = getter_type(*names)
+        # A getter of one name returns the value itself
+        return (lambda _obj: (getter(_obj),)) if len(names) == 1 else getter
+
+    def read(self, obj: Any) -> Tuple[Any, ...]:
+        """
+        values of the fields of a row
+        :param obj: model instance
+        """
+        if self.from_state:
+            try:
+                return self.state_getter(obj.__dict__)  # type: ignore[no-any-return]
+            except KeyError:
+                pass
+        return self.getter(obj)  # type: ignore[no-any-return]
+
+    def _compile(self) -> Callable[[Any], Dict[str, Any]]:
+        """
+        generate the serialize function, the field names are only used as repr constants
+        """
+        namespace: Dict[str, Any] = {"_read": self.read}
+        items: List[str] = []
+        for _i, (_name, _formatter) in enumerate(zip(self.names, self.formatters)):
+            value: str = f"_v[{_i}]"
+            if _formatter is not None:
+                namespace[f"_f{_i}"] = _formatter
+                value = f"_f{_i}({value})"
+            items.append(f"{_name!r}: {value}")
+        source: str = (
+            f"def serialize(obj):\n    _v = _read(obj)\n    return {{{', '.join(items)}}}\n"
+        )
+        exec(compile(source, "<model serializer>", "exec"), namespace)  # pylint: disable=W0122
+        return namespace["serialize"]  # type: ignore[no-any-return]
+
+    def __call__(self, obj: Any) -> Dict[str, Any]:
+        """
+        serialize one row
+        :param obj: model instance
+        """
+        return self.serialize(obj)
+
+    def columns(self, rows: Sequence[Any]) -> Dict[str, List[Any]]:
+        """
+        serialize rows into column arrays
+        :param rows: model instances
+        :return: field name: values of every row
+        """
+        if not rows:
+            return {_name: [] for _name in self.names}
+        read: Callable[[Any], Tuple[Any, ...]] = self.read
+        values: List[Tuple[Any, ...]] = [read(_row) for _row in rows]
+        result: Dict[str, List[Any]] = {}
+        for _name, _formatter, _column in zip(self.names, self.formatters, zip(*values)):
+            result[_name] = (
+                list(_column) if _formatter is None else [_formatter(_v) for _v in _column]
+            )
+        return result
+
+
+def _column_formatter(column: Any) -> Optional[Callable]:
+    """
+    datetime formatter of a column, None for other types
+    :param column: sqlalchemy column
+    """
+    try:
+        python_type: type = column.type.python_type
+    except NotImplementedError:
+        return format_any
+    return format_datetime if issubclass(python_type, datetime) else None
+
+
+def get_serializer(
+    model: type, names: Optional[Tuple[str, ...]] = None, datetime_format: bool = False
+) -> ModelSerializer:
+    """
+    cached serializer of a model class, built on first use
+    :param model: model class
+    :param names: field names, None means every table column
+    :param datetime_format: format datetimes with DATETIME_FORMAT
+    :return: ModelSerializer instance
+    """
+    key: Tuple[type, Optional[Tuple[str, ...]], bool] = (model, names, datetime_format)
+    serializer: Optional[ModelSerializer] = _serializers.get(key)
+    if serializer is not None:
+        return serializer
+    with _lock:
+        serializer = _serializers.get(key)
+        if serializer is None:
+            if names is None:
+                columns: List[Any] = list(getattr(model, "__table__").columns)
+                field_names: List[str] = [_c.name for _c in columns]
+                formatters: List[Optional[Callable]] = [
+                    _column_formatter(_c) if datetime_format else None for _c in columns
+                ]
+            else:
+                # Attributes of any type, checked per value
+                field_names = list(names)
+                formatters = [format_any if datetime_format else None for _ in names]
+            serializer = ModelSerializer(field_names, formatters, from_state=names is None)
+            _serializers[key] = serializer
+    return serializer
@@ -15,13 +15,15 @@ from infra.dependencies import MainRDB
 from infra.models import GoldPrice
 
 logger = logging.getLogger(__name__)
+# Response cache tag of gold price apis
+GOLD_PRICE_CACHE_TAG: str = "gold_price"
 
 
 def get_current_price() -> Optional[Dict[str, Any]]:
     """
     获得当前金价
     """
-    with inject.instance(MainRDB).get_session() as session:
+    with inject.instance(MainRDB).get_read_session() as session:
         gold_info: Optional[GoldPrice] = (
             session.query(GoldPrice).order_by(desc(GoldPrice.time)).first()
         )
@@ -33,7 +35,7 @@ def get_latest_price() -> List[Dict[str, Any]]:
     获得最近一段时间的黄金价格
     """
 
-    with inject.instance(MainRDB).get_session() as session:
+    with inject.instance(MainRDB).get_read_session() as session:
         return [
             _i.model_to_dict()
             for _i in session.query(GoldPrice).order_by(desc(GoldPrice.time)).limit(10)
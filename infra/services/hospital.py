@@ -32,6 +32,7 @@ def get_notify_cache_key(notify_key: str) -> str:
     """
     # 获取配置
     config: Config = inject.instance(Config)
+    # Only read and written on its own, no hash tag, existing counters keep their key
     return f"{config.PROJECT_NAME}-{config.ENV.value}-{notify_key}"
 
 
@@ -44,8 +45,9 @@ def skip_notify(reserve_config: HospitalReserveConfig, notify_key: str) -> Tuple
     redis_client: MainRedis = inject.instance(MainRedis)
     cache_key: str = get_notify_cache_key(notify_key)
     # 获得重复推送次数
-    _cache_bytes: Optional[bytes] = redis_client.get(cache_key)
-    _notify_times: int = int(_cache_bytes.decode()) if _cache_bytes else 0
+    # Read on every tick, written only when a notification is sent
+    _cache_value: Optional[str] = redis_client.cached_get(cache_key)
+    _notify_times: int = int(_cache_value) if _cache_value else 0
     if _notify_times >= reserve_config.RESERVE_DUPLICATE_NOTIFY_TIMES:
         return True, _notify_times
     return False, _notify_times
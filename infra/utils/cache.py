@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+utils: in-process cache utils
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+__all__ = [
+    "LRUCache",
+]
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded, thread safe LRU cache, every entry expires at its own time
+    the least recently used entry is evicted once maxsize is reached
+    """
+
+    def __init__(self, maxsize: int, timer: Callable[[], float] = time.monotonic) -> None:
+        """
+        init method
+        :param maxsize: maximum entry count, 0 disables the cache
+        :param timer: clock used for expiry
+        """
+        self.maxsize = maxsize
+        self.timer = timer
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        get a live entry
+        :param key: cache key
+        :return: None when missing or expired
+        """
+        with self._lock:
+            item: Optional[Tuple[float, V]] = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= self.timer():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: Hashable, value: V, ttl: float) -> None:
+        """
+        add or replace an entry
+        :param key: cache key
+        :param value: cache value
+        :param ttl: time to live [seconds], entries with ttl <= 0 are not stored
+        """
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self.timer() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """
+        remove an entry
+        :param key: cache key
+        :return: the removed value
+        """
+        with self._lock:
+            item: Optional[Tuple[float, V]] = self._data.pop(key, None)
+        return item[1] if item is not None else None
+
+    def pop_matching(self, predicate: Callable[[Hashable, V], bool]) -> int:
+        """
+        remove every entry the predicate matches [O(n), for rare invalidations]
+        :param predicate: called with key and value
+        :return: removed entry count
+        """
+        with self._lock:
+            keys: List[Hashable] = [
+                _key for _key, (_, _value) in self._data.items() if predicate(_key, _value)
+            ]
+            for _key in keys:
+                del self._data[_key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        remove every entry
+        """
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+utils: streaming compression utils
+Supported Content-Encoding: gzip, deflate, zstd [zstandard], br [brotli]
+Other encodings can be added with register_decompressor/register_compressor
+"""
+
+import logging
+import zlib
+from abc import ABCMeta, abstractmethod
+from typing import IO, Any, Callable, Dict, List, Optional, cast
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    # Checked by the registration below, the decompressor is only built when installed
+    zstandard = None  # type: ignore[assignment]
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "DecompressionError",
+    "DecompressedSizeExceeded",
+    "IDecompressor",
+    "register_decompressor",
+    "get_decompressor",
+    "supported_decodings",
+    "ICompressor",
+    "register_compressor",
+    "get_compressor",
+    "compress",
+    "negotiate_encoding",
+    "supported_encodings",
+    "is_compressible_type",
+]
+
+
+class DecompressionError(ValueError):
+    """
+    the body can not be decompressed
+    """
+
+
+class DecompressedSizeExceeded(DecompressionError):
+    """
+    the decompressed body is larger than the limit
+    """
+
+
+class IDecompressor(metaclass=ABCMeta):
+    """
+    Incremental decompressor
+    feed compressed chunks in order, then call flush once
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        init method
+        :param max_size: maximum decompressed size, 0 means unlimited
+        """
+        self.max_size = max_size
+        self.size = 0
+
+    def remaining(self) -> int:
+        """
+        how many bytes can still be produced, -1 means unlimited
+        """
+        return self.max_size - self.size if self.max_size > 0 else -1
+
+    def account(self, data: bytes) -> bytes:
+        """
+        count the produced bytes
+        :param data: decompressed data
+        :return: data
+        :raises DecompressedSizeExceeded: body too large
+        """
+        self.size += len(data)
+        if 0 < self.max_size < self.size:
+            raise DecompressedSizeExceeded(f"decompressed body exceeds {self.max_size} bytes")
+        return data
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """
+        decompress a chunk
+        :param data: compressed chunk
+        :return: decompressed data
+        """
+
+    def flush(self) -> bytes:
+        """
+        return the data still buffered after the last chunk
+        """
+        return b""
+
+
+class ZlibDecompressor(IDecompressor):
+    """
+    zlib based decompressor
+    """
+
+    wbits: int = zlib.MAX_WBITS
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(max_size)
+        self._decompressor = zlib.decompressobj(wbits=self.wbits)
+
+    def decompress(self, data: bytes) -> bytes:
+        remaining: int = self.remaining()
+        try:
+            # Stop one byte past the limit, so a bomb never gets fully inflated
+            chunk: bytes = self._decompressor.decompress(
+                data, remaining + 1 if remaining >= 0 else 0
+            )
+        except zlib.error as exc:
+            raise DecompressionError(str(exc)) from exc
+        return self.account(chunk)
+
+    def flush(self) -> bytes:
+        try:
+            return self.account(self._decompressor.flush())
+        except zlib.error as exc:
+            raise DecompressionError(str(exc)) from exc
+
+
+class GzipDecompressor(ZlibDecompressor):
+    """
+    gzip decompressor
+    """
+
+    wbits = zlib.MAX_WBITS | 16
+
+
+class DeflateDecompressor(ZlibDecompressor):
+    """
+    deflate decompressor [zlib wrapped]
+    """
+
+    wbits = zlib.MAX_WBITS
+
+
+class ZstdDecompressor(IDecompressor):
+    """
+    zstd decompressor
+    """
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(max_size)
+        self._chunks: List[bytes] = []
+        # The stream writer only calls write on its sink
+        self._writer: Any = zstandard.ZstdDecompressor().stream_writer(
+            cast(IO[bytes], self), write_size=65536
+        )
+
+    def write(self, data: bytes) -> int:
+        """
+        output sink of the zstandard stream writer, checks the limit for every block
+        """
+        self._chunks.append(self.account(bytes(data)))
+        return len(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            self._writer.write(data)
+        except zstandard.ZstdError as exc:
+            raise DecompressionError(str(exc)) from exc
+        chunk: bytes = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+class BrotliDecompressor(IDecompressor):
+    """
+    brotli decompressor
+    """
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(max_size)
+        self._decompressor: Any = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        remaining: int = self.remaining()
+        try:
+            if remaining >= 0:
+                chunk: bytes = self._decompressor.process(data, output_buffer_limit=remaining + 1)
+            else:
+                chunk = self._decompressor.process(data)
+        except brotli.error as exc:
+            raise DecompressionError(str(exc)) from exc
+        return self.account(chunk)
+
+
+class ChainDecompressor(IDecompressor):
+    """
+    decode several Content-Encoding in the reverse order they were applied
+    """
+
+    def __init__(self, max_size: int, decompressors: List[IDecompressor]) -> None:
+        super().__init__(max_size)
+        self.decompressors = decompressors
+
+    def decompress(self, data: bytes) -> bytes:
+        for _decompressor in self.decompressors:
+            data = _decompressor.decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data: bytes = b""
+        for _decompressor in self.decompressors:
+            data = _decompressor.decompress(data) + _decompressor.flush()
+        return data
+
+
+_DECOMPRESSORS: Dict[str, Callable[[int], IDecompressor]] = {
+    "gzip": GzipDecompressor,
+    "x-gzip": GzipDecompressor,
+    "deflate": DeflateDecompressor,
+}
+if zstandard is not None:
+    _DECOMPRESSORS["zstd"] = ZstdDecompressor
+if brotli is not None:
+    _DECOMPRESSORS["br"] = BrotliDecompressor
+
+
+def register_decompressor(encoding: str, factory: Callable[[int], IDecompressor]) -> None:
+    """
+    register a decompressor for a Content-Encoding
+    :param encoding: Content-Encoding token
+    :param factory: callable that takes max_size and returns an IDecompressor
+    """
+    _DECOMPRESSORS[encoding.strip().lower()] = factory
+
+
+def supported_decodings() -> List[str]:
+    """
+    registered Content-Encoding tokens
+    """
+    return list(_DECOMPRESSORS)
+
+
+def get_decompressor(content_encoding: str, max_size: int = 0) -> Optional[IDecompressor]:
+    """
+    build the decompressor for a Content-Encoding header value
+    :param content_encoding: header value, e.g. "gzip" or "gzip, br"
+    :param max_size: maximum decompressed size, 0 means unlimited
+    :return: None when the body is not encoded
+    :raises DecompressionError: unsupported encoding
+    """
+    encodings: List[str] = [
+        _e.strip().lower()
+        for _e in content_encoding.split(",")
+        if _e.strip() and _e.strip().lower() != "identity"
+    ]
+    if not encodings:
+        return None
+    decompressors: List[IDecompressor] = []
+    # The last applied encoding is decoded first
+    for _encoding in reversed(encodings):
+        factory: Optional[Callable[[int], IDecompressor]] = _DECOMPRESSORS.get(_encoding)
+        if factory is None:
+            raise DecompressionError(f"unsupported content encoding: {_encoding}")
+        decompressors.append(factory(max_size))
+    if len(decompressors) == 1:
+        return decompressors[0]
+    return ChainDecompressor(max_size, decompressors)
+
+
+class ICompressor(metaclass=ABCMeta):
+    """
+    Incremental compressor
+    every compress call returns data the client can decode right away,
+    finish must be called once at the end
+    """
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """
+        compress a chunk and flush it
+        :param data: raw chunk
+        :return: compressed data
+        """
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """
+        end the stream
+        :return: remaining compressed data
+        """
+
+
+class GzipCompressor(ICompressor):
+    """
+    gzip compressor
+    """
+
+    def __init__(self, level: int = 6) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class ZstdCompressor(ICompressor):
+    """
+    zstd compressor
+    """
+
+    def __init__(self, level: int = 3) -> None:
+        self._compressor: Any = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(
+            self._compressor.compress(data)
+            + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        )
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH))
+
+
+class BrotliCompressor(ICompressor):
+    """
+    brotli compressor
+    """
+
+    def __init__(self, level: int = 4) -> None:
+        self._compressor: Any = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data) + self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+# Registered compressors, in server preference order
+_COMPRESSORS: Dict[str, Callable[..., ICompressor]] = {}
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = ZstdCompressor
+if brotli is not None:
+    _COMPRESSORS["br"] = BrotliCompressor
+_COMPRESSORS["gzip"] = GzipCompressor
+
+
+def register_compressor(encoding: str, factory: Callable[..., ICompressor]) -> None:
+    """
+    register a compressor for a Content-Encoding
+    :param encoding: Content-Encoding token
+    :param factory: callable that takes an optional level and returns an ICompressor
+    """
+    _COMPRESSORS[encoding.strip().lower()] = factory
+
+
+def supported_encodings() -> List[str]:
+    """
+    registered Content-Encoding tokens, in server preference order
+    """
+    return list(_COMPRESSORS)
+
+
+def get_compressor(encoding: str, level: Optional[int] = None) -> ICompressor:
+    """
+    build the compressor for a Content-Encoding token
+    :param encoding: Content-Encoding token
+    :param level: compression level, None means the codec default
+    :raises KeyError: unsupported encoding
+    """
+    factory: Callable[..., ICompressor] = _COMPRESSORS[encoding]
+    return factory() if level is None else factory(level)
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    """
+    compress data in one shot
+    :param encoding: Content-Encoding token
+    :param data: raw data
+    :param level: compression level, None means the codec default
+    """
+    compressor: ICompressor = get_compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def negotiate_encoding(
+    accept_encoding: str, encodings: Optional[List[str]] = None
+) -> Optional[str]:
+    """
+    pick the content encoding from the Accept-Encoding header
+    the highest q value wins, ties are broken by the server preference order
+    :param accept_encoding: Accept-Encoding header value
+    :param encodings: candidate encodings, default is every registered one
+    :return: None when the client does not accept any of them
+    """
+    candidates: List[str] = encodings if encodings is not None else supported_encodings()
+    qualities: Dict[str, float] = {}
+    for _item in accept_encoding.lower().split(","):
+        token, _, params = _item.partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        quality: float = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[token] = quality
+    best: Optional[str] = None
+    best_quality: float = 0.0
+    for _encoding in candidates:
+        quality = qualities.get(_encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = _encoding, quality
+    return best
+
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-javascript",
+    "image/svg+xml",
+)
+
+
+def is_compressible_type(content_type: str) -> bool:
+    """
+    whether the content type is worth compressing
+    :param content_type: Content-Type header value
+    """
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(("+json", "+xml"))
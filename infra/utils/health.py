@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+utils: background dependency health checks
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+__all__ = [
+    "HealthChecker",
+    "ProbeStatus",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeStatus:
+    """
+    latest result of one dependency probe
+    """
+
+    name: str
+    # readiness depends on critical probes only
+    critical: bool = True
+    healthy: bool = False
+    # duration of the last probe [seconds]
+    latency: float = 0.0
+    # epoch time of the last probe
+    checked_at: float = 0.0
+    # epoch time of the last successful probe
+    last_success: float = 0.0
+    last_error: str = ""
+    consecutive_failures: int = 0
+    # values returned by the probe
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class HealthChecker:
+    """
+    Probe dependencies in a daemon thread at a fixed interval
+    Each probe runs in its own thread with a timeout, so a hanging dependency
+    can not delay the others. Endpoints read the precomputed report in O(1)
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 3.0) -> None:
+        """
+        init method
+        :param interval: probe interval [seconds]
+        :param timeout: longest wait for one probe [seconds]
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self._probes: Dict[str, Callable[[], Any]] = {}
+        self._statuses: Dict[str, ProbeStatus] = {}
+        self._running: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._report: Dict[str, Any] = {}
+        self._ready: bool = False
+        # perf_counter when the last round finished
+        self._heartbeat: float = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register_probe(self, name: str, probe: Callable[[], Any], critical: bool = True) -> None:
+        """
+        add a dependency to probe
+        :param name: dependency name
+        :param probe: raises when the dependency is unhealthy, may return a details dict
+        :param critical: whether readiness depends on it
+        """
+        self._probes[name] = probe
+        self._statuses[name] = ProbeStatus(name=name, critical=critical)
+
+    def start(self) -> None:
+        """
+        start the checker thread of this process, call it after fork
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self._probes), 1), thread_name_prefix="health-probe"
+        )
+        self._running = {}
+        self._thread = threading.Thread(
+            target=self._run, name=f"health-checker-{os.getpid()}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        stop the checker thread, running probes are abandoned
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout + 1)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def is_ready(self) -> bool:
+        """
+        every critical dependency passed its last probe, and the probes are not stale
+        """
+        return self._ready and self.is_alive()
+
+    def is_alive(self) -> bool:
+        """
+        the checker thread finished a round recently
+        """
+        if not self._heartbeat:
+            return False
+        return time.perf_counter() - self._heartbeat < 3 * self.interval + self.timeout
+
+    def report(self) -> Dict[str, Any]:
+        """
+        status of every dependency, computed by the checker thread
+        """
+        return self._report
+
+    def check(self) -> Dict[str, Any]:
+        """
+        probe every dependency once and refresh the report
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(len(self._probes), 1), thread_name_prefix="health-probe"
+            )
+        started: Dict[str, float] = {}
+        futures: Dict[str, Future] = {}
+        for _name, _probe in self._probes.items():
+            running: Optional[Future] = self._running.get(_name)
+            if running is not None and not running.done():
+                # Still hanging since an earlier round, do not pile up threads
+                self._record(_name, 0.0, None, "probe timed out in an earlier round")
+                continue
+            started[_name] = time.perf_counter()
+            futures[_name] = self._running[_name] = self._executor.submit(_probe)
+        wait(list(futures.values()), timeout=self.timeout)
+        for _name, _future in futures.items():
+            latency: float = time.perf_counter() - started[_name]
+            try:
+                details: Optional[Dict[str, Any]] = _future.result(timeout=0)
+            except FutureTimeoutError:
+                self._record(_name, latency, None, f"probe timed out after {self.timeout}s")
+            # pylint: disable=W0703
+            except Exception as e:
+                self._record(_name, latency, None, f"{type(e).__name__}: {e}")
+            else:
+                self._record(_name, latency, details if isinstance(details, dict) else {}, "")
+        self._ready = all(_s.healthy for _s in self._statuses.values() if _s.critical)
+        self._report = {
+            "ready": self._ready,
+            "pid": os.getpid(),
+            "interval": self.interval,
+            "dependencies": {_n: asdict(_s) for _n, _s in self._statuses.items()},
+        }
+        self._heartbeat = time.perf_counter()
+        return self._report
+
+    def _record(
+        self, name: str, latency: float, details: Optional[Dict[str, Any]], error: str
+    ) -> None:
+        """
+        store a probe result
+        :param name: dependency name
+        :param latency: probe duration [seconds]
+        :param details: probe result, None when it failed
+        :param error: error message of a failed probe
+        """
+        status: ProbeStatus = self._statuses[name]
+        status.latency = round(latency, 6)
+        status.checked_at = time.time()
+        if details is not None:
+            if not status.healthy:
+                logger.info(f"dependency {name} is healthy")
+            status.healthy = True
+            status.last_success = status.checked_at
+            status.consecutive_failures = 0
+            status.details = details
+            return
+        if status.healthy or not status.consecutive_failures:
+            logger.warning(f"dependency {name} is unhealthy: {error}")
+        status.healthy = False
+        status.last_error = error
+        status.consecutive_failures += 1
+
+    def _run(self) -> None:
+        """
+        checker thread
+        """
+        while not self._stop.is_set():
+            try:
+                self.check()
+            # pylint: disable=W0703
+            except Exception:
+                logger.warning("failed to check dependencies", exc_info=True)
+            self._stop.wait(self.interval)
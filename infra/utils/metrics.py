@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+utils: prometheus metrics utils
+Metrics of several worker processes are aggregated through the shared files
+of PROMETHEUS_MULTIPROC_DIR, the directory must be set before workers start
+"""
+
+import glob
+import logging
+import os
+import tempfile
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+__all__ = [
+    "MULTIPROC_DIR_ENV",
+    "is_multiprocess",
+    "prepare_multiprocess_dir",
+    "mark_process_dead",
+    "render_metrics",
+]
+
+logger = logging.getLogger(__name__)
+# Environment variable read by prometheus_client
+MULTIPROC_DIR_ENV: str = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def is_multiprocess() -> bool:
+    """
+    whether metrics are shared by several processes
+    """
+    return bool(os.getenv(MULTIPROC_DIR_ENV))
+
+
+def prepare_multiprocess_dir(path: str = "") -> str:
+    """
+    create and clean the shared metrics directory, call it in the master process
+    before any worker starts
+    :param path: directory path, a fresh temporary directory when empty
+    :return: directory path
+    """
+    if not path:
+        path = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    os.makedirs(path, exist_ok=True)
+    # Files left by a previous run would be summed into the new one
+    for _file in glob.glob(os.path.join(path, "*.db")):
+        os.remove(_file)
+    os.environ[MULTIPROC_DIR_ENV] = path
+    logger.info(f"prometheus multiprocess dir is {path}")
+    return path
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    drop the live gauges of an exited worker
+    :param pid: worker pid
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)  # type: ignore[no-untyped-call]
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    render the metrics of every process in the text exposition format
+    :return: body and content type
+    """
+    if not is_multiprocess():
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry: CollectorRegistry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return generate_latest(registry), CONTENT_TYPE_LATEST
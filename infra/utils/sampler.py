@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+utils: background system metrics sampler
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import psutil
+
+__all__ = [
+    "Sample",
+    "SystemSampler",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Sample:
+    """
+    one sample of the process and its pools
+    """
+
+    # epoch time
+    time: float
+    # host cpu usage [%]
+    cpu_percent: float
+    # process cpu usage [%, may exceed 100 on several cores]
+    process_cpu_percent: float
+    # resident memory [bytes]
+    rss: int
+    # open file descriptors
+    num_fds: int
+    # event loop lag [seconds]
+    loop_lag: float
+    # pool name: pool status
+    pools: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+class SystemSampler:
+    """
+    Sample cpu, memory, file descriptors, event loop lag and pool usage in a daemon
+    thread at a fixed interval into a ring buffer
+    Readers get a snapshot precomputed by the thread, so reading is O(1)
+    """
+
+    def __init__(
+        self, interval: float = 1.0, size: int = 300, windows: Optional[List[int]] = None
+    ) -> None:
+        """
+        init method
+        :param interval: sample interval [seconds]
+        :param size: ring buffer size
+        :param windows: trend windows [seconds]
+        """
+        self.interval = interval
+        self.windows: List[int] = windows or [60, 300]
+        self.samples: Deque[Sample] = deque(maxlen=size)
+        self._pool_probes: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._process: psutil.Process = psutil.Process()
+        self._snapshot: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lag: float = 0.0
+        # perf_counter of the loop probe still waiting to run
+        self._loop_probe_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register_pool_probe(self, name: str, probe: Callable[[], Dict[str, int]]) -> None:
+        """
+        add a pool to sample
+        :param name: pool name
+        :param probe: returns the pool status, must be cheap and thread safe
+        """
+        self._pool_probes[name] = probe
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        measure the lag of an event loop
+        :param loop: event loop
+        """
+        self._loop = loop
+
+    def start(self) -> None:
+        """
+        start the sampler thread of this process, call it after fork
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        # The first call only sets the baseline of cpu_percent
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        self._thread = threading.Thread(
+            target=self._run, name=f"system-sampler-{os.getpid()}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        stop the sampler thread
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval * 2)
+            self._thread = None
+
+    def latest(self) -> Optional[Sample]:
+        """
+        the latest sample
+        """
+        return self.samples[-1] if self.samples else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        latest sample and trend windows, computed by the sampler thread
+        """
+        return self._snapshot
+
+    def _on_loop_probe(self, probe_at: float) -> None:
+        """
+        runs in the event loop, the delay since scheduling is the lag
+        :param probe_at: perf_counter when the probe was scheduled
+        """
+        self._loop_lag = time.perf_counter() - probe_at
+        self._loop_probe_at = None
+
+    def _probe_loop(self) -> float:
+        """
+        schedule a loop probe and return the current lag
+        """
+        if self._loop is None or self._loop.is_closed():
+            return 0.0
+        now: float = time.perf_counter()
+        if self._loop_probe_at is not None:
+            # The previous probe has not run yet, the loop is still blocked
+            return now - self._loop_probe_at
+        self._loop_probe_at = now
+        try:
+            self._loop.call_soon_threadsafe(self._on_loop_probe, now)
+        except RuntimeError:
+            self._loop_probe_at = None
+        return self._loop_lag
+
+    def sample(self) -> Sample:
+        """
+        take one sample and refresh the snapshot
+        """
+        pools: Dict[str, Dict[str, int]] = {}
+        for _name, _probe in self._pool_probes.items():
+            try:
+                pools[_name] = _probe()
+            # pylint: disable=W0703
+            except Exception:
+                logger.debug(f"failed to probe pool {_name}", exc_info=True)
+        try:
+            num_fds: int = self._process.num_fds()
+        except (AttributeError, psutil.Error):
+            # Not available on windows
+            num_fds = 0
+        sample: Sample = Sample(
+            time=time.time(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            process_cpu_percent=self._process.cpu_percent(interval=None),
+            rss=self._process.memory_info().rss,
+            num_fds=num_fds,
+            loop_lag=self._probe_loop(),
+            pools=pools,
+        )
+        self.samples.append(sample)
+        self._snapshot = self._build_snapshot(sample)
+        return sample
+
+    def _build_snapshot(self, sample: Sample) -> Dict[str, Any]:
+        """
+        summarize the trend windows
+        :param sample: latest sample
+        """
+        trends: Dict[str, Dict[str, float]] = {}
+        samples: List[Sample] = list(self.samples)
+        for _window in self.windows:
+            recent: List[Sample] = [_s for _s in samples if _s.time > sample.time - _window]
+            trends[f"{_window}s"] = {
+                "cpu_percent_avg": sum(_s.cpu_percent for _s in recent) / len(recent),
+                "cpu_percent_max": max(_s.cpu_percent for _s in recent),
+                "process_cpu_percent_avg": sum(_s.process_cpu_percent for _s in recent)
+                / len(recent),
+                "rss_max": max(_s.rss for _s in recent),
+                "num_fds_max": max(_s.num_fds for _s in recent),
+                "loop_lag_max": max(_s.loop_lag for _s in recent),
+            }
+        return {
+            "pid": os.getpid(),
+            "interval": self.interval,
+            "latest": asdict(sample),
+            "trends": trends,
+        }
+
+    def _run(self) -> None:
+        """
+        sampler thread
+        """
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            # pylint: disable=W0703
+            except Exception:
+                logger.warning("failed to sample system metrics", exc_info=True)
+            self._stop.wait(self.interval)
@@ -7,8 +7,11 @@ project entry, support command line
 
 import importlib
 import logging
+import os
 import platform
+import sys
 from types import ModuleType
+from typing import Dict, List
 
 import click
 import inject
@@ -16,6 +19,10 @@ import uvicorn
 from redis_lock import Lock
 
 from infra.dependencies import Celery, Config, MainRDB, MainRedis, Migration
+from infra.dependencies.celery import get_worker_argv, get_worker_pool
+from infra.enums import WorkerPool
+from infra.handlers.http import precompress_directory
+from infra.utils.metrics import prepare_multiprocess_dir
 
 logger = logging.getLogger(__name__)
 config: Config = inject.instance(Config)
@@ -64,10 +71,24 @@ def run_api_server() -> None:
     )
     if platform.system().lower() == "linux":
         uvicorn_config.workers = config.SERVER_WORKER
+        # Workers share metrics through files, set up before they start
+        if config.SERVER_WORKER > 1:
+            prepare_multiprocess_dir(config.METRICS_MULTIPROC_DIR)
     server = uvicorn.Server(uvicorn_config)
     server.run()
 
 
+@cli.command()
+def precompress_static() -> None:
+    """
+    build the .zst/.br/.gz siblings of static files [run at build time]
+    """
+    variants: Dict[str, Dict[str, str]] = precompress_directory(
+        config.STATIC_PATH, config.COMPRESSION_MINIMUM_SIZE
+    )
+    logger.info(f"precompressed {len(variants)} static files in {config.STATIC_PATH}")
+
+
 @cli.command()
 def run_schedule() -> None:
     """
@@ -123,6 +144,25 @@ def run_async_tasks() -> None:
     )
 
 
+@cli.command()
+@click.argument("name")
+def run_queue_tasks(name: str) -> None:
+    """
+    consumer celery tasks of a dedicated queue with its pool type and concurrency
+    NAME: CeleryQueueConfig.NAME, critical, io or cpu by default
+    """
+    argv: List[str] = get_worker_argv(config.PROJECT_NAME, config.CELERY_CONFIG, config.ENV, name)
+    if get_worker_pool(config.CELERY_CONFIG, name) is WorkerPool.GEVENT:
+        # gevent has to patch the standard library before the app is imported,
+        # the celery command does it first thing
+        os.execv(
+            sys.executable,
+            [sys.executable, "-m", "celery", "-A", "celery_tasks.celery_app:celery_app", *argv],
+        )
+    celery_app = inject.instance(Celery)
+    celery_app.start(argv=argv)
+
+
 @cli.command()
 def run_grpc_debug() -> None:
     """
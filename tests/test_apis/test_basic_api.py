@@ -6,16 +6,23 @@ Test the fastapi basic api
 Includes the following apis:
     /
     /health
+    /health/live
+    /health/ready
+    /metrics
+    /diagnostics
 """
 
+import json
 import logging
+import time
 from urllib.parse import urljoin
 
 import inject
 from fastapi.testclient import TestClient
 
 from api_server.fastapi_app import app
-from infra.dependencies import Config
+from benchmarks.bench_import_time import BUDGET_PATH, check_budget, measure
+from infra.dependencies import Config, HealthChecker, SystemSampler
 from infra.enums import StatusCode
 
 client = TestClient(app)
@@ -33,6 +40,10 @@ def test_app_info() -> None:
     assert response.json()["SERVER_WORKER"] == config.SERVER_WORKER
     assert response.json()["SERVER_WORKER_THREAD"] == config.SERVER_WORKER_THREAD
     assert response.json()["API_PREFIX"] == config.API_PREFIX
+    # Null until the background sampler has run, the request never samples
+    assert response.json()["CPU_PERCENT"] is None or isinstance(
+        response.json()["CPU_PERCENT"], float
+    )
 
 
 def test_health_check_endpoint() -> None:
@@ -44,6 +55,19 @@ def test_health_check_endpoint() -> None:
     assert response.text == "OK"
 
 
+def test_readiness_endpoint() -> None:
+    """
+    test api /health/live and /health/ready, no database runs in the test environment
+    """
+    inject.instance(HealthChecker).check()
+    response = client.get(urljoin(f"{config.API_PREFIX}/v1/", "health/live"))
+    assert response.status_code == 200
+    response = client.get(urljoin(f"{config.API_PREFIX}/v1/", "health/ready"))
+    assert response.status_code == 503
+    mysql = response.json()["dependencies"]["mysql"]
+    assert mysql["critical"] and not mysql["healthy"] and mysql["last_error"]
+
+
 def test_for_404() -> None:
     """
     test api 404
@@ -55,3 +79,57 @@ def test_for_404() -> None:
         "data": [],
         "msg": "Not Found",
     }
+
+
+def test_metrics_endpoint() -> None:
+    """
+    test api /metrics
+    """
+    health_path: str = urljoin(f"{config.API_PREFIX}/v1/", "health")
+    client.get(health_path)
+    client.get("/not_found_api")
+    response = client.get(urljoin(f"{config.API_PREFIX}/v1/", "metrics"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        f'http_request_duration_seconds_count{{method="GET",route="{health_path}",status="200"}}'
+        in response.text
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"}'
+        in response.text
+    )
+    assert 'http_requests_in_flight{method="GET"}' in response.text
+    assert "http_response_size_bytes_total" in response.text
+
+
+def test_diagnostics_endpoint() -> None:
+    """
+    test api /diagnostics
+    """
+    # The lifespan starts the background sampler
+    with TestClient(app) as lifespan_client:
+        sampler: SystemSampler = inject.instance(SystemSampler)
+        for _ in range(100):
+            if sampler.latest() is not None:
+                break
+            time.sleep(0.05)
+        response = lifespan_client.get(urljoin(f"{config.API_PREFIX}/v1/", "diagnostics"))
+    assert response.status_code == 200
+    latest = response.json()["latest"]
+    assert latest["rss"] > 0
+    assert latest["loop_lag"] >= 0
+    assert set(latest["pools"]) == {"mysql", "redis"}
+    assert set(response.json()["trends"]) == {"60s", "300s"}
+
+
+def test_import_budget() -> None:
+    """
+    the api server must not import the task modules and their heavy dependencies
+    """
+    with open(BUDGET_PATH, encoding="utf-8") as f:
+        budget = json.load(f)["api_server.fastapi_app"]
+    report = measure("api_server.fastapi_app", run_count=1)
+    # Time depends on the machine, only the module set is checked here
+    budget.pop("max_total_ms")
+    assert check_budget(report, budget) == []
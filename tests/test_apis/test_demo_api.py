@@ -5,16 +5,27 @@ Test the fastapi basic api
 Includes the following apis:
     /v1/hello
     /v2/hello
+    /v1/test/body
+    /v1/test/cached
 """
 
+import gzip
 import logging
+import time
+from typing import Any, Dict
 from urllib.parse import urljoin
 
+import brotli
+import fakeredis
 import inject
+import orjson
+import pytest
+import zstandard
 from fastapi.testclient import TestClient
 
 from api_server.fastapi_app import app
-from infra.dependencies import Config
+from api_server.resources import APIV1Router, cache_response, rate_limit
+from infra.dependencies import Config, ResponseCache
 
 client = TestClient(app)
 config: Config = inject.instance(Config)
@@ -46,3 +57,140 @@ def test_pydantic_test() -> None:
     response = client.get(urljoin(f"{config.API_PREFIX}/", "v1/demo/test/pydantic/123"))
     assert response.status_code == 200
     assert response.json() == {"code": 0, "data": {"item_id": 123}, "msg": "success"}
+
+
+def test_enveloped_test() -> None:
+    """
+    test api /v1/test/enveloped/{item_id}
+    """
+    response = client.get(urljoin(f"{config.API_PREFIX}/", "v1/demo/test/enveloped/123"))
+    assert response.status_code == 200
+    assert response.json() == {"code": 0, "data": {"item_id": 123}, "msg": "success"}
+
+
+def test_compressed_body() -> None:
+    """
+    test api /v1/test/body with compressed body
+    """
+    item: Dict[str, Any] = {"item_id": 123, "name": "test" * 100}
+    raw: bytes = orjson.dumps(item)
+    url: str = urljoin(f"{config.API_PREFIX}/", "v1/demo/test/body")
+    for encoding, body in (
+        ("gzip", gzip.compress(raw)),
+        ("br", brotli.compress(raw)),
+        ("zstd", zstandard.ZstdCompressor().compress(raw)),
+        ("gzip, br", brotli.compress(gzip.compress(raw))),
+    ):
+        response = client.post(
+            url,
+            content=body,
+            headers={"Content-Encoding": encoding, "Content-Type": "application/json"},
+        )
+        assert response.status_code == 200, encoding
+        assert response.json()["data"] == item
+
+
+def test_compressed_body_limit() -> None:
+    """
+    test api /v1/test/body with a decompression bomb and an unknown encoding
+    """
+    url: str = urljoin(f"{config.API_PREFIX}/", "v1/demo/test/body")
+    bomb: bytes = gzip.compress(b" " * (config.MAX_REQUEST_BODY_SIZE + 1))
+    response = client.post(url, content=bomb, headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 413
+    response = client.post(url, content=b"{}", headers={"Content-Encoding": "unknown"})
+    assert response.status_code == 415
+    response = client.post(url, content=b"invalid", headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+
+def test_request_log(caplog: pytest.LogCaptureFixture) -> None:
+    """
+    test the per-request log is a lazy debug record without the body
+    """
+    url: str = urljoin(f"{config.API_PREFIX}/", "v1/demo/test/body")
+    with caplog.at_level(logging.DEBUG, logger="api_server.resources"):
+        response = client.post(url, json={"item_id": 1, "name": "secret-body"})
+    assert response.status_code == 200
+    records = [_r for _r in caplog.records if _r.name == "api_server.resources"]
+    assert [(_r.levelno, _r.getMessage()) for _r in records] == [
+        (logging.DEBUG, "get request POST /api/v1/demo/test/body")
+    ]
+    assert all("secret-body" not in _r.getMessage() for _r in caplog.records)
+
+
+def test_cached_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    test api /v1/test/cached
+    """
+    response_cache: ResponseCache = inject.instance(ResponseCache)
+    monkeypatch.setattr(response_cache, "redis_client", fakeredis.FakeRedis())
+    url: str = urljoin(f"{config.API_PREFIX}/", "v1/demo/test/cached/1")
+    first = client.get(url, params={"a": 1, "b": 2})
+    assert first.status_code == 200
+    assert first.headers["x-cache"] == "MISS"
+    assert first.json()["data"]["item_id"] == 1
+    # The query order does not matter
+    second = client.get(f"{url}?b=2&a=1")
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["content-type"] == "application/json"
+    assert second.json() == first.json()
+    # The vary header is part of the key
+    assert client.get(url, headers={"X-Tenant": "other"}).headers["x-cache"] == "MISS"
+    # The redis tier serves other processes
+    response_cache.invalidate_tags("demo")
+    assert client.get(url).headers["x-cache"] == "MISS"
+    response_cache._local.clear()  # pylint: disable=W0212
+    assert client.get(url).headers["x-cache"] == "HIT"
+    # Responses to identified callers are not shared
+    private = client.get(url, headers={"Authorization": "Bearer token"})
+    assert private.headers["x-cache"] == "BYPASS"
+
+
+def test_cached_response_with_dependencies() -> None:
+    """
+    test cache_response is refused on a route with dependencies
+    """
+
+    @cache_response(ttl=60)
+    def limited() -> Dict[str, Any]:
+        return {}
+
+    router: APIV1Router = APIV1Router(name="cached")
+    with pytest.raises(ValueError):
+        router.get("/limited/", dependencies=[rate_limit(rate=1, burst=1)])(limited)
+
+
+def test_stale_cached_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    test stale responses are served while they are refreshed
+    """
+    response_cache: ResponseCache = inject.instance(ResponseCache)
+    monkeypatch.setattr(response_cache, "redis_client", fakeredis.FakeRedis())
+    url: str = urljoin(f"{config.API_PREFIX}/", "v1/demo/test/cached/2")
+    first = client.get(url)
+    key: str = response_cache.make_key(
+        "GET",
+        f"{config.API_PREFIX}/v1/demo/test/cached/2",
+        "",
+        {},
+        vary_headers=("x-tenant",),
+    )
+    entry = response_cache.get(key)
+    assert entry is not None
+    # Make the entry stale but still servable
+    entry.fresh_until = 0
+    entry.stale_until = time.time() + 60
+    response_cache.set(key, entry)
+    # Keep one event loop, so the background refresh can finish
+    with TestClient(app) as loop_client:
+        stale = loop_client.get(url)
+        assert stale.headers["x-cache"] == "STALE"
+        assert stale.json() == first.json()
+        for _ in range(50):
+            fresh = loop_client.get(url)
+            if fresh.headers["x-cache"] == "HIT":
+                break
+            time.sleep(0.01)
+    assert fresh.headers["x-cache"] == "HIT"
+    assert fresh.json()["data"]["time"] > first.json()["data"]["time"]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the asyncio redis client and lock
+"""
+
+import asyncio
+import time
+
+import fakeredis
+from redis.asyncio import BlockingConnectionPool
+from redis_lock import Lock
+
+from infra.dependencies.async_redis_client import AsyncLock, AsyncMainRedis
+
+
+def test_async_lock() -> None:
+    """
+    test the async lock excludes and wakes up sync redis_lock holders and the reverse
+    """
+    server: fakeredis.FakeServer = fakeredis.FakeServer()
+    sync_client: fakeredis.FakeRedis = fakeredis.FakeRedis(server=server)
+
+    async def scenario() -> None:
+        client: AsyncMainRedis = AsyncMainRedis(
+            connection_pool=BlockingConnectionPool(
+                max_connections=4,
+                timeout=1,
+                connection_class=fakeredis.FakeAsyncRedisConnection,
+                server=server,
+            )
+        )
+        sync_lock: Lock = Lock(sync_client, "{test}", expire=10)
+        assert sync_lock.acquire(blocking=False)
+        lock: AsyncLock = AsyncLock(client, "{test}", expire=10)
+        assert not await lock.acquire(timeout=0.2)
+        assert await lock.get_owner_id() == sync_lock.id
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        loop.call_later(0.1, sync_lock.release)
+        start: float = time.monotonic()
+        # Woken by the release signal
+        assert await lock.acquire(timeout=5)
+        assert time.monotonic() - start < 1
+        assert not Lock(sync_client, "{test}").acquire(blocking=False)
+        await lock.release()
+        assert not await lock.locked()
+        async with AsyncLock(client, "{renewed}", expire=1, auto_renewal=True) as renewed:
+            await asyncio.sleep(1.3)
+            assert await renewed.get_owner_id() == renewed.id
+        assert client.pool_status()["in_use"] == 0
+        await client.aclose(close_connection_pool=True)
+
+    asyncio.run(scenario())
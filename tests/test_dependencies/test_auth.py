@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the auth dependency
+Includes the following:
+    verified token cache
+    invalidation
+    request store
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+import inject
+import jwt
+import pytest
+
+from infra.dependencies.auth import Auth, AuthConfig, RequestStore
+from infra.exceptions import InvalidToken, InvalidTypeException
+from infra.handlers.http.error import record_request_log
+
+logger = logging.getLogger(__name__)
+SECRET: str = "test_secret"
+
+
+def make_auth(calls: Dict[str, int]) -> Auth:
+    """
+    build an Auth counting the handler calls
+    :param calls: call counter
+    """
+    auth: Auth = Auth(AuthConfig(JWT_SECRET_KEY=SECRET), auth_role=True)
+
+    def get_user_info(jwt_obj: Dict[str, Any]) -> Dict[str, Any]:
+        calls["user_info"] += 1
+        return {"id": jwt_obj["user_id"]}
+
+    def get_user_roles(user_info: Dict[str, Any]) -> List[str]:
+        calls["roles"] += 1
+        return ["admin"]
+
+    auth.set_get_user_info_handler(get_user_info)
+    auth.set_get_user_roles_handler(get_user_roles)
+    auth.set_user_define_validator_handler(lambda user_info, jwt_obj: None)
+    return auth
+
+
+def make_token(user_id: int, exp: float) -> str:
+    """
+    sign a token
+    :param user_id: user id claim
+    :param exp: expire timestamp
+    """
+    return jwt.encode({"user_id": user_id, "exp": int(exp)}, SECRET, algorithm="HS256")
+
+
+def test_verified_token_cache() -> None:
+    """
+    test the handlers run once per token
+    """
+    calls: Dict[str, int] = {"user_info": 0, "roles": 0}
+    auth: Auth = make_auth(calls)
+    view = auth.auth(require_roles=["admin"])(lambda: "OK")
+    auth.set_token(make_token(1, time.time() + 3600))
+    for _ in range(3):
+        assert view() == "OK"
+        assert auth.get_auth_store().user_info == {"id": 1}
+        auth.clear()
+        auth.set_token(make_token(1, time.time() + 3600))
+    assert calls == {"user_info": 1, "roles": 1}
+
+    # A bad signature is never served from the cache
+    auth.set_token(make_token(1, time.time() + 3600) + "x")
+    with pytest.raises(InvalidToken):
+        auth.raise_for_valid_token()
+
+
+def test_token_cache_invalidation() -> None:
+    """
+    test logout and user invalidation
+    """
+    calls: Dict[str, int] = {"user_info": 0, "roles": 0}
+    auth: Auth = make_auth(calls)
+    token: str = make_token(1, time.time() + 3600)
+    auth.set_token(token)
+    auth.raise_for_valid_token()
+    auth.invalidate_token(token)
+    auth.raise_for_valid_token()
+    assert calls["user_info"] == 2
+    auth.invalidate_user(1)
+    auth.raise_for_valid_token()
+    assert calls["user_info"] == 3
+    auth.invalidate_user(2)
+    auth.raise_for_valid_token()
+    assert calls["user_info"] == 3
+
+
+def test_request_store(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    test the RequestStore defaults and the fallback of the error log outside a request
+    """
+    request_store: RequestStore = RequestStore(method="GET")
+    assert (request_store.method, request_store.path_params, request_store.query_params) == (
+        "GET",
+        {},
+        {},
+    )
+    # Every store has its own dicts
+    request_store.query_params["a"] = "1"
+    assert not RequestStore().query_params
+    with pytest.raises(InvalidTypeException):
+        Auth(AuthConfig(JWT_SECRET_KEY=SECRET)).set_request({})  # type: ignore[arg-type]
+    # No request in the context, the handler logs an empty RequestStore
+    monkeypatch.setattr(inject.instance(Auth), "get_request", lambda: None)
+    asyncio.run(record_request_log(None))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the single flight celery task base class and the dedicated queues
+"""
+
+import threading
+from typing import Any, List
+
+import fakeredis
+import pytest
+from celery import Celery
+
+from infra.dependencies.celery import (
+    CeleryConfig,
+    CeleryQueueConfig,
+    SingleFlightTask,
+    get_celery_by_config,
+    get_single_flight_skips,
+    get_worker_argv,
+    get_worker_pool,
+)
+from infra.dependencies.redis_client import MainRedis
+from infra.enums import RuntimeEnv, WorkerPool
+
+
+def test_single_flight_task() -> None:
+    """
+    test overlapping runs are skipped and counted, coalesced runs are queued once
+    """
+    redis_client: MainRedis = MainRedis(
+        connection_pool=fakeredis.FakeRedis(decode_responses=True).connection_pool
+    )
+
+    class FakeRedisTask(SingleFlightTask):  # type: ignore[misc]
+        """
+        single flight task on fakeredis
+        """
+
+        lease_time = 0.3
+
+        def redis_client(self) -> MainRedis:
+            return redis_client
+
+    celery_app: Celery = Celery("test")
+    celery_app.conf.single_flight_prefix = "test-single-flight"
+    started: threading.Event = threading.Event()
+    finish: threading.Event = threading.Event()
+    queued: List[Any] = []
+
+    @celery_app.task(base=FakeRedisTask, single_flight_coalesce=True)
+    def slow_task(value: int) -> int:
+        started.set()
+        finish.wait(5)
+        return value
+
+    slow_task.apply_async = lambda args, kwargs: queued.append(args)
+    results: List[Any] = []
+    runner: threading.Thread = threading.Thread(target=lambda: results.append(slow_task(1)))
+    runner.start()
+    assert started.wait(5)
+    # Outlives lease_time, the heartbeat keeps the lease
+    finish.wait(0.5)
+    assert slow_task(2) is None
+    assert slow_task(3) is None
+    finish.set()
+    runner.join(5)
+    assert results == [1]
+    assert get_single_flight_skips(celery_app, redis_client) == {slow_task.name: 2}
+    # The skipped runs are merged into one
+    assert queued == [(1,)]
+    assert slow_task(4) == 4
+    assert queued == [(1,)]
+
+
+def test_dedicated_queues() -> None:
+    """
+    test tasks are routed to the queue of their workload class and its worker arguments
+    """
+    config: CeleryConfig = CeleryConfig(CELERY_BROKER="memory://", CELERY_BACKEND="cache+memory://")
+    config.QUEUES.append(CeleryQueueConfig(NAME="shadow", TASKS=["*.music_task.*"]))
+    config.QUEUES.append(CeleryQueueConfig(NAME="green", POOL="GEVENT"))
+    celery_app: Celery = get_celery_by_config("test", config, RuntimeEnv.DEVELOPMENT)
+    schedule: Any = celery_app.conf.beat_schedule
+    root: str = "celery_tasks.schedule_tasks"
+    assert schedule[f"{root}.gold_task.sync_gold_price"]["options"] == {
+        "queue": "test-DEVELOPMENT-critical-queue"
+    }
+    assert schedule[f"{root}.refresh_clash_task.sync_clash_config"]["options"] == {
+        "queue": "test-DEVELOPMENT-io-queue"
+    }
+    # The first matching queue wins
+    assert schedule[f"{root}.music_task.sync_play_list"]["options"] == {
+        "queue": "test-DEVELOPMENT-cpu-queue"
+    }
+    route: Any = celery_app.amqp.router.route({}, f"{root}.music_task.sync_play_list")
+    assert route["queue"].name == "test-DEVELOPMENT-cpu-queue"
+    route = celery_app.amqp.router.route({}, "celery_tasks.other")
+    assert route["queue"].name == "test-DEVELOPMENT-queue"
+    assert get_worker_argv("test", config, RuntimeEnv.DEVELOPMENT, "io") == [
+        "worker",
+        "-l",
+        "INFO",
+        "-n",
+        "test-DEVELOPMENT-io@%h",
+        "-P",
+        "threads",
+        "-c",
+        "8",
+        "-Q",
+        "test-DEVELOPMENT-io-queue",
+        "--prefetch-multiplier",
+        "1",
+    ]
+    assert get_worker_argv("test", config, RuntimeEnv.DEVELOPMENT, "cpu")[-2:] == [
+        "--max-tasks-per-child",
+        "20",
+    ]
+    assert get_worker_pool(config, "io") is WorkerPool.THREADS
+    assert get_worker_pool(config, "green") is WorkerPool.GEVENT
+    with pytest.raises(ValueError):
+        get_worker_argv("test", config, RuntimeEnv.DEVELOPMENT, "missing")
+    with pytest.raises(ValueError):
+        get_worker_pool(config, "missing")
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the redis client side cache
+"""
+
+import logging
+import time
+from typing import Any, List
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ResponseError
+
+from infra.dependencies.client_cache import ClientSideCache
+
+
+class FakeTrackingConnection(fakeredis.FakeRedisConnection):
+    """
+    fake connection that accepts CLIENT TRACKING, fakeredis does not implement it
+    """
+
+    redirects: List[Any] = []
+
+    def send_command(self, *args: Any, **kwargs: Any) -> None:
+        if args[:2] == ("CLIENT", "TRACKING"):
+            self.redirects.append(args[-1])
+            self._tracking_reply = True
+            return
+        super().send_command(*args, **kwargs)
+
+    def read_response(self, *args: Any, **kwargs: Any) -> Any:
+        if getattr(self, "_tracking_reply", False):
+            self._tracking_reply = False
+            return "OK"
+        return super().read_response(*args, **kwargs)
+
+
+class RejectingConnection(fakeredis.FakeRedisConnection):
+    """
+    fake connection of a server without CLIENT ID
+    """
+
+    def send_command(self, *args: Any, **kwargs: Any) -> None:
+        if args[:2] == ("CLIENT", "ID"):
+            raise ResponseError("unknown command 'client id'")
+        super().send_command(*args, **kwargs)
+
+
+class DownConnection(fakeredis.FakeRedisConnection):
+    """
+    fake connection of an unreachable server
+    """
+
+    attempts: int = 0
+
+    def connect(self) -> None:
+        DownConnection.attempts += 1
+        raise RedisConnectionError("connection refused")
+
+
+@pytest.fixture(name="cache_log")
+def fixture_cache_log(
+    caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> pytest.LogCaptureFixture:
+    """
+    warnings of the client side cache, the infra logger does not propagate to caplog
+    """
+    monkeypatch.setattr(logging.getLogger("infra"), "propagate", True)
+    return caplog
+
+
+def wait_for(condition: Any) -> None:
+    """
+    :param condition: polled until it returns True, 5 seconds at most
+    """
+    deadline: float = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_client_side_cache() -> None:
+    """
+    test hits, invalidation, eviction and the fallback while the listener is not subscribed
+    """
+    server: fakeredis.FakeServer = fakeredis.FakeServer()
+    client: fakeredis.FakeRedis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    cache: ClientSideCache = ClientSideCache(
+        FakeTrackingConnection,
+        {"server": server, "decode_responses": True},
+        client.get,
+        max_size=2,
+    )
+    client.set("a", "1")
+    # Served by the fallback until the listener is subscribed
+    assert cache.get("a") == "1"
+    wait_for(lambda: cache.stats()["tracking"])
+    assert cache.stats()["tracking"]
+    assert cache.get("a") == "1"
+    # Tracking is redirected to the listener connection
+    assert FakeTrackingConnection.redirects[-1] == cache._listener_id
+    client.set("a", "2")
+    assert cache.get("a") == "1"
+    assert cache.stats()["hits"] == 1
+    cache._invalidate(["a"])
+    assert cache.get("a") == "2"
+    assert cache.stats()["invalidations"] == 1
+    for _key in ("b", "c"):
+        cache.get(_key)
+    assert cache.stats()["size"] == 2
+    cache._invalidate(None)
+    assert cache.stats()["size"] == 0
+    cache.close()
+    assert not cache.stats()["tracking"]
+
+
+def test_tracking_rejected(cache_log: pytest.LogCaptureFixture) -> None:
+    """
+    test a server that rejects tracking disables the cache with one warning
+    """
+    server: fakeredis.FakeServer = fakeredis.FakeServer()
+    client: fakeredis.FakeRedis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    client.set("a", "1")
+    for _connection_class in (fakeredis.FakeRedisConnection, RejectingConnection):
+        cache_log.clear()
+        cache: ClientSideCache = ClientSideCache(
+            _connection_class, {"server": server, "decode_responses": True}, client.get
+        )
+        assert cache.get("a") == "1"
+        wait_for(lambda: cache._tracking or cache._disabled)
+        for _ in range(3):
+            assert cache.get("a") == "1"
+        # fakeredis has CLIENT ID but rejects CLIENT TRACKING on the data connection
+        assert cache._disabled and not cache.stats()["tracking"]
+        assert cache._thread is not None
+        cache._thread.join(2)
+        assert not cache._thread.is_alive()
+        assert len(cache_log.records) == 1
+        assert "client side cache is disabled" in cache_log.records[0].getMessage()
+
+
+def test_connection_backoff(cache_log: pytest.LogCaptureFixture) -> None:
+    """
+    test a failed data connection is not retried on every miss
+    """
+    server: fakeredis.FakeServer = fakeredis.FakeServer()
+    client: fakeredis.FakeRedis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    client.set("a", "1")
+    cache: ClientSideCache = ClientSideCache(
+        DownConnection, {"server": server, "decode_responses": True}, client.get
+    )
+    # A subscribed listener, only the data connection is down
+    cache._tracking = True
+    for _ in range(5):
+        assert cache.get("a") == "1"
+    assert DownConnection.attempts == 1
+    assert len(cache_log.records) == 1 and "Traceback" in cache_log.text
+    cache._retry_at = 0.0
+    assert cache.get("a") == "1"
+    assert DownConnection.attempts == 2
+    # Logged once per outage, the delay doubles
+    assert len(cache_log.records) == 1
+    assert cache._retry_at - time.monotonic() > 1
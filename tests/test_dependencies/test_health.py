@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the background dependency health checks
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from infra.utils.health import HealthChecker
+
+
+def test_health_checker() -> None:
+    """
+    test probe results, timeouts and readiness of critical probes only
+    """
+    release: threading.Event = threading.Event()
+
+    def failing() -> None:
+        raise ConnectionError("refused")
+
+    def hanging() -> Dict[str, Any]:
+        release.wait(5)
+        return {}
+
+    checker: HealthChecker = HealthChecker(interval=60, timeout=0.2)
+    checker.register_probe("ok", lambda: {"version": 1})
+    checker.register_probe("failing", failing, critical=False)
+    checker.register_probe("hanging", hanging, critical=False)
+    assert not checker.is_alive()
+    start: float = time.perf_counter()
+    report: Dict[str, Any] = checker.check()
+    assert time.perf_counter() - start < 1
+    assert report["ready"] and checker.is_ready() and checker.is_alive()
+    dependencies: Dict[str, Any] = report["dependencies"]
+    assert dependencies["ok"]["healthy"] and dependencies["ok"]["details"] == {"version": 1}
+    assert dependencies["failing"]["last_error"] == "ConnectionError: refused"
+    assert "timed out" in dependencies["hanging"]["last_error"]
+    # The hanging probe is not started again while it still runs
+    dependencies = checker.check()["dependencies"]
+    assert dependencies["hanging"]["consecutive_failures"] == 2
+    assert dependencies["failing"]["consecutive_failures"] == 2
+    release.set()
+    checker.register_probe("critical", failing)
+    assert not checker.check()["ready"] and not checker.is_ready()
+    checker.stop()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the rate limit dependency
+Includes the following:
+    RateLimiter
+    429 response
+"""
+
+import logging
+import time
+
+import fakeredis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from infra.dependencies import RateLimiter
+from infra.exceptions import TooManyRequests
+from infra.handlers.http import bind_app_exception_handler
+
+logger = logging.getLogger(__name__)
+
+
+def test_token_bucket() -> None:
+    """
+    test the bucket admits burst requests then rejects
+    """
+    limiter: RateLimiter = RateLimiter(fakeredis.FakeRedis(), local_share=0)
+    for _ in range(3):
+        assert limiter.acquire("key", rate=1, burst=3) == (True, 0.0)
+    allowed, retry_after = limiter.acquire("key", rate=1, burst=3)
+    assert not allowed
+    assert 0 < retry_after <= 1
+    # Buckets are independent
+    assert limiter.acquire("other", rate=1, burst=3)[0]
+
+
+def test_local_budget() -> None:
+    """
+    test requests are admitted locally and settled with the next redis call
+    """
+    redis_client = fakeredis.FakeRedis()
+    limiter: RateLimiter = RateLimiter(redis_client, local_share=0.5, local_ttl=60)
+    assert limiter.acquire("key", rate=0.001, burst=10)[0]
+    # 9 tokens left, half of them can be spent without redis
+    assert [limiter.try_acquire_local("key") for _ in range(5)] == [True] * 4 + [False]
+    assert limiter.acquire("key", rate=0.001, burst=10)[0]
+    assert float(redis_client.hget("rate-limit:key", "tokens")) < 5
+
+
+def test_local_budget_settled_after_expiry() -> None:
+    """
+    test tokens spent locally are settled after the budget expires or is evicted
+    """
+    redis_client = fakeredis.FakeRedis()
+    limiter: RateLimiter = RateLimiter(redis_client, local_share=0.5, local_ttl=0.05, local_size=1)
+    assert limiter.acquire("key", rate=0.001, burst=10)[0]
+    assert all(limiter.try_acquire_local("key") for _ in range(4))
+    time.sleep(0.1)
+    # Expired, redis decides and receives the 4 tokens spent meanwhile
+    assert not limiter.try_acquire_local("key")
+    assert limiter.acquire("key", rate=0.001, burst=10)[0]
+    assert float(redis_client.hget("rate-limit:key", "tokens")) < 4.1
+    assert limiter.try_acquire_local("key")
+    # The budget of key is evicted by the one of other, its spent token is settled
+    assert limiter.acquire("other", rate=0.001, burst=10)[0]
+    assert float(redis_client.hget("rate-limit:key", "tokens")) < 3.1
+
+
+def test_too_many_requests_response() -> None:
+    """
+    test TooManyRequests returns 429 with Retry-After
+    """
+    app = FastAPI()
+    bind_app_exception_handler(app)
+
+    @app.get("/limited")
+    def limited() -> None:
+        raise TooManyRequests(retry_after=1.2)
+
+    response = TestClient(app).get("/limited")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
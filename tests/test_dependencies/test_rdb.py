@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the relational database component
+Includes the following:
+    instrumented connection pool
+    read replica routing
+    statement instrumentation
+    bulk upsert
+"""
+
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from infra.dependencies.rdb import (
+    DB_POOL_CHECKOUT_TIMEOUTS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_IN_USE,
+    IDB,
+    BulkUpsertResult,
+    InstrumentedQueuePool,
+    Replica,
+    fingerprint,
+    instrument_pool,
+    instrument_statements,
+    read_your_writes_scope,
+    redact,
+    statement_scope,
+    statement_stats,
+)
+from infra.models import GoldPrice
+from infra.models.base import Base
+
+
+class StubReplica(Replica):
+    """
+    replica with a preset lag
+    """
+
+    lag_value: float = 0.0
+
+    def measure_lag(self) -> float:
+        return self.lag_value
+
+
+def test_pool_telemetry() -> None:
+    """
+    test in-use gauge, checkout waits and timeouts, and the pool rebuilt in a forked child
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine: Engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'pool.db')}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+            pool_logging_name="test",
+        )
+        instrument_pool(engine, "test")
+        waits: float = DB_POOL_CHECKOUT_WAIT.labels("test")._sum.get()
+        connection = engine.connect()
+        assert DB_POOL_IN_USE.labels("test")._value.get() == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        assert DB_POOL_CHECKOUT_TIMEOUTS.labels("test")._value.get() == 1
+        assert DB_POOL_CHECKOUT_WAIT.labels("test")._sum.get() - waits >= 0.05
+        pid: int = os.fork()
+        if pid == 0:
+            # The child gets an empty pool and does not count the connection of the parent
+            code: int = int(
+                engine.pool.checkedout() != 0 or DB_POOL_IN_USE.labels("test")._value.get() != 0
+            )
+            os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        connection.close()
+        assert DB_POOL_IN_USE.labels("test")._value.get() == 0
+        engine.dispose()
+
+
+def test_read_routing() -> None:
+    """
+    test weighted round-robin, lag fallback and read-your-writes
+    """
+    primary: Engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=primary, tables=[GoldPrice.__table__])
+    replicas: List[StubReplica] = [
+        StubReplica("a", create_engine("sqlite://"), weight=2),
+        StubReplica("b", create_engine("sqlite://"), weight=1),
+    ]
+    rdb: IDB = IDB(primary, replicas=list(replicas), max_lag=1, check_interval=3600)
+
+    def routed(count: int) -> Dict[str, int]:
+        engines: Dict[Engine, str] = {_r.engine: _r.name for _r in replicas}
+        engines[primary] = "primary"
+        return Counter(engines[rdb.get_read_session().get_bind()] for _ in range(count))
+
+    assert IDB(primary).get_read_session().get_bind() is primary
+    rdb.refresh_replicas()
+    assert routed(30) == {"a": 20, "b": 10}
+    replicas[0].lag_value = 2
+    rdb.refresh_replicas()
+    assert routed(3) == {"b": 3}
+    assert rdb.replica_status()["a"] == {"healthy": False, "lag": 2, "last_error": ""}
+    replicas[1].lag_value = 2
+    rdb.refresh_replicas()
+    assert routed(3) == {"primary": 3}
+    replicas[0].lag_value = replicas[1].lag_value = 0
+    rdb.refresh_replicas()
+    with read_your_writes_scope():
+        assert "primary" not in routed(3)
+        with rdb.get_session() as session:
+            session.add(GoldPrice(id=1, price=1, time=1, create_time=datetime(2024, 1, 1)))
+            session.commit()
+        # Reads of the request that wrote see the write
+        assert routed(3) == {"primary": 3}
+        assert rdb.get_read_session(read_your_writes=False).get_bind() is not primary
+    # Other requests keep reading from the replicas
+    with read_your_writes_scope():
+        assert "primary" not in routed(3)
+
+
+def test_replica_status_unknown() -> None:
+    """
+    test a replica whose status statements both fail is not routable
+    """
+    # sqlite rejects SHOW REPLICA STATUS and SHOW SLAVE STATUS
+    replica: Replica = Replica("c", create_engine("sqlite://"))
+    replica.refresh(max_lag=1)
+    assert replica.healthy is False
+    assert replica.lag is None
+    assert replica.last_error.startswith("OperationalError")
+
+
+def test_statement_instrumentation() -> None:
+    """
+    test fingerprints, per scope counts, N+1 flags and redacted slow statements
+    """
+    assert fingerprint("SELECT * FROM t WHERE id IN (%(p_1)s, %(p_2)s) AND name = 'a''b'") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    )
+    assert redact({"name": "secret", "id": 1}) == {"name": "str", "id": "int"}
+    engine: Engine = create_engine("sqlite://")
+    instrument_statements(engine, "test", slow_time=0, n_plus_one_threshold=3)
+    messages: List[str] = []
+    handler: logging.Handler = logging.Handler()
+    handler.emit = lambda _record: messages.append(_record.getMessage())  # type: ignore
+    rdb_logger: logging.Logger = logging.getLogger("infra.dependencies.rdb")
+    rdb_logger.addHandler(handler)
+    try:
+        with statement_scope("GET /test") as scope, engine.connect() as connection:
+            for _i in range(4):
+                connection.execute(text("SELECT :value"), {"value": f"secret-{_i}"})
+    finally:
+        rdb_logger.removeHandler(handler)
+    assert scope.count == 4 and scope.fingerprints == {"SELECT ?": 4}
+    assert sum("N+1 statement in GET /test, repeated 3 times" in _m for _m in messages) == 1
+    assert sum("slow statement" in _m for _m in messages) == 4
+    assert not any("secret" in _m for _m in messages)
+    assert any(_s["statement"] == "SELECT ?" and _s["count"] >= 4 for _s in statement_stats())
+
+
+def test_bulk_upsert() -> None:
+    """
+    test chunked inserts of dicts and tuples, and updates of the listed columns only
+    """
+    engine: Engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[GoldPrice.__table__])
+    rdb: IDB = IDB(engine)
+    result: BulkUpsertResult = rdb.bulk_upsert(
+        GoldPrice, ({"id": _i, "price": _i, "time": _i} for _i in range(25)), chunk_size=10
+    )
+    assert (result.rows, result.chunks) == (25, 3) and result.rows_per_second > 0
+    rdb.bulk_upsert(
+        GoldPrice,
+        [(1, 100.0, 100, "sku"), (30, 30.0, 30, "sku")],
+        update_columns=["price"],
+        columns=["id", "price", "time", "product_sku"],
+    )
+    with rdb.get_session() as session:
+        assert session.query(GoldPrice).count() == 26
+        updated: GoldPrice = session.get(GoldPrice, 1)
+        assert (updated.price, updated.time, updated.product_sku) == (100.0, 1, "")
+        assert session.get(GoldPrice, 30).product_sku == "sku"
+    assert rdb.bulk_upsert(GoldPrice, []).rows == 0
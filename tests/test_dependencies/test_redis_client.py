@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the instrumented redis connection pool
+"""
+
+import os
+from typing import Any, List, Tuple
+
+import fakeredis
+import pytest
+from redis.crc import key_slot
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from infra.dependencies.redis_client import (
+    REDIS_POOL_CONNECTIONS,
+    REDIS_POOL_TIMEOUTS,
+    InstrumentedConnectionPool,
+    InstrumentedSentinelConnectionPool,
+    MainRedis,
+    RedisConfig,
+    get_main_redis_by_config,
+    hash_tag,
+    tagged_key,
+)
+
+
+def test_pool_telemetry() -> None:
+    """
+    test usage gauges, waits for a free connection and the pool reset in a forked child
+    """
+    pool: InstrumentedConnectionPool = InstrumentedConnectionPool(
+        name="test",
+        max_connections=2,
+        timeout=0.05,
+        connection_class=fakeredis.FakeConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True,
+    )
+    client: MainRedis = MainRedis(connection_pool=pool)
+    client.set("key", "value")
+    assert client.get("key") == "value"
+    assert client.pool_status() == {"max_connections": 2, "created": 1, "in_use": 0, "available": 1}
+    connections = [pool.get_connection(), pool.get_connection()]
+    assert REDIS_POOL_CONNECTIONS.labels("test", "in_use")._value.get() == 2
+    assert REDIS_POOL_CONNECTIONS.labels("test", "created")._value.get() == 2
+    with pytest.raises(RedisConnectionError):
+        pool.get_connection()
+    assert REDIS_POOL_TIMEOUTS.labels("test")._value.get() == 1
+    for _connection in connections:
+        pool.release(_connection)
+    assert REDIS_POOL_CONNECTIONS.labels("test", "in_use")._value.get() == 0
+    pid: int = os.fork()
+    if pid == 0:
+        # The child starts with an empty pool
+        os._exit(int(client.pool_status()["created"] != 0))
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert client.pool_status()["available"] == 2
+
+
+class FakeSentinelConnection(fakeredis.FakeRedisConnection):
+    """
+    fake connection that takes the sentinel pool proxy like SentinelManagedConnection
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.connection_pool = kwargs.pop("connection_pool")
+        super().__init__(**kwargs)
+
+
+class StubSentinel:
+    """
+    sentinel manager that reports a configurable primary
+    """
+
+    def __init__(self) -> None:
+        self.primary: Tuple[str, int] = ("localhost", 6379)
+
+    def discover_master(self, _: str) -> Tuple[str, int]:
+        return self.primary
+
+
+def test_sentinel_failover() -> None:
+    """
+    test connections to the former primary are dropped after a failover
+    """
+    sentinel: StubSentinel = StubSentinel()
+    pool: InstrumentedSentinelConnectionPool = InstrumentedSentinelConnectionPool(
+        "mymaster",
+        sentinel,
+        name="sentinel-test",
+        max_connections=2,
+        timeout=0.05,
+        connection_class=FakeSentinelConnection,
+        server=fakeredis.FakeServer(),
+    )
+    assert pool.proxy.get_master_address() == ("localhost", 6379)
+    connections: List = [pool.get_connection(), pool.get_connection()]
+    pool.release(connections[0])
+    sentinel.primary = ("other", 6379)
+    # The proxy disconnects the idle connections when the primary changes
+    pool.proxy.get_master_address()
+    pool.release(connections[1])
+    status = pool.status()
+    assert status["created"] == 1 and status["in_use"] == 0
+    assert REDIS_POOL_CONNECTIONS.labels("sentinel-test", "in_use")._value.get() == 0
+    client: MainRedis = get_main_redis_by_config(
+        RedisConfig(MODE="sentinel", SENTINELS=["127.0.0.1:26379"])
+    )
+    assert isinstance(client.connection_pool, InstrumentedSentinelConnectionPool)
+    with pytest.raises(ValueError):
+        get_main_redis_by_config(RedisConfig(MODE="sentinel", SENTINELS=["127.0.0.1"]))
+
+
+def test_tagged_keys() -> None:
+    """
+    test keys of a hash tag map to one cluster slot
+    """
+    assert hash_tag("lock", 1) == "{lock:1}"
+    assert tagged_key("notify", "gold", 1) == "{notify}:gold:1"
+    lock_name: str = hash_tag("sync-gold-price-lock", "1")
+    assert key_slot(f"lock:{lock_name}".encode()) == key_slot(f"lock-signal:{lock_name}".encode())
+    assert key_slot(tagged_key("a", "x").encode()) == key_slot(tagged_key("a", "y").encode())
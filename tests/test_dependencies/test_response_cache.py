@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the response cache component
+Includes the following:
+    tag sets
+    cluster slots
+"""
+
+import time
+
+import fakeredis
+from redis.crc import key_slot
+
+from infra.dependencies.response_cache import CachedResponse, ResponseCache
+
+
+def make_entry(ttl: float, *tags: str) -> CachedResponse:
+    """
+    :param ttl: lifetime [seconds]
+    :param tags: cache tags
+    """
+    now: float = time.time()
+    return CachedResponse(
+        body=b"{}",
+        status_code=200,
+        headers=[],
+        fresh_until=now + ttl,
+        stale_until=now + ttl,
+        tags=tags,
+    )
+
+
+def test_tag_set_ttl() -> None:
+    """
+    test a tag set lives as long as its longest entry
+    """
+    redis_client: fakeredis.FakeRedis = fakeredis.FakeRedis()
+    cache: ResponseCache = ResponseCache(redis_client, prefix="test", local_size=0)
+    cache.set("test:long", make_entry(100, "a"))
+    cache.set("test:short", make_entry(10, "a", "b"))
+    assert redis_client.smembers("test:tag:{a}") == {b"test:long", b"test:short"}
+    # A shorter entry does not shorten the set
+    assert redis_client.pttl("test:tag:{a}") > 90 * 1000
+    assert 0 < redis_client.pttl("test:tag:{b}") <= 10 * 1000
+    assert redis_client.exists("test:long", "test:short") == 2
+    assert cache.invalidate_tags("a") == 2
+    assert redis_client.exists("test:long", "test:short", "test:tag:{a}") == 0
+
+
+def test_cluster_slots() -> None:
+    """
+    test the entries are not pinned to one slot and each tag set has the slot of its tag
+    """
+    cache: ResponseCache = ResponseCache(fakeredis.FakeRedis(), prefix="test", local_size=0)
+    keys = [cache.make_key("GET", f"/items/{_i}", "", {}) for _i in range(20)]
+    assert len({key_slot(_k.encode()) for _k in keys}) > 1
+    assert cache.tag_key("a") == "test:tag:{a}"
+    assert key_slot(cache.tag_key("a").encode()) == key_slot(b"a")
+    assert key_slot(cache.tag_key("b").encode()) == key_slot(b"b")
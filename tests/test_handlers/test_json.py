@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the json encoders
+Includes the following:
+    json_dumps
+    JSONEncoderHandler compatibility
+"""
+
+import json
+import logging
+import uuid
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict
+
+import inject
+import numpy
+import pytest
+from celery.schedules import crontab
+
+from infra.dependencies import Config
+from infra.handlers.json import JSONEncoderHandler, json_dumps
+
+logger = logging.getLogger(__name__)
+Point = namedtuple("Point", ["x", "y"])
+
+
+class Color(Enum):
+    """
+    enum member
+    """
+
+    RED = "red"
+
+
+@dataclass
+class Item:
+    """
+    nested dataclass
+    """
+
+    point: Point
+    color: Color
+    created: datetime
+
+
+def test_json_dumps_compatible() -> None:
+    """
+    test json_dumps and JSONEncoderHandler give the same json
+    """
+    obj: Dict[Any, Any] = {
+        "item": Item(Point(1, 2), Color.RED, datetime(2024, 1, 2, 3, 4, 5)),
+        "decimal": Decimal("1.5"),
+        "uuid": uuid.UUID(int=1),
+        "timedelta": timedelta(seconds=5),
+        "date": date(2024, 1, 1),
+        "array": numpy.arange(3),
+        "column": numpy.arange(6).reshape(2, 3)[:, 1],
+        "crontab": crontab(minute=1),
+        "set": {1},
+        1: "int key",
+    }
+    expected: Dict[str, Any] = json.loads(json.dumps(obj, cls=JSONEncoderHandler))
+    assert json.loads(json_dumps(obj)) == expected
+    assert json.loads(json_dumps(obj, indent=True)) == expected
+    assert expected["item"] == {
+        "point": {"x": 1, "y": 2},
+        "color": "red",
+        "created": "2024-01-02 03:04:05",
+    }
+    config: Config = inject.instance(Config)
+    assert json.loads(json_dumps(config)) == json.loads(json.dumps(config, cls=JSONEncoderHandler))
+
+
+def test_json_dumps_unsupported() -> None:
+    """
+    test unsupported objects raise TypeError
+    """
+    with pytest.raises(TypeError):
+        json_dumps({"obj": object()})
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the logging pipeline
+Includes the following:
+    LogSampler
+    queue logging with the trace id of the caller
+    JSONFormatter
+"""
+
+import logging
+import threading
+from typing import List
+
+import inject
+import orjson
+
+from infra.dependencies import Registry
+from infra.handlers import init_logger
+from infra.handlers.logging import JSONFormatter, LogSampler
+from infra.handlers.logging.queue import start_queue_logging, stop_queue_logging
+
+logger = logging.getLogger(__name__)
+
+
+class ListHandler(logging.Handler):
+    """
+    keeps the formatted records and the thread that wrote them
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: List[str] = []
+        self.threads: List[int] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+        self.threads.append(threading.get_ident())
+
+
+def test_log_sampler() -> None:
+    """
+    test records above the rate limit are dropped, warnings always pass
+    """
+    sampled: logging.Logger = logging.getLogger("test.sampled")
+    sampled.propagate = False
+    handler: ListHandler = ListHandler()
+    sampled.addHandler(handler)
+    sampler: LogSampler = LogSampler(rate_limit=2)
+    sampled.addFilter(sampler)
+    for _i in range(5):
+        sampled.info(f"info {_i}")
+    sampled.warning("warning")
+    assert handler.lines == ["info 0", "info 1", "warning"]
+    # Reported without waiting for a record of the next window
+    sampler.report_dropped()
+    assert handler.lines[3:] == ["3 log records were dropped, more than 2/s"]
+    sampler.report_dropped()
+    assert len(handler.lines) == 4
+
+
+def test_dropped_records_reported_on_stop() -> None:
+    """
+    test the records dropped before the listener stops are reported
+    """
+    stopped: logging.Logger = logging.getLogger("test.stopped")
+    stopped.propagate = False
+    stopped.setLevel(logging.INFO)
+    handler: ListHandler = ListHandler()
+    stopped.addHandler(handler)
+    stopped.addFilter(LogSampler(rate_limit=1))
+    try:
+        start_queue_logging([stopped], queue_size=100)
+        for _i in range(3):
+            stopped.info(f"info {_i}")
+        stop_queue_logging()
+    finally:
+        init_logger()
+    assert handler.lines == ["info 0", "2 log records were dropped, more than 1/s"]
+
+
+def test_queue_logging() -> None:
+    """
+    test records are written by the listener thread with the trace id of the caller
+    """
+    queued: logging.Logger = logging.getLogger("test.queued")
+    queued.propagate = False
+    queued.setLevel(logging.INFO)
+    handler: ListHandler = ListHandler()
+    handler.setFormatter(JSONFormatter())
+    queued.addHandler(handler)
+    registry: Registry = inject.instance(Registry)
+    try:
+        start_queue_logging([queued], queue_size=100)
+        registry.set_trace_id("trace-1")
+        queued.info("hello %s", "world")
+        try:
+            raise ValueError("test")
+        except ValueError:
+            queued.error("failed", exc_info=True)
+        registry.clear()
+        stop_queue_logging()
+    finally:
+        # Restore the pipeline of the application loggers
+        init_logger()
+    records = [orjson.loads(_l) for _l in handler.lines]
+    assert [_r["message"] for _r in records] == ["hello world", "failed"]
+    assert {_r["trace_id"] for _r in records} == {"trace-1"}
+    assert "ValueError: test" in records[1]["exc_info"]
+    assert threading.get_ident() not in handler.threads
+    assert queued.handlers == [handler]
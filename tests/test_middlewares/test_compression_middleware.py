@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the response compression
+Includes the following:
+    CompressionMiddleware
+    PrecompressedStaticFiles
+"""
+
+import logging
+import os
+from typing import Iterator
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from infra.handlers.http import PrecompressedStaticFiles
+from infra.middlewares import CompressionMiddleware
+
+logger = logging.getLogger(__name__)
+TEXT: str = "compress me " * 1000
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get("/text")
+async def text() -> PlainTextResponse:
+    """
+    large text response
+    """
+    return PlainTextResponse(TEXT)
+
+
+@app.get("/small")
+async def small() -> PlainTextResponse:
+    """
+    response under the minimum size
+    """
+    return PlainTextResponse("small")
+
+
+@app.get("/binary")
+async def binary() -> PlainTextResponse:
+    """
+    response of an incompressible type
+    """
+    return PlainTextResponse(TEXT, media_type="image/png")
+
+
+@app.get("/stream")
+async def stream() -> StreamingResponse:
+    """
+    streaming response
+    """
+
+    def _iter() -> Iterator[str]:
+        for _ in range(10):
+            yield TEXT
+
+    return StreamingResponse(_iter(), media_type="text/plain")
+
+
+client = TestClient(app)
+
+
+def test_negotiated_compression() -> None:
+    """
+    test the negotiated encoding is used
+    """
+    for accept_encoding, encoding in (
+        ("gzip", "gzip"),
+        ("br", "br"),
+        ("zstd", "zstd"),
+        ("gzip;q=0.5, br", "br"),
+        ("gzip, br, zstd", "zstd"),
+    ):
+        response = client.get("/text", headers={"Accept-Encoding": accept_encoding})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(TEXT)
+        assert response.text == TEXT
+
+
+def test_skip_compression() -> None:
+    """
+    test responses that are sent as is
+    """
+    response = client.get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == TEXT
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    response = client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_streaming_compression() -> None:
+    """
+    test streaming responses are compressed chunk by chunk
+    """
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == TEXT * 10
+
+
+def test_precompressed_static_files(tmp_path) -> None:
+    """
+    test static files are served from the precompressed siblings
+    """
+    (tmp_path / "app.js").write_text(TEXT)
+    (tmp_path / "app.3f2a9c1b.js").write_text(TEXT)
+    (tmp_path / "index.html").write_text("<html></html>")
+    static_app = FastAPI()
+    static_app.mount("/static", PrecompressedStaticFiles(directory=str(tmp_path), html=True))
+    static_client = TestClient(static_app)
+    assert os.path.exists(tmp_path / "app.js.gz")
+    assert os.path.exists(tmp_path / "app.js.br")
+    assert not os.path.exists(tmp_path / "index.html.gz")
+
+    response = static_client.get("/static/app.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert response.text == TEXT
+    response = static_client.get(
+        "/static/app.js",
+        headers={"Accept-Encoding": "br", "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+    response = static_client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == TEXT
+
+    # Only content hashed names are immutable
+    response = static_client.get("/static/app.3f2a9c1b.js")
+    assert "immutable" in response.headers["cache-control"]
+
+    response = static_client.get("/static/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text == "<html></html>"
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the http middlewares
+Includes the following middlewares:
+    RequestContextMiddleware
+"""
+
+import logging
+from typing import Any, Dict
+
+import inject
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from infra.dependencies import Auth, BaseRequestStore
+from infra.enums import StatusCode
+from infra.middlewares import RequestContextMiddleware
+
+logger = logging.getLogger(__name__)
+app = FastAPI()
+app.add_middleware(RequestContextMiddleware)
+
+
+@app.post("/echo/{item_id}")
+async def echo(item_id: int, request: Request) -> Dict[str, Any]:
+    """
+    return the request context seen by the handler
+    """
+    body: bytes = await request.body()
+    request_store: BaseRequestStore = inject.instance(Auth).get_request()
+    return {
+        "repr": repr(request_store),
+        "item_id": item_id,
+        "size": len(body),
+        "client_ip": request_store.client_ip,
+        "body": request_store.body.decode(),
+        "path_params": request_store.path_params,
+        "query_params": request_store.query_params,
+    }
+
+
+@app.get("/error")
+async def error() -> None:
+    """
+    raise an unexpected error
+    """
+    raise RuntimeError("test")
+
+
+client = TestClient(app)
+
+
+def test_request_context() -> None:
+    """
+    test the lazily built request context
+    """
+    response = client.post(
+        "/echo/1?a=b",
+        content=b"hello",
+        headers={"X-Forwarded-For": "10.0.0.1"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "repr": "LazyRequestStore(POST /echo/1)",
+        "item_id": 1,
+        "size": 5,
+        "client_ip": "10.0.0.1",
+        "body": "hello",
+        "path_params": {"item_id": "1"},
+        "query_params": {"a": "b"},
+    }
+    assert inject.instance(Auth).get_request() is None
+
+
+def test_unexpected_error() -> None:
+    """
+    test unexpected error returns 500
+    """
+    response = client.get("/error")
+    assert response.status_code == 500
+    assert response.json()["code"] == StatusCode.UNEXPECTED_ERROR.value
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test the compiled model serializers
+Includes the following:
+    Base.model_to_dict / Base.models_to_columns
+    ToDictMixin.to_dict / ToDictMixin.to_columns
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from infra.models import GoldPrice, Test
+from infra.models.base import Base
+from infra.models.serializer import DATETIME_FORMAT, format_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def test_format_datetime() -> None:
+    """
+    test the fast path matches strftime
+    """
+    for value in (
+        datetime(2024, 1, 2, 3, 4, 5, 999999),
+        datetime(999, 1, 1),
+        datetime(2024, 1, 1, tzinfo=timezone.utc),
+    ):
+        assert format_datetime(value) == value.strftime(DATETIME_FORMAT)
+    assert format_datetime(None) is None
+
+
+def test_model_serializers() -> None:
+    """
+    test loaded, expired and transient rows
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[GoldPrice.__table__])
+    created: datetime = datetime(2024, 1, 2, 3, 4, 5)
+    with Session(engine) as session:
+        session.add_all([GoldPrice(id=_i, price=_i, time=_i, create_time=created) for _i in (1, 2)])
+        session.commit()
+        # The commit expired the attributes, serializing loads them again
+        rows: List[GoldPrice] = session.query(GoldPrice).order_by(GoldPrice.id).all()
+        session.expire(rows[1])
+        expected: List[Dict[str, Any]] = [
+            {_c.name: getattr(_r, _c.name) for _c in GoldPrice.__table__.columns} for _r in rows
+        ]
+        assert [_r.model_to_dict() for _r in rows] == expected
+        session.expire(rows[1])
+        formatted: List[Dict[str, Any]] = [_r.to_dict() for _r in rows]
+        assert formatted[0]["create_time"] == "2024-01-02 03:04:05"
+        assert formatted[0]["price"] == 1
+        assert GoldPrice.models_to_columns(rows)["id"] == [1, 2]
+        columns: Dict[str, List[Any]] = GoldPrice.to_columns(rows)
+        assert columns["create_time"] == ["2024-01-02 03:04:05"] * 2
+        assert columns == {_k: [_f[_k] for _f in formatted] for _k in formatted[0]}
+    assert GoldPrice.to_columns([]) == {_c.name: [] for _c in GoldPrice.__table__.columns}
+
+
+def test_dict_keys() -> None:
+    """
+    test to_dict with dict_keys, a missing key is None
+    """
+    item: Test = Test(id=1, title="title")
+    item.dict_keys = ["title", "id", "missing"]  # type: ignore[attr-defined]
+    assert item.to_dict() == {"title": "title", "id": 1, "missing": None}
+    item.dict_keys = ["title"]  # type: ignore[attr-defined]
+    assert item.to_dict() == {"title": "title"}